@@ -6,6 +6,9 @@ from flask_wtf.csrf import CSRFProtect
 import os
 from app.config import config
 from app.celery_config import make_celery
+from app.utils.assets import StaticAssets
+from app.utils.compression import GzipMiddleware
+from app.utils.shared_cache import SharedCache
 
 # Initialize extensions
 db = SQLAlchemy()
@@ -13,6 +16,8 @@ migrate = Migrate()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 csrf = CSRFProtect()
+static_assets = StaticAssets()
+analytics_cache = SharedCache()
 
 # Initialize Celery
 celery = None
@@ -58,6 +63,21 @@ def create_app(config_name='default'):
     # Initialize CSRF protection
     csrf.init_app(app)
     
+    # Compress dynamic responses; static assets are served precompressed in front of this
+    if app.config.get('COMPRESS_ENABLED'):
+        app.wsgi_app = GzipMiddleware(
+            app.wsgi_app,
+            minimum_size=app.config['COMPRESS_MIN_SIZE'],
+            compress_level=app.config['COMPRESS_LEVEL'],
+            mimetypes=app.config['COMPRESS_MIMETYPES']
+        )
+    
+    # Serve fingerprinted static assets if `flask assets build` has been run
+    static_assets.init_app(app)
+    
+    # Analytics API results shared by the workers of this host
+    analytics_cache.init_app(app)
+    
     # Register blueprints
     from app.routes.auth import auth as auth_blueprint
     app.register_blueprint(auth_blueprint, url_prefix='/auth')
@@ -74,6 +94,10 @@ def create_app(config_name='default'):
     from app.routes.health import health_bp
     app.register_blueprint(health_bp)
     
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Create a route for the home page
     @app.route('/')
     def index():
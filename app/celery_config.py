@@ -4,6 +4,7 @@ This module sets up Celery for handling background tasks.
 """
 import os
 from celery import Celery
+from celery.schedules import crontab
 
 def make_celery(app):
     """
@@ -42,6 +43,23 @@ def make_celery(app):
         broker_pool_limit=10
     )
     
+    # Periodic tasks run by `celery beat`
+    celery.conf.beat_schedule = {
+        'sweep-expired-attempts': {
+            'task': 'app.tasks.sweep_expired_attempts',
+            'schedule': app.config.get('SWEEPER_INTERVAL_SECONDS', 60),
+        },
+        'compact-daily-activity': {
+            'task': 'app.tasks.compact_daily_activity',
+            # Shortly after midnight UTC, once yesterday's rows are final
+            'schedule': crontab(hour=0, minute=15),
+        },
+        'purge-user-import-jobs': {
+            'task': 'app.tasks.purge_user_import_jobs',
+            'schedule': app.config.get('USER_IMPORT_PURGE_INTERVAL_SECONDS', 300),
+        },
+    }
+    
     class ContextTask(celery.Task):
         def __call__(self, *args, **kwargs):
             with app.app_context():
@@ -0,0 +1,131 @@
+"""
+Flask CLI commands for the exam application.
+"""
+import os
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy.exc import IntegrityError
+from app.services.quiz_regrader import QuizRegrader
+from app.services.quiz_statistics import QuizStatisticsService
+from app.services.leaderboard import LeaderboardService
+from app.services.completion_times import CompletionTimeSketch
+from app.services.daily_activity import DailyActivityService
+from app.services.item_analysis import ItemAnalysis
+from app.services.user_import import UserImport
+from app.utils.assets import build_assets
+
+assets_cli = AppGroup('assets', help='Static asset pipeline.')
+stats_cli = AppGroup('stats', help='Maintained quiz statistics.')
+users_cli = AppGroup('users', help='User accounts.')
+
+
+@click.command('regrade')
+@click.argument('quiz_id', type=int)
+@click.option('--chunk-size', default=5000, show_default=True, help='Attempts scored per chunk.')
+@click.option('--per-row', is_flag=True, help='Use the per-attempt scoring path (for comparison).')
+@with_appcontext
+def regrade_command(quiz_id, chunk_size, per_row):
+    """Re-score every completed attempt of QUIZ_ID against its current answer key."""
+    summary = QuizRegrader.regrade_quiz(quiz_id, chunk_size=chunk_size, per_row=per_row)
+    if summary is None:
+        raise click.ClickException(f'Quiz {quiz_id} not found')
+    
+    click.echo(f"Regraded {summary['attempts']} attempts of quiz {quiz_id} "
+               f"({summary['updated']} scores changed) in {summary['seconds']}s "
+               f"[{summary['method']}: {summary['attempts_per_second']} attempts/sec]")
+
+
+@assets_cli.command('build')
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and gzip app/static into the build directory and write its manifest."""
+    static_folder = current_app.static_folder
+    output_dir = os.path.join(static_folder, current_app.config['STATIC_ASSETS_DIR'])
+    manifest = build_assets(static_folder, output_dir)
+    compressed = sum(1 for built in manifest.values()
+                     if os.path.exists(os.path.join(static_folder, *built.split('/')) + '.gz'))
+    click.echo(f'Built {len(manifest)} assets ({compressed} precompressed) into {output_dir}')
+
+
+@stats_cli.command('reconcile')
+@click.option('--quiz-id', type=int, default=None, help='Only rebuild this quiz (default: all quizzes).')
+@with_appcontext
+def reconcile_stats_command(quiz_id):
+    """Rebuild the quiz_statistics counters from the raw attempts."""
+    rebuilt = QuizStatisticsService.reconcile(quiz_id)
+    click.echo(f'Rebuilt statistics of {rebuilt} quizzes')
+
+
+@stats_cli.command('leaderboard')
+@click.option('--quiz-id', type=int, default=None, help='Only rebuild this quiz (default: all quizzes).')
+@with_appcontext
+def rebuild_leaderboard_command(quiz_id):
+    """Rebuild the user leaderboards from the completed attempts."""
+    rebuilt = LeaderboardService.rebuild(quiz_id)
+    click.echo(f'Rebuilt {rebuilt} per-quiz leaderboard rows')
+
+
+@stats_cli.command('completion-times')
+@click.option('--quiz-id', type=int, default=None, help='Only rebuild this quiz (default: all quizzes).')
+@with_appcontext
+def rebuild_completion_times_command(quiz_id):
+    """Rebuild the completion time sketches from the completed attempts."""
+    attempts = CompletionTimeSketch.rebuild(quiz_id)
+    click.echo(f'Rebuilt completion time sketches from {attempts} attempts')
+
+
+@stats_cli.command('daily-activity')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='First UTC day to rebuild (default: every day).')
+@click.option('--quiz-id', type=int, default=None, help='Only rebuild this quiz (default: all quizzes).')
+@with_appcontext
+def rebuild_daily_activity_command(since, quiz_id):
+    """Rebuild the daily_activity rollup from the raw attempts."""
+    rows = DailyActivityService.rebuild(since.date() if since else None, quiz_id)
+    click.echo(f'Rebuilt {rows} daily activity rows')
+
+
+@stats_cli.command('items')
+@click.argument('quiz_id', type=int)
+@click.option('--full', is_flag=True, help='Recompute from every attempt instead of since the last run.')
+@with_appcontext
+def analyze_items_command(quiz_id, full):
+    """Compute the item statistics (difficulty, discrimination, distractors) of QUIZ_ID."""
+    summary = ItemAnalysis.analyze_quiz(quiz_id, full=full)
+    if summary is None:
+        raise click.ClickException(f'Quiz {quiz_id} not found')
+    
+    click.echo(f"Analyzed {summary['attempts']} new attempts ({summary['answers']} answers) of quiz {quiz_id} "
+               f"in {summary['seconds']}s [{summary['mode']}: {summary['answers_per_second']} answers/sec, "
+               f"{summary['total_attempts']} attempts in total]")
+
+
+@users_cli.command('import')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig', lazy=False))
+@click.option('--workers', type=int, default=None,
+              help='Password hashing processes (default: USER_IMPORT_WORKERS, 0 = one per CPU).')
+@click.option('--batch-size', type=int, default=None, help='Users per INSERT batch (default: USER_IMPORT_BATCH_SIZE).')
+@with_appcontext
+def import_users_command(csv_file, workers, batch_size):
+    """Create users from CSV_FILE (columns username, email, password and optionally is_admin)."""
+    try:
+        summary = UserImport.import_csv(csv_file, workers=workers, batch_size=batch_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    except IntegrityError:
+        raise click.ClickException('Some of these usernames or emails were taken while the file was being '
+                                   'imported, so no users were created; run the import again')
+    
+    for error in summary['errors']:
+        click.echo(f"line {error['line']} ({error['username'] or '-'}): {error['error']}", err=True)
+    click.echo(f"Created {summary['created']} of {summary['rows']} users in {summary['seconds']}s "
+               f"[{summary['users_per_second']} users/sec, {summary['hash_seconds']}s hashing]")
+
+
+def register_commands(app):
+    """Register the CLI commands with the Flask application"""
+    app.cli.add_command(regrade_command)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(users_cli)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
@@ -14,6 +15,82 @@ class Config:
     # CSRF Protection
     WTF_CSRF_ENABLED = True
     WTF_CSRF_SECRET_KEY = os.environ.get('WTF_CSRF_SECRET_KEY', 'csrf-key-please-change-in-production')
+    # Number of quiz answer keys kept in each worker's process-local cache
+    ANSWER_KEY_CACHE_SIZE = int(os.environ.get('ANSWER_KEY_CACHE_SIZE', 256))
+    # Number of quiz content snapshots (questions and options) kept per worker
+    QUIZ_SNAPSHOT_CACHE_SIZE = int(os.environ.get('QUIZ_SNAPSHOT_CACHE_SIZE', 64))
+    # Scoring backend used when completing a quiz: 'python' scores against the
+    # cached answer key, 'sql' scores with one aggregate UPDATE ... RETURNING
+    SCORING_BACKEND = os.environ.get('SCORING_BACKEND', 'python')
+    # How often a worker re-checks its cached quiz catalog against the quizzes table
+    QUIZ_CATALOG_RECHECK_SECONDS = float(os.environ.get('QUIZ_CATALOG_RECHECK_SECONDS', 5))
+    # Shard rows per quiz in quiz_statistics; more shards spread concurrent completions over more row locks
+    QUIZ_STATISTICS_SHARDS = int(os.environ.get('QUIZ_STATISTICS_SHARDS', 8))
+    # Shard rows per quiz and day in daily_activity; the nightly compaction merges them
+    DAILY_ACTIVITY_SHARDS = int(os.environ.get('DAILY_ACTIVITY_SHARDS', 4))
+    # Keyset pagination of list pages and APIs (?limit= is clamped to MAX_PAGE_SIZE)
+    PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 50))
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 200))
+    # Build directory of `flask assets build` inside app/static, and how long browsers keep its files
+    STATIC_ASSETS_DIR = 'dist'
+    STATIC_ASSETS_MAX_AGE = int(os.environ.get('STATIC_ASSETS_MAX_AGE', 31536000))
+    # gzip for dynamic responses: minimum size, default level and per-mimetype level overrides
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_MIMETYPES = {
+        'text/html': None,
+        'text/css': None,
+        'text/plain': None,
+        'text/javascript': None,
+        'application/javascript': None,
+        'application/json': None,
+        'image/svg+xml': None,
+        # Large streamed exports favour throughput over ratio
+        'text/csv': 1,
+        'application/x-ndjson': 1,
+    }
+    # Cache-Control per endpoint class; content is always validated with ETags
+    HTTP_CACHE_POLICIES = {
+        # Quiz content JSON polled by the quiz page scripts
+        'api': 'private, max-age=30, must-revalidate',
+        # Server-rendered pages (per user, may carry flash messages)
+        'page': 'private, no-cache',
+    }
+    # Expired/abandoned attempt sweeper (Celery beat)
+    SWEEPER_INTERVAL_SECONDS = int(os.environ.get('SWEEPER_INTERVAL_SECONDS', 60))
+    SWEEPER_BATCH_SIZE = int(os.environ.get('SWEEPER_BATCH_SIZE', 500))
+    # Extra time granted after a time limit before an attempt is closed
+    SWEEPER_GRACE_SECONDS = int(os.environ.get('SWEEPER_GRACE_SECONDS', 60))
+    # Untimed attempts without activity for this long are considered abandoned
+    SWEEPER_ABANDON_AFTER_HOURS = int(os.environ.get('SWEEPER_ABANDON_AFTER_HOURS', 24))
+    # Bucket edges (minutes) of /api/time-distribution; ?edges= overrides them per request
+    TIME_DISTRIBUTION_EDGES = [float(edge) for edge in os.environ.get('TIME_DISTRIBUTION_EDGES', '5,10,15,30').split(',')]
+    # Analytics API cache shared by the workers of a host through a SQLite file;
+    # values are fresh for TTL seconds, then served stale while one worker recomputes
+    ANALYTICS_CACHE_PATH = os.environ.get('ANALYTICS_CACHE_PATH',
+                                          os.path.join(tempfile.gettempdir(), 'quiz-analytics-cache.sqlite3'))
+    ANALYTICS_CACHE_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', 60))
+    ANALYTICS_CACHE_STALE_SECONDS = float(os.environ.get('ANALYTICS_CACHE_STALE_SECONDS', 600))
+    ANALYTICS_CACHE_LOCK_TIMEOUT = float(os.environ.get('ANALYTICS_CACHE_LOCK_TIMEOUT', 30))
+    # Bulk user import: password hashing processes (0 = one per CPU) and users per INSERT batch
+    USER_IMPORT_WORKERS = int(os.environ.get('USER_IMPORT_WORKERS', 0))
+    USER_IMPORT_BATCH_SIZE = int(os.environ.get('USER_IMPORT_BATCH_SIZE', 1000))
+    # Uploads through the admin page are imported by a Celery task, hashing in the task's
+    # own process by default; larger files are imported with 'flask users import'
+    USER_IMPORT_MAX_ROWS = int(os.environ.get('USER_IMPORT_MAX_ROWS', 5000))
+    USER_IMPORT_TASK_WORKERS = int(os.environ.get('USER_IMPORT_TASK_WORKERS', 1))
+    # Pending or running user imports not updated for this long (the task's time limit) are
+    # marked failed, and their uploads dropped by a Celery beat purge run this often
+    USER_IMPORT_STALE_SECONDS = int(os.environ.get('USER_IMPORT_STALE_SECONDS', 3600))
+    USER_IMPORT_PURGE_INTERVAL_SECONDS = int(os.environ.get('USER_IMPORT_PURGE_INTERVAL_SECONDS', 300))
+    # Background quiz import: largest accepted upload, and questions saved (and progress reported) per batch
+    QUIZ_IMPORT_MAX_BYTES = int(os.environ.get('QUIZ_IMPORT_MAX_BYTES', 20 * 1024 * 1024))
+    QUIZ_IMPORT_BATCH_SIZE = int(os.environ.get('QUIZ_IMPORT_BATCH_SIZE', 100))
+    # Running imports that have not saved progress for this long are marked failed
+    QUIZ_IMPORT_STALE_SECONDS = int(os.environ.get('QUIZ_IMPORT_STALE_SECONDS', 900))
+    # Largest request body (uploads plus form overhead); larger requests get 413 before they are read
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', QUIZ_IMPORT_MAX_BYTES + 1024 * 1024))
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -25,6 +102,10 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite:///:memory:')
     WTF_CSRF_ENABLED = False
+    # Always validate the cached catalog, test transactions roll back behind its back
+    QUIZ_CATALOG_RECHECK_SECONDS = 0
+    # Analytics are computed on every request
+    ANALYTICS_CACHE_TTL = 0
 
 class ProductionConfig(Config):
     """Production configuration"""
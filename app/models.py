@@ -1,5 +1,7 @@
 from datetime import datetime
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
 
@@ -48,6 +50,10 @@ class Quiz(db.Model):
     is_live = db.Column(db.Boolean, server_default='false', default=False)  # Controls visibility to regular users
     # Time limit in minutes, null means no time limit
     time_limit = db.Column(db.Integer, nullable=True)
+    # Content version, bumped whenever the quiz's questions or options change
+    version = db.Column(db.Integer, nullable=False, server_default='1', default=1)
+    # Denormalized number of questions, maintained by QuizLoader
+    question_count = db.Column(db.Integer, nullable=False, server_default='0', default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -55,6 +61,11 @@ class Quiz(db.Model):
     questions = db.relationship('Question', backref='quiz', lazy='dynamic', cascade='all, delete-orphan')
     user_quizzes = db.relationship('UserQuiz', backref='quiz', lazy='dynamic')
     
+    __table_args__ = (
+        # Live catalog lookups (WHERE is_live ORDER BY id)
+        db.Index('ix_quizzes_is_live_id', 'is_live', 'id'),
+    )
+    
     # Property to safely get is_live status even if column doesn't exist
     @property
     def is_live_safe(self):
@@ -112,12 +123,32 @@ class UserQuiz(db.Model):
     # Relationships
     user_answers = db.relationship('UserAnswer', backref='user_quiz', lazy='dynamic', cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Partial index over open attempts, used by the expired attempt sweeper
+        db.Index(
+            'ix_user_quizzes_open_quiz_created_at', 'quiz_id', 'created_at',
+            postgresql_where=db.text('completed_at IS NULL'),
+            sqlite_where=db.text('completed_at IS NULL')
+        ),
+        # Seek index for the paginated results page, newest completions first
+        db.Index('ix_user_quizzes_completed_at_id', 'completed_at', 'id'),
+        # Completions of one quiz in completion order (incremental item analysis,
+        # results page filtered by quiz)
+        db.Index('ix_user_quizzes_quiz_completed_at', 'quiz_id', 'completed_at', 'id'),
+        # Results page filtered by user, newest completions first
+        db.Index('ix_user_quizzes_user_completed_at', 'user_id', 'completed_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<UserQuiz {self.id}: User {self.user_id} - Quiz {self.quiz_id}>'
 
 class UserAnswer(db.Model):
     """UserAnswer model for tracking individual answers"""
     __tablename__ = 'user_answers'
+    # One answer per question per attempt; also the conflict target for answer upserts
+    __table_args__ = (
+        db.UniqueConstraint('user_quiz_id', 'question_id', name='uq_user_answers_user_quiz_question'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_quiz_id = db.Column(db.Integer, db.ForeignKey('user_quizzes.id'), nullable=False)
@@ -132,3 +163,228 @@ class UserAnswer(db.Model):
     
     def __repr__(self):
         return f'<UserAnswer {self.id}: UserQuiz {self.user_quiz_id} - Question {self.question_id}>'
+
+
+class QuizStatistics(db.Model):
+    """Running attempt counters of a quiz, split over shard rows to spread write contention"""
+    __tablename__ = 'quiz_statistics'
+    
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='CASCADE'), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    attempts_started = db.Column(db.BigInteger, nullable=False, default=0)
+    attempts_completed = db.Column(db.BigInteger, nullable=False, default=0)
+    score_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    score_sq_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    score_min = db.Column(db.Integer, nullable=True)
+    score_max = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<QuizStatistics quiz {self.quiz_id} shard {self.shard}>'
+
+
+class UserScoreTotal(db.Model):
+    """Completed attempts and score percentage sum of a user over all quizzes (leaderboard row)"""
+    __tablename__ = 'user_score_totals'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    percentage_sum = db.Column(db.Float, nullable=False, default=0)
+    avg_percentage = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserScoreTotal user {self.user_id}: {self.avg_percentage:.1f}%>'
+
+
+class UserQuizScore(db.Model):
+    """Completed attempts and score percentage sum of a user on one quiz (per-quiz leaderboard row)"""
+    __tablename__ = 'user_quiz_scores'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='CASCADE'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    percentage_sum = db.Column(db.Float, nullable=False, default=0)
+    avg_percentage = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserQuizScore user {self.user_id} quiz {self.quiz_id}: {self.avg_percentage:.1f}%>'
+
+
+class CompletionTimeBucket(db.Model):
+    """Count of a quiz's completed attempts whose duration falls in one log-spaced bucket"""
+    __tablename__ = 'completion_time_buckets'
+    
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='CASCADE'), primary_key=True)
+    bucket = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CompletionTimeBucket quiz {self.quiz_id} bucket {self.bucket}: {self.count}>'
+
+
+class DailyActivity(db.Model):
+    """Attempts started and completed per quiz per UTC day, split over shard rows until compacted"""
+    __tablename__ = 'daily_activity'
+    __table_args__ = (
+        db.Index('ix_daily_activity_quiz_day', 'quiz_id', 'day'),
+    )
+    
+    day = db.Column(db.Date, primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='CASCADE'), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    attempts_started = db.Column(db.Integer, nullable=False, default=0)
+    attempts_completed = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<DailyActivity {self.day} quiz {self.quiz_id} shard {self.shard}>'
+
+
+class ItemStatistics(db.Model):
+    """Item analysis of one question plus the running sums it is computed from"""
+    __tablename__ = 'item_statistics'
+    
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Quiz.version the sums were computed against; any other version forces a full rerun
+    quiz_version = db.Column(db.Integer, nullable=False)
+    # Attempts completed up to this time are included
+    watermark = db.Column(db.DateTime, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Sums over the attempts' total scores (for the point-biserial correlation)
+    score_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    score_sq_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    correct_score_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    # option_id (as a string) -> number of attempts that selected it
+    option_counts = db.Column(db.JSON, nullable=False, default=dict)
+    p_value = db.Column(db.Float, nullable=True)
+    point_biserial = db.Column(db.Float, nullable=True)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ItemStatistics question {self.question_id}: p={self.p_value}>'
+
+
+class QuizImportJob(db.Model):
+    """Uploaded quiz file waiting for, or imported by, the background import task"""
+    __tablename__ = 'quiz_import_jobs'
+    
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    # The uploaded YAML; cleared once the job has finished
+    payload = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(16), nullable=False, default=PENDING)
+    # Questions in the file and questions saved so far
+    total = db.Column(db.Integer, nullable=True)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='SET NULL'), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<QuizImportJob {self.id} {self.filename}: {self.status}>'
+
+
+class UserImportJob(db.Model):
+    """Uploaded users CSV waiting for, or imported by, the background import task"""
+    __tablename__ = 'user_import_jobs'
+    
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    # The uploaded CSV; cleared once the job has finished
+    payload = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(16), nullable=False, default=PENDING)
+    # Data rows in the file
+    total = db.Column(db.Integer, nullable=False, default=0)
+    # Summary returned by UserImport.import_csv once completed
+    summary = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserImportJob {self.id} {self.filename}: {self.status}>'
+
+
+# Leaderboard order (best average first, lowest user id on ties), so a
+# top-K read is an index range scan that stops after K rows
+db.Index('ix_user_score_totals_leaderboard',
+         UserScoreTotal.avg_percentage.desc(), UserScoreTotal.user_id)
+db.Index('ix_user_quiz_scores_leaderboard',
+         UserQuizScore.quiz_id, UserQuizScore.avg_percentage.desc(), UserQuizScore.user_id)
+
+# Prefix search of the user directory (see app.utils.sql.prefix_match):
+# pg_trgm GIN indexes for ILIKE on PostgreSQL, NOCASE indexes on SQLite
+db.Index('ix_users_username_trgm', User.username, postgresql_using='gin',
+         postgresql_ops={'username': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+db.Index('ix_users_email_trgm', User.email, postgresql_using='gin',
+         postgresql_ops={'email': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+event.listen(User.__table__, 'before_create',
+             db.DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+db.Index('ix_users_username_nocase', User.username.collate('NOCASE')).ddl_if(dialect='sqlite')
+db.Index('ix_users_email_nocase', User.email.collate('NOCASE')).ddl_if(dialect='sqlite')
+
+
+@event.listens_for(Session, 'after_flush')
+def bump_quiz_versions(session, flush_context):
+    """Bump Quiz.version for every quiz whose questions or options were changed in this flush"""
+    quiz_ids = set()
+    option_question_ids = set()
+    new_quiz_ids = {obj.id for obj in session.new if isinstance(obj, Quiz)}
+    
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Question):
+            if obj.quiz_id is not None:
+                quiz_ids.add(obj.quiz_id)
+        elif isinstance(obj, Option):
+            if obj.question_id is not None:
+                option_question_ids.add(obj.question_id)
+    
+    if not quiz_ids and not option_question_ids:
+        return
+    
+    connection = session.connection()
+    if option_question_ids:
+        rows = connection.execute(
+            db.select(Question.quiz_id).where(Question.id.in_(option_question_ids))
+        )
+        quiz_ids.update(row.quiz_id for row in rows)
+    
+    # Quizzes inserted in this flush already start at version 1
+    quiz_ids -= new_quiz_ids
+    if not quiz_ids:
+        return
+    
+    connection.execute(
+        Quiz.__table__.update()
+        .where(Quiz.__table__.c.id.in_(quiz_ids))
+        .values(version=Quiz.__table__.c.version + 1)
+    )
+    session.info.setdefault('bumped_quiz_ids', set()).update(quiz_ids)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def expire_bumped_quiz_versions(session, flush_context):
+    """Make loaded Quiz objects reload the version that was bumped in SQL"""
+    quiz_ids = session.info.pop('bumped_quiz_ids', None)
+    if not quiz_ids:
+        return
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Quiz) and obj.id in quiz_ids:
+            session.expire(obj, ['version', 'updated_at'])
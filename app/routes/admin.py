@@ -1,10 +1,25 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, abort, jsonify, make_response, Response, stream_with_context
 from flask_login import login_required, current_user
 from flask_wtf.csrf import generate_csrf
 from app import db
-from app.models import User, Quiz, Question, Option, UserQuiz, UserAnswer
+from app.models import User, Quiz, Question, Option, UserQuiz, UserAnswer, QuizImportJob, UserImportJob
 from app.services.quiz_loader import QuizLoader
+from app.services.quiz_import import QuizImport
 from app.services.quiz_service import QuizService
+from app.services.quiz_snapshot import QuizSnapshotCache
+from app.services.quiz_cache import invalidate_quiz_caches
+from app.services.quiz_catalog import QuizCatalog
+from app.services.quiz_statistics import QuizStatisticsService
+from app.services.item_analysis import ItemAnalysis
+from app.services.results import ResultsService
+from app.services.results_export import ResultsExport, FORMATS as EXPORT_FORMATS
+from app.services.user_directory import UserDirectory
+from app.services.user_import import UserImport
+from app.tasks import analyze_quiz_items, import_quiz_file, import_users_file
+from app.utils.http_cache import page_etag, not_modified, add_validators
+from app.utils.pagination import page_args, keyset_paginate
+from sqlalchemy.orm import joinedload
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 import os
@@ -21,13 +36,19 @@ def admin_required(f):
     decorated_function.__name__ = f.__name__
     return login_required(decorated_function)
 
+@admin.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    """Send uploads over MAX_CONTENT_LENGTH back to their form"""
+    flash(f'File is larger than {current_app.config["MAX_CONTENT_LENGTH"] // (1024 * 1024)} MB')
+    return redirect(request.url)
+
 @admin.route('/')
 @admin_required
 def index():
     """Admin dashboard"""
     quiz_count = Quiz.query.count()
     user_count = User.query.count()
-    attempt_count = UserQuiz.query.count()
+    attempt_count = QuizStatisticsService.totals()['attempts_started']
     
     return render_template('admin/index.html', 
                           quiz_count=quiz_count, 
@@ -44,22 +65,53 @@ def analytics_dashboard():
 @admin_required
 def list_quizzes():
     """List all quizzes for admin"""
-    quizzes = Quiz.query.all()
-    return render_template('admin/quizzes/list.html', quizzes=quizzes)
+    cursor, limit = page_args()
+    page = keyset_paginate(Quiz.query, [Quiz.id], cursor, limit)
+    attempt_counts = QuizService.get_attempt_counts([quiz.id for quiz in page])
+    return render_template('admin/quizzes/list.html', quizzes=page.items, page=page,
+                           attempt_counts=attempt_counts)
 
 @admin.route('/quizzes/<int:quiz_id>')
 @admin_required
 def view_quiz(quiz_id):
     """View quiz details for admin"""
     quiz = Quiz.query.get_or_404(quiz_id)
-    questions = Question.query.filter_by(quiz_id=quiz.id).all()
     
-    return render_template('admin/quizzes/view.html', quiz=quiz, questions=questions)
+    # The sharded counters are cheap enough to read before answering a conditional GET
+    attempts = QuizStatisticsService.get(quiz.id)['attempts_started']
+    etag = page_etag('admin.view_quiz', quiz.id, quiz.version, quiz.updated_at, attempts)
+    cached = not_modified(etag, 'page')
+    if cached:
+        return cached
+    
+    questions = QuizSnapshotCache.get(quiz).questions
+    
+    response = make_response(render_template('admin/quizzes/view.html', quiz=quiz, questions=questions,
+                                             attempts=attempts))
+    return add_validators(response, etag, 'page')
+
+@admin.route('/quizzes/<int:quiz_id>/items')
+@admin_required
+def item_analysis(quiz_id):
+    """View the item statistics of a quiz"""
+    quiz = Quiz.query.get_or_404(quiz_id)
+    report = ItemAnalysis.report(quiz)
+    return render_template('admin/quizzes/item_analysis.html', quiz=quiz, report=report)
+
+@admin.route('/quizzes/<int:quiz_id>/items', methods=['POST'])
+@admin_required
+def run_item_analysis(quiz_id):
+    """Queue an item analysis of a quiz"""
+    quiz = Quiz.query.get_or_404(quiz_id)
+    
+    analyze_quiz_items.delay(quiz.id, full=request.form.get('full') == '1')
+    flash(f'Item analysis of "{quiz.title}" queued')
+    return redirect(url_for('admin.item_analysis', quiz_id=quiz.id))
 
 @admin.route('/quizzes/import', methods=['GET', 'POST'])
 @admin_required
 def import_quiz():
-    """Import quiz from YAML file"""
+    """Upload a quiz YAML file to be imported in the background"""
     if request.method == 'POST':
         # Check if a file was uploaded
         if 'quiz_file' not in request.files:
@@ -75,26 +127,60 @@ def import_quiz():
             flash('File must be a YAML file')
             return redirect(request.url)
         
-        # Save the file temporarily
-        import tempfile
-        temp_dir = tempfile.mkdtemp()
-        file_path = os.path.join(temp_dir, file.filename)
-        file.save(file_path)
-        
+        # Only the upload is saved here; parsing and inserting happen in the import task
         try:
-            # Load the quiz into the database
-            quiz = QuizLoader.load_quiz_from_file(file_path)
-            flash(f'Quiz "{quiz.title}" imported successfully')
-            return redirect(url_for('admin.view_quiz', quiz_id=quiz.id))
-        except Exception as e:
+            job = QuizImport.stage(file.filename, file.read(), user_id=current_user.id)
+        except ValueError as e:
             flash(f'Error importing quiz: {str(e)}')
             return redirect(request.url)
-        finally:
-            # Clean up temporary file
-            os.remove(file_path)
-            os.rmdir(temp_dir)
     
-    return render_template('admin/quizzes/import.html')
+        _queue_quiz_import(job)
+        return redirect(url_for('admin.import_quiz', job=job.id))
+    
+    job = None
+    job_id = request.args.get('job', type=int)
+    if job_id:
+        job = db.session.get(QuizImportJob, job_id)
+        if job:
+            QuizImport.expire_stale(job)
+    return render_template('admin/quizzes/import.html', job=QuizImport.status(job) if job else None)
+
+def _queue_quiz_import(job):
+    # A job that cannot be queued is failed right away instead of staying pending
+    try:
+        import_quiz_file.delay(job.id)
+    except Exception as e:
+        logging.error(f"Error queueing quiz import job {job.id}: {str(e)}")
+        QuizImport.fail(job, 'The import could not be queued, please retry later', retryable=True)
+
+@admin.route('/quizzes/imports/<int:job_id>/retry', methods=['POST'])
+@admin_required
+def retry_quiz_import(job_id):
+    """Queue a failed quiz import again"""
+    job = db.session.get(QuizImportJob, job_id)
+    if not job:
+        abort(404)
+    
+    if QuizImport.retry(job):
+        _queue_quiz_import(job)
+    else:
+        flash('This import cannot be retried, please upload the file again')
+    return redirect(url_for('admin.import_quiz', job=job.id))
+
+@admin.route('/quizzes/imports/<int:job_id>')
+@admin_required
+def quiz_import_status(job_id):
+    """Progress of a quiz import job, polled by the import page"""
+    job = db.session.get(QuizImportJob, job_id)
+    if not job:
+        abort(404)
+    
+    QuizImport.expire_stale(job)
+    status = QuizImport.status(job)
+    status['quiz_url'] = url_for('admin.view_quiz', quiz_id=job.quiz_id) if job.quiz_id else None
+    response = jsonify(status)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 @admin.route('/quizzes/import-directory')
 @admin_required
@@ -122,6 +208,7 @@ def delete_quiz(quiz_id):
     
     db.session.delete(quiz)
     db.session.commit()
+    invalidate_quiz_caches(quiz_id)
     
     flash(f'Quiz "{quiz.title}" deleted successfully')
     return redirect(url_for('admin.list_quizzes'))
@@ -136,6 +223,7 @@ def toggle_quiz_live(quiz_id):
         # Toggle the is_live status
         quiz.is_live = not quiz.is_live
         db.session.commit()
+        QuizCatalog.invalidate()
         
         status = "published" if getattr(quiz, 'is_live', False) else "unpublished"
         flash(f'Quiz "{quiz.title}" {status} successfully')
@@ -167,6 +255,7 @@ def set_time_limit(quiz_id):
         # Update quiz time limit
         quiz.time_limit = time_limit
         db.session.commit()
+        QuizCatalog.invalidate()
         
         if time_limit:
             flash(f'Time limit for "{quiz.title}" set to {time_limit} minutes')
@@ -184,9 +273,11 @@ def set_time_limit(quiz_id):
 @admin.route('/users')
 @admin_required
 def list_users():
-    """List all users for admin"""
-    users = User.query.all()
-    return render_template('admin/users/list.html', users=users)
+    """List all users for admin, optionally searching by username or email prefix"""
+    search = request.args.get('q', '').strip() or None
+    cursor, limit = page_args()
+    page = UserDirectory.page(search, cursor, limit)
+    return render_template('admin/users/list.html', users=page.items, page=page, search=search)
 
 
 @admin.route('/users/add', methods=['GET', 'POST'])
@@ -229,6 +320,43 @@ def add_user():
     
     return render_template('admin/users/edit.html', user=None)
 
+@admin.route('/users/import', methods=['GET', 'POST'])
+@admin_required
+def import_users():
+    """Upload a users CSV file to be imported in the background"""
+    if request.method == 'POST':
+        file = request.files.get('users_file')
+        if not file or file.filename == '':
+            flash('No file selected')
+            return redirect(request.url)
+        
+        if not file.filename.endswith('.csv'):
+            flash('File must be a CSV file')
+            return redirect(request.url)
+        
+        # Only the upload is saved here; hashing and inserting happen in the import task
+        try:
+            job = UserImport.stage(file.filename, file.read(), user_id=current_user.id)
+        except ValueError as e:
+            flash(f'Error importing users: {str(e)}', 'danger')
+            return redirect(request.url)
+        
+        try:
+            import_users_file.delay(job.id)
+        except Exception as e:
+            logging.error(f"Error queueing user import job {job.id}: {str(e)}")
+            UserImport.fail_unqueued(job)
+        return redirect(url_for('admin.import_users', job=job.id))
+    
+    job = None
+    job_id = request.args.get('job', type=int)
+    if job_id:
+        job = db.session.get(UserImportJob, job_id)
+        if job:
+            UserImport.expire_stale(job)
+    return render_template('admin/users/import.html', job=UserImport.status(job) if job else None,
+                           max_rows=current_app.config.get('USER_IMPORT_MAX_ROWS'))
+
 @admin.route('/users/<int:user_id>')
 @admin_required
 def view_user(user_id):
@@ -308,21 +436,33 @@ def toggle_admin(user_id):
 @admin_required
 def view_results():
     """View all quiz results"""
-    # Get filter parameter
-    quiz_filter = request.args.get('quiz_filter', type=int)
+    filters = ResultsService.filters_from_args(request.args)
     
-    # Query with filter if provided
-    query = UserQuiz.query.filter(UserQuiz.completed_at.isnot(None))
-    if quiz_filter:
-        query = query.filter_by(quiz_id=quiz_filter)
+    # One projected page of completed attempts, newest first, seeking on (completed_at, id)
+    cursor, limit = page_args()
+    page = ResultsService.page(filters, cursor, limit)
     
-    # Get all completed quiz attempts
-    user_quizzes = query.order_by(UserQuiz.completed_at.desc()).all()
+    # Quizzes for the filter dropdown
+    quizzes = db.session.query(Quiz.id, Quiz.title).order_by(Quiz.title).all()
     
-    # Get all quizzes for filter dropdown
-    quizzes = Quiz.query.all()
+    return render_template('admin/results.html', results=page.items, quizzes=quizzes, page=page,
+                           filters=filters)
+
+
+@admin.route('/results/export.<fmt>')
+@admin_required
+def export_results(fmt):
+    """Stream the filtered quiz results as CSV or NDJSON"""
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
     
-    return render_template('admin/results.html', user_quizzes=user_quizzes, quizzes=quizzes)
+    filename = f"quiz-results-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(ResultsExport.stream(fmt, ResultsService.filters_from_args(request.args))),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                 'Cache-Control': 'no-store'}
+    )
 
 
 @admin.route('/attempts/<int:attempt_id>')
@@ -332,10 +472,12 @@ def view_attempt(attempt_id):
     user_quiz = UserQuiz.query.get_or_404(attempt_id)
     
     # Get all questions for this quiz
-    questions = Question.query.filter_by(quiz_id=user_quiz.quiz_id).all()
+    questions = QuizSnapshotCache.get(user_quiz.quiz).questions
     
-    # Get user answers
-    user_answers = UserAnswer.query.filter_by(user_quiz_id=user_quiz.id).all()
+    # Get user answers together with the selected options
+    user_answers = UserAnswer.query.options(joinedload(UserAnswer.option)).filter_by(
+        user_quiz_id=user_quiz.id
+    ).all()
     
     # Create a dictionary of answers by question_id for easy lookup
     answers = {answer.question_id: answer for answer in user_answers}
@@ -1,182 +1,96 @@
-from flask import Blueprint, jsonify
+import re
+from flask import Blueprint, jsonify, request
 from flask_login import login_required
+from app import analytics_cache
 from app.routes.admin import admin_required
-from app.models import Quiz, Question, UserQuiz, UserAnswer, User
-from sqlalchemy import func, desc
-from datetime import datetime, timedelta
-import json
+from app.services.analytics import AnalyticsService
+from app.services.daily_activity import GRANULARITIES
+
+# Longest ?range= of the activity chart (ten years of monthly points)
+MAX_ACTIVITY_DAYS = 3660
 
 api = Blueprint('api', __name__)
 
+def cached_json(compute, *key_parts):
+    """Respond with an analytics result from the cache shared by this host's workers"""
+    key = ':'.join(str(part) for part in (request.endpoint,) + key_parts)
+    return jsonify(analytics_cache.get_or_compute(key, compute))
+
 @api.route('/quiz-completion-rate')
 @login_required
 @admin_required
 def quiz_completion_rate():
     """API endpoint to get quiz completion rates for chart"""
-    # Get all quizzes
-    quizzes = Quiz.query.all()
-    
-    data = []
-    for quiz in quizzes:
-        # Count total attempts
-        total_attempts = UserQuiz.query.filter_by(quiz_id=quiz.id).count()
-        
-        # Count completed attempts
-        completed_attempts = UserQuiz.query.filter_by(quiz_id=quiz.id).filter(UserQuiz.completed_at.isnot(None)).count()
-        
-        # Calculate completion rate
-        completion_rate = 0
-        if total_attempts > 0:
-            completion_rate = (completed_attempts / total_attempts) * 100
-            
-        data.append({
-            'quiz_title': quiz.title,
-            'completion_rate': round(completion_rate, 1)
-        })
-    
-    return jsonify(data)
+    return cached_json(AnalyticsService.completion_rates)
 
 @api.route('/average-scores')
 @login_required
 @admin_required
 def average_scores():
     """API endpoint to get average scores per quiz"""
-    quizzes = Quiz.query.all()
-    
-    data = []
-    for quiz in quizzes:
-        # Get all completed attempts for this quiz
-        attempts = UserQuiz.query.filter_by(quiz_id=quiz.id).filter(UserQuiz.completed_at.isnot(None)).all()
-        
-        # Calculate average score
-        if attempts:
-            total_score = sum(attempt.score for attempt in attempts)
-            avg_score = total_score / len(attempts)
-            
-            # Get total possible score (number of questions)
-            question_count = Question.query.filter_by(quiz_id=quiz.id).count()
-            
-            # Calculate percentage
-            percentage = 0
-            if question_count > 0:
-                percentage = (avg_score / question_count) * 100
-                
-            data.append({
-                'quiz_title': quiz.title,
-                'avg_score_percentage': round(percentage, 1)
-            })
-    
-    return jsonify(data)
+    return cached_json(AnalyticsService.average_scores)
 
 @api.route('/time-distribution')
 @login_required
 @admin_required
 def time_distribution():
-    """API endpoint to get time distribution for quiz completion"""
-    # Get all completed quizzes
-    completed_quizzes = UserQuiz.query.filter(UserQuiz.completed_at.isnot(None)).all()
-    
-    # Time ranges in minutes
-    time_ranges = {
-        'Under 5 min': 0,
-        '5-10 min': 0,
-        '10-15 min': 0,
-        '15-30 min': 0,
-        'Over 30 min': 0
-    }
-    
-    for quiz in completed_quizzes:
-        # Calculate duration in minutes
-        duration = (quiz.completed_at - quiz.created_at).total_seconds() / 60
-        
-        if duration < 5:
-            time_ranges['Under 5 min'] += 1
-        elif duration < 10:
-            time_ranges['5-10 min'] += 1
-        elif duration < 15:
-            time_ranges['10-15 min'] += 1
-        elif duration < 30:
-            time_ranges['15-30 min'] += 1
-        else:
-            time_ranges['Over 30 min'] += 1
-    
-    # Format data for chart
-    data = [
-        {'range': key, 'count': value}
-        for key, value in time_ranges.items()
-    ]
-    
-    return jsonify(data)
+    """API endpoint to get time distribution for quiz completion (?edges=5,10 in minutes, ?quiz_id=)"""
+    edges = None
+    if request.args.get('edges'):
+        try:
+            edges = [float(edge) for edge in request.args['edges'].split(',')]
+        except ValueError:
+            edges = None
+        if not edges or any(not edge > 0 for edge in edges):
+            return jsonify({'error': 'edges must be positive numbers of minutes'}), 400
+    quiz_id = request.args.get('quiz_id', type=int)
+    if edges:
+        edges = sorted(set(edges))
+    return cached_json(lambda: AnalyticsService.time_distribution(edges=edges, quiz_id=quiz_id), edges, quiz_id)
+
+@api.route('/time-percentiles')
+@login_required
+@admin_required
+def time_percentiles():
+    """API endpoint to get p50/p90/p99 completion times, optionally of one quiz (?quiz_id=)"""
+    quiz_id = request.args.get('quiz_id', type=int)
+    return cached_json(lambda: AnalyticsService.time_percentiles(quiz_id=quiz_id), quiz_id)
 
 @api.route('/user-performance')
 @login_required
 @admin_required
 def user_performance():
-    """API endpoint to get top 10 users by average score"""
-    # Get users with completed quizzes
-    users = User.query.join(UserQuiz).filter(UserQuiz.completed_at.isnot(None)).distinct().all()
-    
-    user_data = []
-    for user in users:
-        # Get all completed quizzes for this user
-        completed_quizzes = UserQuiz.query.filter_by(user_id=user.id).filter(UserQuiz.completed_at.isnot(None)).all()
-        
-        if completed_quizzes:
-            # Calculate average score percentage
-            total_percentage = 0
-            for quiz in completed_quizzes:
-                question_count = Question.query.filter_by(quiz_id=quiz.quiz_id).count()
-                if question_count > 0:
-                    percentage = (quiz.score / question_count) * 100
-                    total_percentage += percentage
-            
-            avg_percentage = total_percentage / len(completed_quizzes)
-            
-            user_data.append({
-                'username': user.username,
-                'avg_score': round(avg_percentage, 1),
-                'quizzes_taken': len(completed_quizzes)
-            })
-    
-    # Sort by average score and get top 10
-    user_data.sort(key=lambda x: x['avg_score'], reverse=True)
-    top_users = user_data[:10]
-    
-    return jsonify(top_users)
+    """
+    API endpoint to get top 10 users by average score, optionally on one quiz (?quiz_id=)
+    
+    Averages are kept up to date as attempts complete, using the quiz's
+    question count at completion time. Quizzes are only given questions
+    when they are imported, so the count of a quiz with attempts does not
+    change in the app; after editing questions of such a quiz directly in
+    the database, run 'flask stats leaderboard --quiz-id <id>'.
+    """
+    quiz_id = request.args.get('quiz_id', type=int)
+    return cached_json(lambda: AnalyticsService.top_users(limit=10, quiz_id=quiz_id), quiz_id)
 
 @api.route('/activity-over-time')
 @login_required
 @admin_required
 def activity_over_time():
-    """API endpoint to get quiz activity over time (last 30 days)"""
-    # Get date 30 days ago
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    
-    # Get all quiz attempts in the last 30 days
-    recent_attempts = UserQuiz.query.filter(UserQuiz.created_at >= thirty_days_ago).all()
-    
-    # Group by day
-    daily_counts = {}
-    for attempt in recent_attempts:
-        day = attempt.created_at.strftime('%Y-%m-%d')
-        if day not in daily_counts:
-            daily_counts[day] = 0
-        daily_counts[day] += 1
-    
-    # Fill in missing days
-    current_date = thirty_days_ago
-    end_date = datetime.now()
-    all_days = {}
-    
-    while current_date <= end_date:
-        day_str = current_date.strftime('%Y-%m-%d')
-        all_days[day_str] = daily_counts.get(day_str, 0)
-        current_date += timedelta(days=1)
-    
-    # Format for chart
-    data = [
-        {'date': key, 'attempts': value}
-        for key, value in all_days.items()
-    ]
-    
-    return jsonify(data)
+    """API endpoint to get quiz activity over time (?range=30d, ?granularity=day|week|month, ?quiz_id=)"""
+    match = re.fullmatch(r'(\d+)d', request.args.get('range', '30d'))
+    days = int(match.group(1)) if match else 0
+    if not 0 < days <= MAX_ACTIVITY_DAYS:
+        return jsonify({'error': f'range must be between 1d and {MAX_ACTIVITY_DAYS}d'}), 400
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f'granularity must be one of {", ".join(GRANULARITIES)}'}), 400
+    quiz_id = request.args.get('quiz_id', type=int)
+    return cached_json(lambda: AnalyticsService.activity_over_time(days=days, granularity=granularity, quiz_id=quiz_id),
+                       days, granularity, quiz_id)
+
+@api.route('/cache-stats')
+@login_required
+@admin_required
+def cache_stats():
+    """API endpoint to get the hit/miss counters of the shared analytics cache"""
+    return jsonify(analytics_cache.stats())
@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort, session
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort, session, make_response
 from flask_login import login_required, current_user
 from app import db
 from app.models import Quiz, Question, Option, UserQuiz, UserAnswer, User
 from app.services.quiz_service import QuizService
+from app.services.answer_key_cache import AnswerKeyCache
+from app.services.quiz_snapshot import QuizSnapshotCache, QuestionBlockCache
+from app.services.quiz_catalog import QuizCatalog
+from app.utils.http_cache import make_etag, page_etag, not_modified, add_validators
+from app.utils.pagination import page_args
 import logging
 
 # Set up logging
@@ -14,26 +19,13 @@ quiz = Blueprint('quiz', __name__)
 @login_required
 def list_quizzes():
     """Display a list of available quizzes"""
-    # Debug authentication status
-    logging.debug(f"User authenticated: {current_user.is_authenticated}")
-    logging.debug(f"User ID: {current_user.id}")
-    logging.debug(f"User name: {current_user.username}")
-    logging.debug(f"Session data: {session}")
-    
-    # Verify user exists in database
-    user_in_db = User.query.get(current_user.id)
-    logging.debug(f"User found in database: {user_in_db is not None}")
-    
     # For admin users, show all quizzes. For regular users, only show live quizzes
-    quizzes = Quiz.query.all()
+    cursor, limit = page_args()
+    page = QuizCatalog.page(cursor, limit, live_only=not current_user.is_admin)
     
-    # If not admin, filter out quizzes that aren't live
-    if not current_user.is_admin:
-        quizzes = [quiz for quiz in quizzes if quiz.is_live_safe]
+    logging.debug(f"Found {len(page)} quizzes")
     
-    logging.debug(f"Found {len(quizzes)} quizzes")
-    
-    return render_template('quiz/list.html', quizzes=quizzes, user=current_user)
+    return render_template('quiz/list.html', quizzes=page.items, page=page, user=current_user)
 
 @quiz.route('/quizzes/<int:quiz_id>')
 @login_required
@@ -44,7 +36,13 @@ def view_quiz(quiz_id):
         flash('Quiz not found.')
         return redirect(url_for('quiz.list_quizzes'))
     
-    return render_template('quiz/view.html', quiz=quiz)
+    etag = page_etag('quiz.view_quiz', quiz.id, quiz.version, quiz.updated_at)
+    cached = not_modified(etag, 'page')
+    if cached:
+        return cached
+    
+    response = make_response(render_template('quiz/view.html', quiz=quiz))
+    return add_validators(response, etag, 'page')
 
 @quiz.route('/quizzes/<int:quiz_id>/start')
 @login_required
@@ -67,7 +65,7 @@ def start_quiz(quiz_id):
 def take_quiz(user_quiz_id):
     """Take a quiz"""
     logging.debug(f"Accessing take_quiz with user_quiz_id: {user_quiz_id}")
-    user_quiz = UserQuiz.query.get(user_quiz_id)
+    user_quiz = QuizService.get_user_quiz(user_quiz_id)
     
     # Check if the quiz belongs to the current user
     if not user_quiz:
@@ -114,20 +112,21 @@ def take_quiz(user_quiz_id):
             QuizService.complete_quiz(user_quiz.id)
             return redirect(url_for('quiz.quiz_result', user_quiz_id=user_quiz.id))
     
-    questions = Question.query.filter_by(quiz_id=quiz.id).all()
-    logging.debug(f"Found {len(questions)} questions for quiz {quiz.id}")
+    # The question markup is rendered once per quiz version and shared
+    questions_html = QuestionBlockCache.get(quiz)
+    question_count = QuizSnapshotCache.get(quiz).question_count
+    logging.debug(f"Found {question_count} questions for quiz {quiz.id}")
     
     # Get user's answers so far
-    user_answers = {}
-    for answer in UserAnswer.query.filter_by(user_quiz_id=user_quiz.id).all():
-        user_answers[answer.question_id] = answer.option_id
+    user_answers = QuizService.get_answer_map(user_quiz.id)
     logging.debug(f"Found {len(user_answers)} existing answers for user_quiz {user_quiz_id}")
     
     logging.debug(f"Rendering take.html template for quiz {quiz.id}")
     return render_template('quiz/take.html', 
                           user_quiz=user_quiz, 
                           quiz=quiz, 
-                          questions=questions, 
+                          questions_html=questions_html, 
+                          question_count=question_count, 
                           user_answers=user_answers)
 
 @quiz.route('/quiz/<int:user_quiz_id>/submit', methods=['POST'])
@@ -165,15 +164,16 @@ def submit_quiz(user_quiz_id):
         if time_elapsed > timedelta(seconds=time_limit_seconds):
             flash('Time limit exceeded. Your answers have been automatically submitted.', 'warning')
     
-    # Process submitted answers
+    # Process submitted answers in a single bulk upsert
+    answers = {}
     for key, value in request.form.items():
         if key.startswith('question_'):
             try:
                 question_id = int(key.split('_')[1])
-                option_id = int(value)
-                QuizService.submit_answer(user_quiz.id, question_id, option_id)
+                answers[question_id] = int(value)
             except (ValueError, IndexError):
                 continue
+    QuizService.submit_answers(user_quiz.id, answers)
     
     # Complete the quiz with immediate score calculation
     result = QuizService.complete_quiz(user_quiz.id)
@@ -194,7 +194,7 @@ def submit_quiz(user_quiz_id):
 @login_required
 def quiz_result(user_quiz_id):
     """Display quiz results"""
-    user_quiz = UserQuiz.query.get(user_quiz_id)
+    user_quiz = QuizService.get_user_quiz(user_quiz_id)
     
     # Check if the quiz belongs to the current user
     if not user_quiz or user_quiz.user_id != current_user.id:
@@ -203,20 +203,13 @@ def quiz_result(user_quiz_id):
     
     # Get all questions for this quiz
     quiz = user_quiz.quiz
-    questions = Question.query.filter_by(quiz_id=quiz.id).all()
+    questions = QuizSnapshotCache.get(quiz).questions
     
     # Get user's answers
-    user_answers = {}
-    for answer in UserAnswer.query.filter_by(user_quiz_id=user_quiz.id).all():
-        user_answers[answer.question_id] = answer.option_id
-    
-    # Get correct answers
-    correct_answers = {}
-    for question in questions:
-        for option in question.options:
-            if option.is_correct:
-                correct_answers[question.id] = option.id
-                break
+    user_answers = QuizService.get_answer_map(user_quiz.id)
+    
+    # Get correct answers from the cached answer key
+    correct_answers = AnswerKeyCache.get(quiz).correct_options
     
     # With our new immediate calculation approach, processing should be false
     # But we'll keep the check for backward compatibility
@@ -235,13 +228,28 @@ def quiz_result(user_quiz_id):
 @login_required
 def api_list_quizzes():
     """API endpoint to get all quizzes"""
-    quizzes = QuizService.get_all_quizzes()
-    return jsonify([{
+    cursor, limit = page_args()
+    etag = make_etag('quiz.api_list_quizzes', cursor, limit, *QuizCatalog.watermark())
+    cached = not_modified(etag, 'api')
+    if cached:
+        return cached
+    
+    page = QuizCatalog.page(cursor, limit)
+    response = jsonify([{
         'id': q.id,
         'title': q.title,
         'description': q.description,
-        'question_count': q.questions.count()
-    } for q in quizzes])
+        'question_count': q.question_count
+    } for q in page])
+    
+    # Neighbouring pages are advertised with an RFC 8288 Link header so the body stays a plain list
+    links = [
+        f'<{url_for("quiz.api_list_quizzes", cursor=page_cursor, limit=limit, _external=True)}>; rel="{rel}"'
+        for rel, page_cursor in (('prev', page.prev_cursor), ('next', page.next_cursor)) if page_cursor
+    ]
+    if links:
+        response.headers['Link'] = ', '.join(links)
+    return add_validators(response, etag, 'api')
 
 @quiz.route('/api/quizzes/<int:quiz_id>')
 @login_required
@@ -251,26 +259,39 @@ def api_get_quiz(quiz_id):
     if not quiz:
         return jsonify({'error': 'Quiz not found'}), 404
     
-    return jsonify({
+    etag = make_etag('quiz.api_get_quiz', quiz.id, quiz.version, quiz.updated_at)
+    cached = not_modified(etag, 'api')
+    if cached:
+        return cached
+    
+    response = jsonify({
         'id': quiz.id,
         'title': quiz.title,
         'description': quiz.description,
-        'questions': [{
-            'id': q.id,
-            'text': q.text,
-            'options': [{
-                'id': o.id,
-                'text': o.text
-            } for o in q.options]
-        } for q in quiz.questions]
+        'questions': QuizSnapshotCache.get(quiz).to_dict()
     })
+    return add_validators(response, etag, 'api')
 
 @quiz.route('/api/quiz/<int:user_quiz_id>/submit-answer', methods=['POST'])
 @login_required
 def api_submit_answer(user_quiz_id):
-    """API endpoint to submit an answer for a question"""
+    """API endpoint to submit an answer for a question
+    
+    Accepts either a single {"question_id", "option_id"} pair or an
+    {"answers": {question_id: option_id, ...}} mapping for several questions.
+    """
     data = request.json
-    if not data or 'question_id' not in data or 'option_id' not in data:
+    if not data:
+        return jsonify({'error': 'Invalid data'}), 400
+    
+    try:
+        if 'answers' in data:
+            answers = {int(q): int(o) for q, o in data['answers'].items()}
+        elif 'question_id' in data and 'option_id' in data:
+            answers = {int(data['question_id']): int(data['option_id'])}
+        else:
+            return jsonify({'error': 'Invalid data'}), 400
+    except (AttributeError, TypeError, ValueError):
         return jsonify({'error': 'Invalid data'}), 400
     
     user_quiz = UserQuiz.query.get(user_quiz_id)
@@ -280,11 +301,10 @@ def api_submit_answer(user_quiz_id):
     if user_quiz.completed_at:
         return jsonify({'error': 'Quiz already completed'}), 400
     
-    question_id = data['question_id']
-    option_id = data['option_id']
-    
-    user_answer = QuizService.submit_answer(user_quiz.id, question_id, option_id)
-    if not user_answer:
+    # Reject the whole batch if any pair is invalid so a failed request
+    # never leaves part of it saved
+    saved = QuizService.submit_answers(user_quiz.id, answers, skip_invalid=False)
+    if not saved:
         return jsonify({'error': 'Invalid question or option'}), 400
     
     return jsonify({'success': True})
@@ -0,0 +1,160 @@
+"""
+Set-based queries behind the admin analytics endpoints.
+"""
+from flask import current_app
+from app import db
+from app.models import Quiz, Question, UserQuiz
+from app.services.quiz_statistics import QuizStatisticsService
+from app.services.leaderboard import LeaderboardService
+from app.services.completion_times import CompletionTimeSketch
+from app.services.daily_activity import DailyActivityService
+from app.utils.sql import duration_seconds
+
+
+def bucket_labels(edges):
+    """Labels of the time buckets delimited by edges (minutes, ascending)"""
+    labels = [f'Under {edges[0]:g} min']
+    labels += [f'{lower:g}-{upper:g} min' for lower, upper in zip(edges, edges[1:])]
+    labels.append(f'Over {edges[-1]:g} min')
+    return labels
+
+
+def _question_counts():
+    """Subquery of (quiz_id, question_count) over the questions table"""
+    return db.session.query(
+        Question.quiz_id.label('quiz_id'),
+        db.func.count(Question.id).label('question_count')
+    ).group_by(Question.quiz_id).subquery()
+
+
+class AnalyticsService:
+    """Aggregates for the analytics dashboard, each computed with a constant number of queries"""
+    
+    @staticmethod
+    def completion_rates():
+        """
+        Get the completion rate of every quiz from the quiz_statistics counters
+        
+        Returns:
+            list: Dicts with quiz_title and completion_rate (percent)
+        """
+        stats = QuizStatisticsService.merged_query()
+        rows = db.session.query(
+            Quiz.title,
+            db.func.coalesce(stats.c.attempts_started, 0).label('started'),
+            db.func.coalesce(stats.c.attempts_completed, 0).label('completed')
+        ).outerjoin(stats, stats.c.quiz_id == Quiz.id).order_by(Quiz.id).all()
+        
+        return [{
+            'quiz_title': row.title,
+            'completion_rate': round(int(row.completed) / int(row.started) * 100 if row.started else 0, 1)
+        } for row in rows]
+    
+    @staticmethod
+    def average_scores():
+        """
+        Get the average score percentage of every quiz with completed attempts
+        
+        Averages come from the quiz_statistics counters; the number of
+        questions is counted from the questions table.
+        
+        Returns:
+            list: Dicts with quiz_title and avg_score_percentage
+        """
+        stats = QuizStatisticsService.merged_query()
+        question_counts = _question_counts()
+        rows = db.session.query(
+            Quiz.title,
+            stats.c.score_sum,
+            stats.c.attempts_completed,
+            db.func.coalesce(question_counts.c.question_count, 0).label('question_count')
+        ).join(stats, stats.c.quiz_id == Quiz.id).outerjoin(
+            question_counts, question_counts.c.quiz_id == Quiz.id
+        ).filter(stats.c.attempts_completed > 0).order_by(Quiz.id).all()
+        
+        data = []
+        for row in rows:
+            avg_score = int(row.score_sum) / int(row.attempts_completed)
+            percentage = avg_score / row.question_count * 100 if row.question_count > 0 else 0
+            data.append({
+                'quiz_title': row.title,
+                'avg_score_percentage': round(percentage, 1)
+            })
+        return data
+    
+    @staticmethod
+    def time_distribution(edges=None, quiz_id=None):
+        """
+        Count completed attempts per completion time bucket
+        
+        Args:
+            edges (list): Bucket edges in minutes (defaults to TIME_DISTRIBUTION_EDGES)
+            quiz_id (int): Only count attempts of this quiz (None counts all quizzes)
+            
+        Returns:
+            list: Dicts with range and count, in bucket order
+        """
+        edges = sorted(set(edges or current_app.config['TIME_DISTRIBUTION_EDGES']))
+        duration = duration_seconds(UserQuiz.created_at, UserQuiz.completed_at)
+        bucket = db.case(
+            *[(duration < edge * 60, index) for index, edge in enumerate(edges)],
+            else_=len(edges)
+        ).label('bucket')
+        
+        query = db.session.query(bucket, db.func.count(UserQuiz.id)).filter(
+            UserQuiz.completed_at.isnot(None)
+        )
+        if quiz_id is not None:
+            query = query.filter(UserQuiz.quiz_id == quiz_id)
+        counts = dict(query.group_by(bucket).all())
+        
+        return [{'range': label, 'count': counts.get(index, 0)}
+                for index, label in enumerate(bucket_labels(edges))]
+    
+    @staticmethod
+    def time_percentiles(quiz_id=None):
+        """
+        Get p50/p90/p99 completion times from the maintained sketches
+        
+        Args:
+            quiz_id (int): ID of the quiz (None covers all quizzes)
+            
+        Returns:
+            dict: quiz_id, count and p50/p90/p99 in seconds
+        """
+        return CompletionTimeSketch.percentiles(quiz_id)
+    
+    @staticmethod
+    def top_users(limit=10, quiz_id=None):
+        """
+        Get the users with the best average score percentage
+        
+        Read from the maintained leaderboard rows, so the cost does not
+        grow with the number of users or attempts.
+        
+        Args:
+            limit (int): Number of users to return
+            quiz_id (int): Rank attempts of this quiz only (None ranks all quizzes)
+            
+        Returns:
+            list: Dicts with username, avg_score and quizzes_taken
+        """
+        return LeaderboardService.top(limit=limit, quiz_id=quiz_id)
+    
+    @staticmethod
+    def activity_over_time(days=30, granularity='day', quiz_id=None):
+        """
+        Count attempts started and completed per UTC day, week or month
+        
+        Read from the daily_activity rollup, so a year of daily points
+        groups at most 365 rows per quiz.
+        
+        Args:
+            days (int): Number of days to cover, ending today
+            granularity (str): 'day', 'week' or 'month'
+            quiz_id (int): Only count this quiz (None counts all quizzes)
+            
+        Returns:
+            list: Dicts with date (YYYY-MM-DD), attempts, completions and average_score, one per period
+        """
+        return DailyActivityService.series(days=days, granularity=granularity, quiz_id=quiz_id)
@@ -0,0 +1,96 @@
+"""
+Process-local cache of quiz answer keys.
+"""
+from collections import namedtuple
+from flask import current_app
+from app import db
+from app.models import Question, Option
+from app.utils.cache import VersionedLRUCache
+
+
+class AnswerKey(namedtuple('AnswerKey', ['quiz_id', 'version', 'correct_options', 'question_count'])):
+    """
+    Compact answer key: question_id -> frozenset of correct option_ids plus the number of questions
+    
+    An answer is correct if it selects any of its question's correct
+    options, the same rule as ScoringService.correct_answer_count().
+    """
+    __slots__ = ()
+    
+    def score(self, answer_map):
+        """
+        Count the correct answers of an attempt
+        
+        Args:
+            answer_map (dict): Mapping of question_id to selected option_id
+            
+        Returns:
+            int: Number of correctly answered questions
+        """
+        return sum(1 for question_id, correct_option_ids in self.correct_options.items()
+                   if answer_map.get(question_id) in correct_option_ids)
+
+
+class AnswerKeyCache:
+    """
+    Versioned, size-bounded LRU cache of answer keys keyed by quiz_id
+    
+    Entries are stored together with Quiz.version, which is bumped whenever
+    a quiz's questions or options change, so a lookup made with the current
+    version never returns a stale key even if the change happened in another
+    worker process.
+    """
+    _cache = None
+    
+    @classmethod
+    def _entries(cls):
+        if cls._cache is None:
+            cls._cache = VersionedLRUCache(current_app.config.get('ANSWER_KEY_CACHE_SIZE', 256))
+        return cls._cache
+    
+    @classmethod
+    def get(cls, quiz):
+        """
+        Get the answer key for a quiz, loading it on a miss
+        
+        Args:
+            quiz (Quiz): Quiz object (only id and version are used)
+            
+        Returns:
+            AnswerKey: Answer key for the current version of the quiz
+        """
+        entries = cls._entries()
+        answer_key = entries.get(quiz.id, quiz.version)
+        if answer_key is None:
+            answer_key = cls._load(quiz.id, quiz.version)
+            entries.put(quiz.id, quiz.version, answer_key)
+        return answer_key
+    
+    @classmethod
+    def invalidate(cls, quiz_id):
+        """Drop the cached answer key of a quiz"""
+        if cls._cache is not None:
+            cls._cache.invalidate(quiz_id)
+    
+    @classmethod
+    def clear(cls):
+        """Drop all cached answer keys"""
+        if cls._cache is not None:
+            cls._cache.clear()
+    
+    @staticmethod
+    def _load(quiz_id, version):
+        # A single query returns every question with each of its correct options (if any)
+        rows = db.session.query(Question.id, Option.id).outerjoin(
+            Option, db.and_(Option.question_id == Question.id, Option.is_correct == True)
+        ).filter(Question.quiz_id == quiz_id).all()
+        
+        correct_options = {}
+        question_ids = set()
+        for question_id, option_id in rows:
+            question_ids.add(question_id)
+            if option_id is not None:
+                correct_options.setdefault(question_id, set()).add(option_id)
+        
+        correct_options = {question_id: frozenset(option_ids) for question_id, option_ids in correct_options.items()}
+        return AnswerKey(quiz_id, version, correct_options, len(question_ids))
@@ -0,0 +1,66 @@
+"""
+Fan-out of attempt lifecycle changes to the maintained read models.
+"""
+from collections import namedtuple
+from app.services.quiz_statistics import QuizStatisticsService
+from app.services.leaderboard import LeaderboardService
+from app.services.completion_times import CompletionTimeSketch
+from app.services.daily_activity import DailyActivityService
+from app.utils.sql import lock_quiz_aggregates
+
+# Same fields as the rows returned by ScoringService.complete_attempts
+CompletedAttempt = namedtuple('CompletedAttempt', ['user_id', 'quiz_id', 'score', 'created_at', 'completed_at'])
+
+
+class AttemptEvents:
+    """
+    Single entry point for code that starts, completes or rescores attempts
+    
+    started() and completed() only stage writes in the current session so
+    that the aggregates commit (or roll back) together with the attempt
+    change; the caller commits. They hold shared aggregate locks until
+    then, so the rebuilds behind rescored() cannot lose their writes (see
+    lock_quiz_aggregates).
+    """
+    
+    @staticmethod
+    def started(quiz_id, started_at):
+        """
+        Record a started attempt
+        
+        Args:
+            quiz_id (int): ID of the quiz
+            started_at (datetime): UTC start time of the attempt (UserQuiz.created_at)
+        """
+        lock_quiz_aggregates([quiz_id])
+        QuizStatisticsService.record_started(quiz_id)
+        DailyActivityService.record_started(quiz_id, started_at)
+    
+    @staticmethod
+    def completed(attempts):
+        """
+        Record completed attempts
+        
+        Args:
+            attempts (iterable): CompletedAttempt tuples or rows with the same fields
+        """
+        attempts = list(attempts)
+        if not attempts:
+            return
+        lock_quiz_aggregates({attempt.quiz_id for attempt in attempts})
+        QuizStatisticsService.record_completed((attempt.quiz_id, attempt.score) for attempt in attempts)
+        LeaderboardService.record_completed(attempts)
+        CompletionTimeSketch.record_completed(attempts)
+        DailyActivityService.record_completed(attempts)
+    
+    @staticmethod
+    def rescored(quiz_id):
+        """
+        Rebuild the aggregates of a quiz whose attempt scores were changed in bulk (commits)
+        
+        Args:
+            quiz_id (int): ID of the quiz
+        """
+        QuizStatisticsService.reconcile(quiz_id)
+        LeaderboardService.rebuild(quiz_id)
+        DailyActivityService.rebuild(quiz_id=quiz_id)
@@ -0,0 +1,80 @@
+"""
+Background finalization of expired and abandoned quiz attempts.
+"""
+import logging
+from datetime import datetime, timedelta
+from app import db
+from app.models import Quiz, UserQuiz
+from app.services.scoring import ScoringService
+from app.services.attempt_events import AttemptEvents
+
+
+class AttemptSweeper:
+    """Service for closing quiz attempts that will never be submitted"""
+    
+    @staticmethod
+    def sweep(batch_size=500, grace_seconds=60, abandon_after_hours=24, now=None):
+        """
+        Finalize expired timed attempts and abandoned untimed attempts
+        
+        Open attempts are found per quiz through the partial
+        (quiz_id, created_at) WHERE completed_at IS NULL index and closed in
+        batches with set-based scoring, one UPDATE ... RETURNING per batch.
+        
+        Args:
+            batch_size (int): Maximum number of attempts closed per statement
+            grace_seconds (int): Extra time granted after a quiz's time limit
+            abandon_after_hours (int): Age after which untimed attempts are closed
+            now (datetime): Reference time (defaults to now)
+            
+        Returns:
+            dict: Number of expired and abandoned attempts closed, the quiz IDs
+                  touched and the number of batches
+        """
+        now = now or datetime.utcnow()
+        summary = {'expired': 0, 'abandoned': 0, 'closed': 0, 'batches': 0, 'quiz_ids': []}
+        
+        for quiz_id, time_limit in db.session.query(Quiz.id, Quiz.time_limit).all():
+            if time_limit:
+                cutoff = now - timedelta(minutes=time_limit, seconds=grace_seconds)
+                kind = 'expired'
+            else:
+                cutoff = now - timedelta(hours=abandon_after_hours)
+                kind = 'abandoned'
+            
+            closed = AttemptSweeper._close_open_attempts(quiz_id, cutoff, batch_size, now, summary)
+            if closed:
+                summary[kind] += closed
+                summary['quiz_ids'].append(quiz_id)
+        
+        summary['closed'] = summary['expired'] + summary['abandoned']
+        logging.info(f"Attempt sweeper closed {summary['closed']} attempts "
+                     f"({summary['expired']} expired, {summary['abandoned']} abandoned) "
+                     f"in {summary['batches']} batches")
+        return summary
+    
+    @staticmethod
+    def _close_open_attempts(quiz_id, cutoff, batch_size, now, summary):
+        closed = 0
+        while True:
+            attempt_ids = [row.id for row in db.session.query(UserQuiz.id).filter(
+                UserQuiz.quiz_id == quiz_id,
+                UserQuiz.completed_at.is_(None),
+                UserQuiz.created_at < cutoff
+            ).limit(batch_size).all()]
+            if not attempt_ids:
+                return closed
+            
+            try:
+                rows = ScoringService.complete_attempts(attempt_ids, completed_at=now)
+                AttemptEvents.completed(rows)
+                db.session.commit()
+            except Exception as e:
+                logging.error(f"Error closing attempts of quiz {quiz_id}: {str(e)}")
+                db.session.rollback()
+                raise
+            
+            closed += len(rows)
+            summary['batches'] += 1
+            if len(attempt_ids) < batch_size:
+                return closed
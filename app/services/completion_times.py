@@ -0,0 +1,164 @@
+"""
+Mergeable per-quiz sketches of attempt completion times.
+"""
+import math
+import logging
+from collections import Counter
+import numpy as np
+from app import db
+from app.models import CompletionTimeBucket, UserQuiz
+from app.utils.sql import upsert, duration_seconds, lock_quiz_aggregates
+
+# Durations are counted in log-spaced buckets: bucket i holds durations in
+# (GAMMA ** (i - 1), GAMMA ** i] seconds, so any percentile read back from
+# the counts is within RELATIVE_ACCURACY of the exact value
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+# Durations are clamped to [1 second, 1 year], about 430 buckets per quiz at most
+MAX_BUCKET = math.ceil(math.log(366 * 86400) / _LOG_GAMMA)
+
+PERCENTILES = (50, 90, 99)
+
+
+def bucket_index(seconds):
+    """Index of the bucket holding a duration in seconds"""
+    if seconds is None or seconds <= 1:
+        return 0
+    return min(MAX_BUCKET, math.ceil(math.log(seconds) / _LOG_GAMMA))
+
+
+def bucket_value(index):
+    """Representative duration in seconds of a bucket (relative error of at most RELATIVE_ACCURACY)"""
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class CompletionTimeSketch:
+    """
+    Service for the completion_time_buckets log-histograms
+    
+    Each quiz has one row per non-empty bucket, incremented in the same
+    transaction as the completion. Histograms merge by adding counts, so
+    the sketch of several quizzes (or of all of them) is a GROUP BY over
+    at most a few hundred rows per quiz, and percentiles never scan the
+    attempts.
+    """
+    
+    @staticmethod
+    def record_completed(attempts):
+        """
+        Add completed attempts to the sketches (the caller commits)
+        
+        Args:
+            attempts (iterable): Rows with quiz_id, created_at and completed_at, e.g.
+                                 the rows returned by ScoringService.complete_attempts
+        """
+        counts = Counter()
+        for attempt in attempts:
+            if attempt.created_at is None or attempt.completed_at is None:
+                continue
+            seconds = (attempt.completed_at - attempt.created_at).total_seconds()
+            counts[attempt.quiz_id, bucket_index(seconds)] += 1
+        
+        if counts:
+            # Sorted rows keep the lock order fixed across concurrent batches
+            CompletionTimeSketch._increment([
+                {'quiz_id': quiz_id, 'bucket': bucket, 'count': count}
+                for (quiz_id, bucket), count in sorted(counts.items())
+            ])
+    
+    @staticmethod
+    def _increment(rows):
+        table = CompletionTimeBucket.__table__
+        stmt = upsert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['quiz_id', 'bucket'],
+            set_={'count': table.c.count + stmt.excluded.count}
+        )
+        db.session.execute(stmt, rows)
+    
+    @staticmethod
+    def percentiles(quiz_id=None, percentiles=PERCENTILES):
+        """
+        Get completion time percentiles from the merged sketches
+        
+        Args:
+            quiz_id (int): ID of the quiz (None merges the sketches of all quizzes)
+            percentiles (tuple): Percentiles to compute, between 0 and 100
+        
+        Returns:
+            dict: count plus p<N> (seconds, None without completions) per percentile
+        """
+        query = db.session.query(
+            CompletionTimeBucket.bucket, db.func.sum(CompletionTimeBucket.count)
+        )
+        if quiz_id is not None:
+            query = query.filter(CompletionTimeBucket.quiz_id == quiz_id)
+        histogram = [(bucket, int(count)) for bucket, count in
+                     query.group_by(CompletionTimeBucket.bucket).order_by(CompletionTimeBucket.bucket)]
+        
+        total = sum(count for _, count in histogram)
+        result = {'quiz_id': quiz_id, 'count': total}
+        for percentile in percentiles:
+            result[f'p{percentile:g}'] = None
+            if not total:
+                continue
+            rank = percentile / 100 * (total - 1)
+            seen = 0
+            for bucket, count in histogram:
+                seen += count
+                if seen > rank:
+                    result[f'p{percentile:g}'] = round(bucket_value(bucket), 1)
+                    break
+        return result
+    
+    @staticmethod
+    def rebuild(quiz_id=None, chunk_size=10000):
+        """
+        Rebuild the sketches from the completed attempts, then commit
+        
+        Args:
+            quiz_id (int): ID of the quiz to rebuild (None rebuilds every quiz)
+            chunk_size (int): Attempts bucketed per NumPy pass
+        
+        Returns:
+            int: Number of completed attempts counted
+        """
+        table = CompletionTimeBucket.__table__
+        query = db.select(
+            UserQuiz.quiz_id, duration_seconds(UserQuiz.created_at, UserQuiz.completed_at)
+        ).where(UserQuiz.completed_at.isnot(None)).execution_options(stream_results=True, yield_per=chunk_size)
+        delete = table.delete()
+        if quiz_id is not None:
+            query = query.where(UserQuiz.quiz_id == quiz_id)
+            delete = delete.where(table.c.quiz_id == quiz_id)
+        
+        try:
+            lock_quiz_aggregates(None if quiz_id is None else [quiz_id], exclusive=True)
+            counts = Counter()
+            for chunk in db.session.execute(query).partitions():
+                quiz_ids = np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk))
+                seconds = np.fromiter((float(row[1] or 0) for row in chunk), dtype=np.float64, count=len(chunk))
+                buckets = np.clip(np.ceil(np.log(np.maximum(seconds, 1)) / _LOG_GAMMA), 0, MAX_BUCKET)
+                pairs, pair_counts = np.unique(
+                    np.stack([quiz_ids, buckets.astype(np.int64)], axis=1), axis=0, return_counts=True
+                )
+                for (chunk_quiz_id, bucket), count in zip(pairs.tolist(), pair_counts.tolist()):
+                    counts[chunk_quiz_id, bucket] += count
+            
+            db.session.execute(delete)
+            if counts:
+                db.session.execute(table.insert(), [
+                    {'quiz_id': chunk_quiz_id, 'bucket': bucket, 'count': count}
+                    for (chunk_quiz_id, bucket), count in sorted(counts.items())
+                ])
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error rebuilding completion time sketches: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        attempts = sum(counts.values())
+        logging.info(f"Rebuilt completion time sketches from {attempts} attempts")
+        return attempts
+
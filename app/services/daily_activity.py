@@ -0,0 +1,255 @@
+"""
+Per-quiz daily activity rollup.
+"""
+import random
+import logging
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from flask import current_app
+from app import db
+from app.models import DailyActivity, UserQuiz
+from app.utils.sql import upsert, truncate_to_day, lock_quiz_aggregates
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def _as_date(value):
+    # truncate_to_day() gives a date on PostgreSQL and an ISO string on SQLite
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def period_start(day, granularity):
+    """First day of the day, ISO week (Monday) or month containing day"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+class DailyActivityService:
+    """
+    Service for the daily_activity rollup
+    
+    Starts are counted on the UTC day of UserQuiz.created_at and completions
+    (with their score) on the UTC day of completed_at, each with an
+    INSERT ... ON CONFLICT onto one of DAILY_ACTIVITY_SHARDS rows in the
+    same transaction as the attempt change. The nightly compact() merges
+    the shard rows of past days into one row per quiz and day, so a chart
+    over N days groups at most N rows per quiz.
+    """
+    
+    @staticmethod
+    def record_started(quiz_id, started_at):
+        """
+        Count a started attempt (the caller commits)
+        
+        Args:
+            quiz_id (int): ID of the quiz
+            started_at (datetime): UTC start time of the attempt
+        """
+        DailyActivityService._increment([{
+            'day': started_at.date(),
+            'quiz_id': quiz_id,
+            'attempts_started': 1,
+            'attempts_completed': 0,
+            'score_sum': 0
+        }])
+    
+    @staticmethod
+    def record_completed(attempts):
+        """
+        Count completed attempts (the caller commits)
+        
+        Args:
+            attempts (iterable): Rows with quiz_id, score and completed_at, e.g. the
+                                 rows returned by ScoringService.complete_attempts
+        """
+        completed = Counter()
+        score_sums = Counter()
+        for attempt in attempts:
+            key = (attempt.completed_at.date(), attempt.quiz_id)
+            completed[key] += 1
+            score_sums[key] += int(attempt.score or 0)
+        
+        if completed:
+            DailyActivityService._increment([{
+                'day': day,
+                'quiz_id': quiz_id,
+                'attempts_started': 0,
+                'attempts_completed': completed[day, quiz_id],
+                'score_sum': score_sums[day, quiz_id]
+            } for day, quiz_id in completed])
+    
+    @staticmethod
+    def _increment(rows):
+        shards = max(1, current_app.config.get('DAILY_ACTIVITY_SHARDS', 4))
+        for row in rows:
+            row['shard'] = random.randrange(shards)
+        # A fixed lock order keeps multi-quiz batches from deadlocking each other
+        rows.sort(key=lambda row: (row['day'], row['quiz_id'], row['shard']))
+        
+        table = DailyActivity.__table__
+        stmt = upsert(table)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['day', 'quiz_id', 'shard'],
+            set_={
+                'attempts_started': table.c.attempts_started + excluded.attempts_started,
+                'attempts_completed': table.c.attempts_completed + excluded.attempts_completed,
+                'score_sum': table.c.score_sum + excluded.score_sum
+            }
+        )
+        db.session.execute(stmt, rows)
+    
+    @staticmethod
+    def series(days=30, granularity='day', quiz_id=None):
+        """
+        Get activity per day, week or month over the last days (UTC)
+        
+        Args:
+            days (int): Number of days to cover, ending today
+            granularity (str): 'day', 'week' or 'month'
+            quiz_id (int): Only count this quiz (None counts all quizzes)
+        
+        Returns:
+            list: Dicts with date (first day of the period, YYYY-MM-DD), attempts
+                  (started), completions and average_score, one per period
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f'Unknown granularity {granularity!r}')
+        
+        today = datetime.utcnow().date()
+        start = today - timedelta(days=days - 1)
+        query = db.session.query(
+            DailyActivity.day,
+            db.func.sum(DailyActivity.attempts_started),
+            db.func.sum(DailyActivity.attempts_completed),
+            db.func.sum(DailyActivity.score_sum)
+        ).filter(DailyActivity.day.between(start, today))
+        if quiz_id is not None:
+            query = query.filter(DailyActivity.quiz_id == quiz_id)
+        daily = {_as_date(day): (int(started), int(completed), int(score_sum))
+                 for day, started, completed, score_sum in query.group_by(DailyActivity.day)}
+        
+        # Every period is present, including empty ones
+        periods = {}
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            totals = periods.setdefault(period_start(day, granularity), [0, 0, 0])
+            for index, value in enumerate(daily.get(day, (0, 0, 0))):
+                totals[index] += value
+        
+        return [{
+            'date': period.isoformat(),
+            'attempts': started,
+            'completions': completed,
+            'average_score': round(score_sum / completed, 2) if completed else None
+        } for period, (started, completed, score_sum) in periods.items()]
+    
+    @staticmethod
+    def compact(days=7):
+        """
+        Merge the shard rows of the past days into one row per quiz and day, then commit
+        
+        Today's rows are left alone since they are still being written. Days
+        further back than the look-back window are assumed to be compacted
+        already by earlier runs.
+        
+        Args:
+            days (int): Number of past days to compact
+        
+        Returns:
+            int: Number of (day, quiz) rows after compaction
+        """
+        table = DailyActivity.__table__
+        today = datetime.utcnow().date()
+        window = db.and_(table.c.day >= today - timedelta(days=days), table.c.day < today)
+        
+        try:
+            merged = db.session.execute(db.select(
+                table.c.day,
+                table.c.quiz_id,
+                db.literal(0).label('shard'),
+                db.func.sum(table.c.attempts_started).label('attempts_started'),
+                db.func.sum(table.c.attempts_completed).label('attempts_completed'),
+                db.func.sum(table.c.score_sum).label('score_sum')
+            ).where(window).group_by(table.c.day, table.c.quiz_id)).mappings().all()
+            
+            db.session.execute(table.delete().where(window))
+            if merged:
+                db.session.execute(table.insert(), [dict(row) for row in merged])
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error compacting daily activity: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        logging.info(f"Compacted daily activity of the last {days} days into {len(merged)} rows")
+        return len(merged)
+    
+    @staticmethod
+    def rebuild(since=None, quiz_id=None):
+        """
+        Rebuild the rollup from user_quizzes, then commit
+        
+        Args:
+            since (date): First UTC day to rebuild (None rebuilds every day)
+            quiz_id (int): ID of the quiz to rebuild (None rebuilds every quiz)
+        
+        Returns:
+            int: Number of (day, quiz) rows written
+        """
+        started_day = truncate_to_day(UserQuiz.created_at).label('day')
+        started = db.session.query(
+            started_day, UserQuiz.quiz_id, db.func.count(UserQuiz.id)
+        ).filter(UserQuiz.created_at.isnot(None))
+        
+        completed_day = truncate_to_day(UserQuiz.completed_at).label('day')
+        completed = db.session.query(
+            completed_day, UserQuiz.quiz_id, db.func.count(UserQuiz.id),
+            db.func.coalesce(db.func.sum(UserQuiz.score), 0)
+        ).filter(UserQuiz.completed_at.isnot(None))
+        
+        table = DailyActivity.__table__
+        delete = table.delete()
+        if since is not None:
+            since_time = datetime.combine(since, time.min)
+            started = started.filter(UserQuiz.created_at >= since_time)
+            completed = completed.filter(UserQuiz.completed_at >= since_time)
+            delete = delete.where(table.c.day >= since)
+        if quiz_id is not None:
+            started = started.filter(UserQuiz.quiz_id == quiz_id)
+            completed = completed.filter(UserQuiz.quiz_id == quiz_id)
+            delete = delete.where(table.c.quiz_id == quiz_id)
+        
+        rows = {}
+        try:
+            # Recorders must not commit between the reads and the delete
+            lock_quiz_aggregates(None if quiz_id is None else [quiz_id], exclusive=True)
+            for day, row_quiz_id, count in started.group_by(started_day, UserQuiz.quiz_id):
+                rows[_as_date(day), row_quiz_id] = {'attempts_started': count, 'attempts_completed': 0, 'score_sum': 0}
+            for day, row_quiz_id, count, score_sum in completed.group_by(completed_day, UserQuiz.quiz_id):
+                row = rows.setdefault((_as_date(day), row_quiz_id),
+                                      {'attempts_started': 0, 'attempts_completed': 0, 'score_sum': 0})
+                row['attempts_completed'] = count
+                row['score_sum'] = int(score_sum)
+            
+            db.session.execute(delete)
+            if rows:
+                db.session.execute(table.insert(), [
+                    dict(counters, day=day, quiz_id=quiz_id, shard=0)
+                    for (day, quiz_id), counters in sorted(rows.items())
+                ])
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error rebuilding daily activity: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        logging.info(f"Rebuilt {len(rows)} daily activity rows")
+        return len(rows)
@@ -0,0 +1,264 @@
+"""
+Vectorized item analysis (difficulty, discrimination, distractors) per quiz.
+"""
+import time
+import logging
+from itertools import chain
+from datetime import datetime, timedelta
+import numpy as np
+from app import db
+from app.models import Quiz, UserQuiz, UserAnswer, ItemStatistics
+from app.services.answer_key_cache import AnswerKeyCache
+from app.services.quiz_snapshot import QuizSnapshotCache
+from app.services.quiz_regrader import answer_matrix, correct_answers
+
+# Completions newer than this may still be committing and are left for the next run
+SETTLE_SECONDS = 60
+
+
+class ItemAnalysis:
+    """
+    Service computing classic item statistics for the questions of a quiz
+    
+    Completed attempts are loaded in chunks as an attempts x questions
+    matrix of selected option ids, from which every statistic is derived
+    with array operations. Only additive sums are stored, so a rerun adds
+    the attempts completed since the stored watermark instead of starting
+    over, unless the quiz content (and with it the answer key) changed.
+    """
+    
+    @staticmethod
+    def analyze_quiz(quiz_id, chunk_size=20000, full=False):
+        """
+        Compute (or update) the item statistics of a quiz and commit them
+        
+        Args:
+            quiz_id (int): ID of the quiz
+            chunk_size (int): Attempts loaded per chunk
+            full (bool): Ignore the stored sums and analyze every attempt
+        
+        Returns:
+            dict: Summary with the mode, attempt/answer counts and throughput,
+                  or None if the quiz was not found
+        """
+        quiz = db.session.get(Quiz, quiz_id)
+        if not quiz:
+            logging.error(f"Quiz with ID {quiz_id} not found")
+            return None
+        
+        started = time.perf_counter()
+        snapshot = QuizSnapshotCache.get(quiz)
+        answer_key = AnswerKeyCache.get(quiz)
+        question_ids = np.array([question.id for question in snapshot.questions], dtype=np.int64)
+        option_ids = np.array(sorted(option.id for question in snapshot.questions
+                                     for option in question.options), dtype=np.int64)
+        
+        existing = ItemStatistics.query.filter_by(quiz_id=quiz_id).all()
+        incremental = (not full and existing
+                       and {row.question_id for row in existing} == set(question_ids.tolist())
+                       and {(row.quiz_version, row.watermark) for row in existing} == {(quiz.version, existing[0].watermark)})
+        
+        sums = ItemAnalysis._empty_sums(len(question_ids), len(option_ids))
+        since = None
+        if incremental:
+            ItemAnalysis._load_sums(sums, existing, question_ids, option_ids)
+            since = existing[0].watermark
+        until = datetime.utcnow() - timedelta(seconds=SETTLE_SECONDS)
+        
+        attempts = answers = 0
+        if len(question_ids):
+            for attempt_ids in ItemAnalysis._iter_attempt_chunks(quiz_id, since, until, chunk_size):
+                result = db.session.execute(db.select(
+                    UserAnswer.user_quiz_id, UserAnswer.question_id, UserAnswer.option_id
+                ).where(UserAnswer.user_quiz_id.in_(attempt_ids.tolist())))
+                # Flattening the plain tuples is much cheaper than np.array() over Row objects
+                chunk = np.fromiter(chain.from_iterable(result), dtype=np.int64).reshape(-1, 3)
+                matrix = answer_matrix(attempt_ids, question_ids, chunk)
+                ItemAnalysis._add_chunk(sums, matrix, correct_answers(matrix, question_ids, answer_key), option_ids)
+                attempts += len(attempt_ids)
+                answers += len(chunk)
+        
+        ItemAnalysis._store(quiz, snapshot, sums, question_ids, option_ids, until)
+        
+        elapsed = time.perf_counter() - started
+        summary = {
+            'quiz_id': quiz_id,
+            'mode': 'incremental' if incremental else 'full',
+            'attempts': attempts,
+            'answers': answers,
+            'total_attempts': int(sums['attempts']),
+            'seconds': round(elapsed, 3),
+            'answers_per_second': round(answers / elapsed, 1) if elapsed > 0 else 0
+        }
+        logging.info(f"Analyzed items of quiz {quiz_id}: {summary}")
+        return summary
+    
+    @staticmethod
+    def _empty_sums(question_count, option_count):
+        return {
+            'attempts': 0,
+            'score_sum': 0,
+            'score_sq_sum': 0,
+            'correct': np.zeros(question_count, dtype=np.int64),
+            'correct_score_sum': np.zeros(question_count, dtype=np.int64),
+            'option_counts': np.zeros(option_count, dtype=np.int64)
+        }
+    
+    @staticmethod
+    def _load_sums(sums, rows, question_ids, option_ids):
+        # Quiz-level sums are repeated on every row
+        sums['attempts'] = rows[0].attempts
+        sums['score_sum'] = rows[0].score_sum
+        sums['score_sq_sum'] = rows[0].score_sq_sum
+        columns = {question_id: index for index, question_id in enumerate(question_ids.tolist())}
+        for row in rows:
+            sums['correct'][columns[row.question_id]] = row.correct
+            sums['correct_score_sum'][columns[row.question_id]] = row.correct_score_sum
+            for option_id, count in row.option_counts.items():
+                index = np.searchsorted(option_ids, int(option_id))
+                if index < len(option_ids) and option_ids[index] == int(option_id):
+                    sums['option_counts'][index] = count
+    
+    @staticmethod
+    def _iter_attempt_chunks(quiz_id, since, until, chunk_size):
+        # Keyset iteration in completion order over the (quiz_id, completed_at, id) index
+        last = None
+        while True:
+            query = db.session.query(UserQuiz.id, UserQuiz.completed_at).filter(
+                UserQuiz.quiz_id == quiz_id,
+                UserQuiz.completed_at.isnot(None),
+                UserQuiz.completed_at <= until
+            )
+            if since is not None:
+                query = query.filter(UserQuiz.completed_at > since)
+            if last is not None:
+                query = query.filter(db.tuple_(UserQuiz.completed_at, UserQuiz.id) > db.tuple_(*last))
+            rows = query.order_by(UserQuiz.completed_at, UserQuiz.id).limit(chunk_size).all()
+            if not rows:
+                return
+            
+            yield np.sort(np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)))
+            last = (rows[-1].completed_at, rows[-1].id)
+    
+    @staticmethod
+    def _add_chunk(sums, matrix, correct, option_ids):
+        totals = correct.sum(axis=1)
+        sums['attempts'] += len(matrix)
+        sums['score_sum'] += int(totals.sum())
+        sums['score_sq_sum'] += int((totals * totals).sum())
+        sums['correct'] += correct.sum(axis=0)
+        sums['correct_score_sum'] += totals @ correct
+        
+        selected = matrix[matrix > 0]
+        index = np.minimum(np.searchsorted(option_ids, selected), max(len(option_ids) - 1, 0))
+        known = option_ids[index] == selected if len(option_ids) else np.zeros(0, dtype=bool)
+        sums['option_counts'] += np.bincount(index[known], minlength=len(option_ids))
+    
+    @staticmethod
+    def statistics(sums):
+        """
+        Derive difficulty and discrimination from the running sums
+        
+        The point-biserial correlation between answering a question
+        correctly and the attempt's total score is
+        (M1 - M0) / s * sqrt(p * (1 - p)), with M1/M0 the mean total score
+        of attempts that did / did not answer it correctly and s the
+        (population) standard deviation of the total scores.
+        
+        Args:
+            sums (dict): Running sums (see _empty_sums)
+        
+        Returns:
+            tuple: (p_values, point_biserials) arrays, NaN where undefined
+        """
+        attempts = sums['attempts']
+        correct = sums['correct'].astype(np.float64)
+        if attempts == 0:
+            undefined = np.full(len(correct), np.nan)
+            return undefined, undefined.copy()
+        
+        p_values = correct / attempts
+        mean = sums['score_sum'] / attempts
+        stddev = np.sqrt(max(0.0, sums['score_sq_sum'] / attempts - mean * mean))
+        incorrect = attempts - correct
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_correct = sums['correct_score_sum'] / correct
+            mean_incorrect = (sums['score_sum'] - sums['correct_score_sum']) / incorrect
+            point_biserials = (mean_correct - mean_incorrect) / stddev * np.sqrt(p_values * (1 - p_values))
+        point_biserials[(correct == 0) | (incorrect == 0) | (stddev == 0)] = np.nan
+        return p_values, point_biserials
+    
+    @staticmethod
+    def _store(quiz, snapshot, sums, question_ids, option_ids, watermark):
+        p_values, point_biserials = ItemAnalysis.statistics(sums)
+        option_index = {option_id: index for index, option_id in enumerate(option_ids.tolist())}
+        now = datetime.utcnow()
+        rows = []
+        for column, question in enumerate(snapshot.questions):
+            rows.append({
+                'question_id': question.id,
+                'quiz_id': quiz.id,
+                'quiz_version': quiz.version,
+                'watermark': watermark,
+                'attempts': int(sums['attempts']),
+                'score_sum': int(sums['score_sum']),
+                'score_sq_sum': int(sums['score_sq_sum']),
+                'correct': int(sums['correct'][column]),
+                'correct_score_sum': int(sums['correct_score_sum'][column]),
+                'option_counts': {str(option.id): int(sums['option_counts'][option_index[option.id]])
+                                  for option in question.options},
+                'p_value': None if np.isnan(p_values[column]) else float(p_values[column]),
+                'point_biserial': None if np.isnan(point_biserials[column]) else float(point_biserials[column]),
+                'computed_at': now
+            })
+        
+        try:
+            db.session.execute(ItemStatistics.__table__.delete().where(ItemStatistics.__table__.c.quiz_id == quiz.id))
+            if rows:
+                db.session.execute(ItemStatistics.__table__.insert(), rows)
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error storing item statistics of quiz {quiz.id}: {str(e)}")
+            db.session.rollback()
+            raise
+    
+    @staticmethod
+    def report(quiz):
+        """
+        Get the stored item statistics of a quiz for display
+        
+        Args:
+            quiz (Quiz): Quiz object
+        
+        Returns:
+            dict: computed_at, watermark, attempts and one entry per question with
+                  p_value, point_biserial and (text, is_correct, selection rate) per option;
+                  None if the quiz has not been analyzed yet
+        """
+        rows = {row.question_id: row for row in ItemStatistics.query.filter_by(quiz_id=quiz.id)}
+        if not rows:
+            return None
+        
+        any_row = next(iter(rows.values()))
+        items = []
+        for question in QuizSnapshotCache.get(quiz).questions:
+            row = rows.get(question.id)
+            attempts = row.attempts if row else 0
+            counts = row.option_counts if row else {}
+            selected = sum(counts.values())
+            items.append({
+                'question': question,
+                'p_value': row.p_value if row else None,
+                'point_biserial': row.point_biserial if row else None,
+                'options': [(option.text, option.is_correct,
+                             counts.get(str(option.id), 0) / attempts if attempts else None)
+                            for option in question.options],
+                'omitted': (attempts - selected) / attempts if attempts else None
+            })
+        return {
+            'computed_at': any_row.computed_at,
+            'watermark': any_row.watermark,
+            'attempts': any_row.attempts,
+            'stale': any(row.quiz_version != quiz.version for row in rows.values()),
+            'items': items
+        }
@@ -0,0 +1,190 @@
+"""
+Incrementally maintained user leaderboards.
+"""
+import logging
+from datetime import datetime
+from app import db
+from app.models import User, UserQuiz, Question, UserScoreTotal, UserQuizScore
+from app.utils.sql import upsert, lock_quiz_aggregates
+
+
+class LeaderboardService:
+    """
+    Service for the user_score_totals and user_quiz_scores aggregates
+    
+    Every completed attempt adds its score percentage to the row of its
+    user (overall leaderboard) and to the row of its user and quiz
+    (per-quiz leaderboard) in the same transaction as the completion.
+    The rows also carry the resulting average, which is indexed in
+    leaderboard order, so reading the top K users is a short index scan
+    no matter how many users or attempts there are.
+    
+    Percentages use the question count of the quiz at completion time;
+    run rebuild() after changes that alter scores or question counts of
+    existing attempts.
+    """
+    
+    @staticmethod
+    def record_completed(attempts):
+        """
+        Add completed attempts to the leaderboards (the caller commits)
+        
+        Args:
+            attempts (iterable): Rows with user_id, quiz_id and score, e.g. the
+                                 rows returned by ScoringService.complete_attempts
+        """
+        attempts = list(attempts)
+        if not attempts:
+            return
+        
+        quiz_ids = {attempt.quiz_id for attempt in attempts}
+        question_counts = dict(db.session.query(Question.quiz_id, db.func.count(Question.id)).filter(
+            Question.quiz_id.in_(quiz_ids)
+        ).group_by(Question.quiz_id).all())
+        
+        per_user = {}
+        per_user_quiz = {}
+        for attempt in attempts:
+            question_count = question_counts.get(attempt.quiz_id, 0)
+            percentage = (attempt.score or 0) * 100.0 / question_count if question_count > 0 else 0.0
+            for counters, key in ((per_user, (attempt.user_id,)),
+                                  (per_user_quiz, (attempt.user_id, attempt.quiz_id))):
+                row = counters.get(key)
+                if row is None:
+                    counters[key] = row = {'user_id': attempt.user_id, 'attempts': 0, 'percentage_sum': 0.0}
+                    if len(key) == 2:
+                        row['quiz_id'] = attempt.quiz_id
+                row['attempts'] += 1
+                row['percentage_sum'] += percentage
+        
+        now = datetime.utcnow()
+        # A fixed lock order keeps concurrent batches from deadlocking each other
+        LeaderboardService._increment(UserQuizScore.__table__, ['user_id', 'quiz_id'],
+                                      [per_user_quiz[key] for key in sorted(per_user_quiz)], now)
+        LeaderboardService._increment(UserScoreTotal.__table__, ['user_id'],
+                                      [per_user[key] for key in sorted(per_user)], now)
+    
+    @staticmethod
+    def _increment(table, index_elements, rows, now):
+        for row in rows:
+            row['avg_percentage'] = row['percentage_sum'] / row['attempts']
+            row['updated_at'] = now
+        
+        stmt = upsert(table)
+        excluded = stmt.excluded
+        attempts = table.c.attempts + excluded.attempts
+        percentage_sum = table.c.percentage_sum + excluded.percentage_sum
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={
+                'attempts': attempts,
+                'percentage_sum': percentage_sum,
+                'avg_percentage': percentage_sum / attempts,
+                'updated_at': excluded.updated_at
+            }
+        )
+        db.session.execute(stmt, rows)
+    
+    @staticmethod
+    def top(limit=10, quiz_id=None):
+        """
+        Get the users with the best average score percentage
+        
+        Args:
+            limit (int): Number of users to return
+            quiz_id (int): Rank attempts of this quiz only (None ranks all quizzes)
+        
+        Returns:
+            list: Dicts with username, avg_score and quizzes_taken
+        """
+        model = UserScoreTotal if quiz_id is None else UserQuizScore
+        query = db.session.query(
+            User.username, model.avg_percentage, model.attempts
+        ).join(User, User.id == model.user_id)
+        if quiz_id is not None:
+            query = query.filter(model.quiz_id == quiz_id)
+        
+        rows = query.order_by(model.avg_percentage.desc(), model.user_id).limit(limit).all()
+        return [{
+            'username': row.username,
+            'avg_score': round(float(row.avg_percentage), 1),
+            'quizzes_taken': row.attempts
+        } for row in rows]
+    
+    @staticmethod
+    def rebuild(quiz_id=None):
+        """
+        Rebuild the leaderboards from user_quizzes
+        
+        Replaces the per-quiz rows of one quiz (or of all quizzes) with rows
+        aggregated from the completed attempts, recomputes the overall rows
+        of the affected users from the per-quiz rows, then commits.
+        
+        Args:
+            quiz_id (int): ID of the quiz to rebuild (None rebuilds everything)
+        
+        Returns:
+            int: Number of per-quiz leaderboard rows that were rebuilt
+        """
+        now = datetime.utcnow()
+        question_counts = db.session.query(
+            Question.quiz_id.label('quiz_id'),
+            db.func.count(Question.id).label('question_count')
+        ).group_by(Question.quiz_id).subquery()
+        question_count = db.func.coalesce(question_counts.c.question_count, 0)
+        percentage = db.case(
+            (question_count > 0, db.func.coalesce(UserQuiz.score, 0) * 100.0 / question_count),
+            else_=0.0
+        )
+        
+        quiz_scores = UserQuizScore.__table__
+        source = db.select(
+            UserQuiz.user_id,
+            UserQuiz.quiz_id,
+            db.func.count(UserQuiz.id),
+            db.func.sum(percentage),
+            db.func.sum(percentage) / db.func.count(UserQuiz.id),
+            db.literal(now)
+        ).outerjoin(
+            question_counts, question_counts.c.quiz_id == UserQuiz.quiz_id
+        ).where(UserQuiz.completed_at.isnot(None)).group_by(UserQuiz.user_id, UserQuiz.quiz_id)
+        delete = quiz_scores.delete()
+        
+        totals = UserScoreTotal.__table__
+        totals_source = db.select(
+            quiz_scores.c.user_id,
+            db.func.sum(quiz_scores.c.attempts),
+            db.func.sum(quiz_scores.c.percentage_sum),
+            db.func.sum(quiz_scores.c.percentage_sum) / db.func.sum(quiz_scores.c.attempts),
+            db.literal(now)
+        ).group_by(quiz_scores.c.user_id)
+        totals_delete = totals.delete()
+        
+        if quiz_id is not None:
+            source = source.where(UserQuiz.quiz_id == quiz_id)
+            delete = delete.where(quiz_scores.c.quiz_id == quiz_id)
+            # Only users with attempts on the quiz can have changed totals
+            affected = db.select(UserQuiz.user_id).where(UserQuiz.quiz_id == quiz_id)
+            totals_source = totals_source.where(quiz_scores.c.user_id.in_(affected))
+            totals_delete = totals_delete.where(totals.c.user_id.in_(affected))
+        
+        try:
+            # The overall rows of the affected users also sum their other
+            # quizzes, so even a one-quiz rebuild locks out every recorder
+            lock_quiz_aggregates(exclusive=True)
+            db.session.execute(delete)
+            result = db.session.execute(quiz_scores.insert().from_select([
+                'user_id', 'quiz_id', 'attempts', 'percentage_sum', 'avg_percentage', 'updated_at'
+            ], source))
+            db.session.execute(totals_delete)
+            db.session.execute(totals.insert().from_select([
+                'user_id', 'attempts', 'percentage_sum', 'avg_percentage', 'updated_at'
+            ], totals_source))
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error rebuilding leaderboards: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        logging.info(f"Rebuilt {result.rowcount} per-quiz leaderboard rows")
+        return result.rowcount
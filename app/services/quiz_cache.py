@@ -0,0 +1,22 @@
+"""
+Invalidation of the process-local caches derived from a quiz.
+"""
+from app.services.answer_key_cache import AnswerKeyCache
+from app.services.quiz_catalog import QuizCatalog
+from app.services.quiz_snapshot import QuizSnapshotCache, QuestionBlockCache
+
+
+def invalidate_quiz_caches(quiz_id):
+    """
+    Drop every cached structure derived from a quiz in this process
+    
+    Other workers pick up changes through Quiz.version; this only frees
+    the local entries right away (e.g. after an import or a delete).
+    
+    Args:
+        quiz_id (int): ID of the quiz
+    """
+    AnswerKeyCache.invalidate(quiz_id)
+    QuizSnapshotCache.invalidate(quiz_id)
+    QuestionBlockCache.invalidate(quiz_id)
+    QuizCatalog.invalidate()
@@ -0,0 +1,122 @@
+"""
+Process-local cached catalog of quizzes for the quiz list pages and API.
+"""
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from app import db
+from app.models import Quiz
+from app.utils.pagination import paginate_sequence
+
+
+class CatalogEntry(namedtuple('CatalogEntry', ['id', 'title', 'description', 'time_limit', 'is_live',
+                                               'question_count'])):
+    """Everything the quiz list needs to render one quiz card"""
+    __slots__ = ()
+
+
+class QuizCatalog:
+    """
+    Cached lists of catalog entries ordered by quiz id
+    
+    The full and the live-only catalog are each loaded with one query (the
+    live filter runs in SQL on the (is_live, id) index) and kept together
+    with the (count, max updated_at) watermark of the quizzes table. Local
+    writes (import, delete, publish) drop them immediately; changes made by
+    other workers are noticed by re-checking the watermark at most once
+    every QUIZ_CATALOG_RECHECK_SECONDS, so most requests run no query.
+    """
+    _lock = threading.Lock()
+    _lists = {}
+    _watermark = None
+    _checked_at = 0.0
+    
+    @classmethod
+    def entries(cls, live_only=False):
+        """
+        Get the catalog entries
+        
+        Args:
+            live_only (bool): Only include live quizzes
+            
+        Returns:
+            tuple: CatalogEntry objects ordered by id
+        """
+        cls._revalidate()
+        with cls._lock:
+            entries = cls._lists.get(live_only)
+            watermark = cls._watermark
+        if entries is None:
+            entries = cls._load(live_only)
+            with cls._lock:
+                # Only keep the list if nothing was invalidated while it loaded
+                if cls._watermark == watermark and watermark is not None:
+                    cls._lists[live_only] = entries
+        return entries
+    
+    @classmethod
+    def page(cls, cursor=None, limit=50, live_only=False):
+        """
+        Get one page of the catalog
+        
+        Args:
+            cursor (str): Cursor from a previous page (None for the first page)
+            limit (int): Page size
+            live_only (bool): Only include live quizzes
+            
+        Returns:
+            KeysetPage: Page of CatalogEntry objects
+        """
+        return paginate_sequence(cls.entries(live_only), lambda entry: (entry.id,), cursor, limit)
+    
+    @classmethod
+    def watermark(cls):
+        """
+        Get the watermark of the cached catalog
+        
+        Returns:
+            tuple: (number of quizzes, latest updated_at)
+        """
+        return cls._revalidate()
+    
+    @classmethod
+    def invalidate(cls):
+        """Drop the cached catalog"""
+        with cls._lock:
+            cls._lists = {}
+            cls._watermark = None
+            cls._checked_at = 0.0
+    
+    @classmethod
+    def _revalidate(cls):
+        # Re-read the watermark when it is unknown or due, dropping the lists if it moved
+        recheck_seconds = current_app.config.get('QUIZ_CATALOG_RECHECK_SECONDS', 5)
+        now = time.monotonic()
+        with cls._lock:
+            if cls._watermark is not None and now - cls._checked_at < recheck_seconds:
+                return cls._watermark
+        
+        watermark = cls._load_watermark()
+        with cls._lock:
+            if watermark != cls._watermark:
+                cls._lists = {}
+                cls._watermark = watermark
+            cls._checked_at = now
+        return watermark
+    
+    @staticmethod
+    def _load_watermark():
+        # updated_at moves on every edit of a quiz row (including version bumps), the count catches deletes
+        count, last_updated = db.session.query(db.func.count(Quiz.id), db.func.max(Quiz.updated_at)).one()
+        return count, last_updated
+    
+    @staticmethod
+    def _load(live_only):
+        query = db.session.query(
+            Quiz.id, Quiz.title, Quiz.description, Quiz.time_limit, Quiz.is_live, Quiz.question_count
+        )
+        if live_only:
+            query = query.filter(Quiz.is_live.is_(True))
+        return tuple(CatalogEntry(row.id, row.title, row.description, row.time_limit, bool(row.is_live),
+                                  row.question_count) for row in query.order_by(Quiz.id))
@@ -0,0 +1,205 @@
+"""
+Background import of uploaded quiz files.
+"""
+import logging
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import Quiz, QuizImportJob
+from app.services.quiz_loader import QuizLoader
+
+
+class QuizImport:
+    """
+    Service staging quiz uploads and importing them outside the web request
+    
+    The upload is stored in quiz_import_jobs, so the web request returns as
+    soon as the file is saved and any worker can pick the job up. The
+    import task validates the file with QuizLoader and saves the questions
+    in batches, committing the job's progress with each batch so the
+    import page can poll it. The quiz stays unpublished while it is being
+    imported, and a partly imported quiz is deleted if the import fails.
+    
+    A running job whose progress has not been saved for
+    QUIZ_IMPORT_STALE_SECONDS (e.g. because its worker died) is marked
+    failed by expire_stale(). Jobs that failed for such reasons keep their
+    upload and can be queued again with retry().
+    """
+    
+    @staticmethod
+    def stage(filename, content, user_id=None):
+        """
+        Save an uploaded quiz file as a pending import job
+        
+        Args:
+            filename (str): Name of the uploaded file
+            content (bytes): The uploaded YAML
+            user_id (int): ID of the admin who uploaded it
+        
+        Returns:
+            QuizImportJob: The pending job
+        """
+        max_bytes = current_app.config.get('QUIZ_IMPORT_MAX_BYTES')
+        if max_bytes and len(content) > max_bytes:
+            raise ValueError(f'File is larger than {max_bytes // (1024 * 1024)} MB')
+        try:
+            payload = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ValueError('File must be UTF-8 encoded')
+        
+        job = QuizImportJob(filename=filename, payload=payload, created_by=user_id)
+        db.session.add(job)
+        db.session.commit()
+        logging.info(f"Staged quiz import job {job.id} for {filename} ({len(content)} bytes)")
+        return job
+    
+    @staticmethod
+    def run(job_id, batch_size=None):
+        """
+        Import the quiz of a pending job
+        
+        Problems with the file are recorded on the job rather than raised.
+        
+        Args:
+            job_id (int): ID of the QuizImportJob
+            batch_size (int): Questions saved per batch (default QUIZ_IMPORT_BATCH_SIZE)
+        
+        Returns:
+            dict: Status of the job (see status()), or None if it does not exist
+        """
+        if batch_size is None:
+            batch_size = current_app.config.get('QUIZ_IMPORT_BATCH_SIZE', 100)
+        
+        job = db.session.get(QuizImportJob, job_id)
+        if not job:
+            logging.error(f"QuizImportJob with ID {job_id} not found")
+            return None
+        
+        # Claim the job with a compare-and-set, so a job queued twice (e.g.
+        # retried while the first message was still waiting) runs only once
+        jobs = QuizImportJob.__table__
+        claimed = db.session.execute(
+            jobs.update().where(
+                jobs.c.id == job_id,
+                jobs.c.status == QuizImportJob.PENDING
+            ).values(status=QuizImportJob.RUNNING, updated_at=datetime.utcnow())
+        ).rowcount == 1
+        db.session.commit()
+        if not claimed:
+            logging.info(f"Quiz import job {job_id} already {job.status}")
+            return QuizImport.status(job)
+        
+        def report(quiz, processed, total):
+            job.quiz_id = quiz.id
+            job.processed = processed
+            db.session.commit()
+        
+        try:
+            quiz_data = QuizLoader.parse(job.payload)
+            QuizLoader.validate(quiz_data)
+            job.total = len(quiz_data['questions'])
+            db.session.commit()
+            
+            quiz = QuizLoader.create_quiz(quiz_data, progress=report, batch_size=batch_size)
+        except Exception as e:
+            # create_quiz has already rolled back its own batch
+            QuizImport.fail(job, e)
+            return QuizImport.status(job)
+        
+        job.status = QuizImportJob.COMPLETED
+        job.quiz_id = quiz.id
+        job.payload = None
+        db.session.commit()
+        logging.info(f"Quiz import job {job_id} created quiz {quiz.id} with {quiz.question_count} questions")
+        return QuizImport.status(job)
+    
+    @staticmethod
+    def fail(job, error, retryable=False):
+        """
+        Mark a job failed and delete the quiz it had partly imported
+        
+        Args:
+            job (QuizImportJob): The job
+            error: Exception or message describing the failure
+            retryable (bool): Keep the upload so the job can be retried (for
+                              failures that are not caused by the file itself)
+        """
+        logging.error(f"Quiz import job {job.id} failed: {str(error)}")
+        try:
+            # Earlier batches were committed with their progress
+            if job.quiz_id:
+                quiz = db.session.get(Quiz, job.quiz_id)
+                if quiz:
+                    db.session.delete(quiz)
+            job.quiz_id = None
+            job.processed = 0
+            job.status = QuizImportJob.FAILED
+            job.error = str(error)
+            if not retryable:
+                job.payload = None
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error recording failure of quiz import job {job.id}: {str(e)}")
+            db.session.rollback()
+            raise
+    
+    @staticmethod
+    def expire_stale(job):
+        """
+        Fail a running job whose progress has not been saved for QUIZ_IMPORT_STALE_SECONDS
+        
+        Args:
+            job (QuizImportJob): The job
+        
+        Returns:
+            bool: True if the job was stale and is now failed
+        """
+        timeout = current_app.config.get('QUIZ_IMPORT_STALE_SECONDS', 900)
+        if job.status != QuizImportJob.RUNNING or job.updated_at > datetime.utcnow() - timedelta(seconds=timeout):
+            return False
+        QuizImport.fail(job, f'Import stopped making progress for {timeout // 60} minutes', retryable=True)
+        return True
+    
+    @staticmethod
+    def retry(job):
+        """
+        Reset a failed job that kept its upload so it can be queued again
+        
+        Args:
+            job (QuizImportJob): The job
+        
+        Returns:
+            bool: True if the job is pending again
+        """
+        if job.status != QuizImportJob.FAILED or job.payload is None:
+            return False
+        job.status = QuizImportJob.PENDING
+        job.error = None
+        job.total = None
+        db.session.commit()
+        logging.info(f"Quiz import job {job.id} queued again")
+        return True
+    
+    @staticmethod
+    def status(job):
+        """
+        Describe the state and progress of an import job
+        
+        Args:
+            job (QuizImportJob): The job
+        
+        Returns:
+            dict: id, filename, status, processed, total, percent, quiz_id, error
+                  and retryable
+        """
+        return {
+            'id': job.id,
+            'filename': job.filename,
+            'status': job.status,
+            'processed': job.processed,
+            'total': job.total,
+            'percent': round(job.processed * 100 / job.total) if job.total else 0,
+            'quiz_id': job.quiz_id,
+            'error': job.error,
+            'retryable': job.status == QuizImportJob.FAILED and job.payload is not None
+        }
@@ -3,10 +3,16 @@ import yaml
 import logging
 from app import db
 from app.models import Quiz, Question, Option
+from app.services.quiz_cache import invalidate_quiz_caches
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 
+# libyaml's C parser when available, several times faster on large question banks
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+# Questions inserted per flush; progress is reported after each batch
+QUESTION_BATCH_SIZE = 100
+
 class QuizLoader:
     """Service for loading quizzes from YAML files into the database"""
     
@@ -25,15 +31,41 @@ class QuizLoader:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Quiz file not found: {file_path}")
         
+        with open(file_path, 'r') as file:
+            quiz_data = QuizLoader.parse(file)
+        QuizLoader.validate(quiz_data)
+        return QuizLoader.create_quiz(quiz_data)
+    
+    @staticmethod
+    def parse(source):
+        """
+        Parse quiz YAML
+        
+        Args:
+            source (str or file): YAML text or an open text file
+        
+        Returns:
+            dict: The quiz data
+        """
         try:
-            with open(file_path, 'r') as file:
-                quiz_data = yaml.safe_load(file)
-                logging.debug(f"Quiz data loaded: {quiz_data['title'] if 'title' in quiz_data else 'No title'}")
+            quiz_data = yaml.load(source, Loader=YAML_LOADER)
         except yaml.YAMLError as e:
             logging.error(f"Error parsing YAML file: {e}")
             raise ValueError(f"Error parsing YAML file: {e}")
         
-        # Validate quiz data
+        if not isinstance(quiz_data, dict):
+            raise ValueError("Quiz file must contain a mapping with a title and questions")
+        logging.debug(f"Quiz data loaded: {quiz_data.get('title') or 'No title'}")
+        return quiz_data
+    
+    @staticmethod
+    def validate(quiz_data):
+        """
+        Check the structure of parsed quiz data, raising ValueError on the first problem
+        
+        Args:
+            quiz_data (dict): Quiz data as returned by parse()
+        """
         if not quiz_data.get('title'):
             raise ValueError("Quiz must have a title")
         if not quiz_data.get('questions') or not isinstance(quiz_data['questions'], list):
@@ -68,7 +100,24 @@ class QuizLoader:
         
         logging.info(f"Quiz validation passed: {quiz_data['title']}")
         
-        # Create quiz in database
+    @staticmethod
+    def create_quiz(quiz_data, progress=None, batch_size=QUESTION_BATCH_SIZE):
+        """
+        Save validated quiz data to the database as a new, unpublished quiz
+        
+        Questions and their options are inserted batch_size questions per
+        flush rather than one flush per question. The quiz is committed once
+        at the end, unless the progress callback commits earlier batches.
+        
+        Args:
+            quiz_data (dict): Quiz data that passed validate()
+            progress (callable): Called as progress(quiz, processed, total) after each batch
+            batch_size (int): Questions per flush
+        
+        Returns:
+            Quiz: The created Quiz object
+        """
+        questions = quiz_data['questions']
         try:
             quiz = Quiz(
                 title=quiz_data['title'],
@@ -76,60 +125,41 @@ class QuizLoader:
                 is_live=False  # Default to not live
             )
             db.session.add(quiz)
-            # Flush to get the quiz ID
-            db.session.flush()
-            logging.debug(f"Created quiz with ID: {quiz.id}")
             
             # Add questions and options
-            for q_index, q_data in enumerate(quiz_data['questions']):
+            question_count = 0
+            for q_index, q_data in enumerate(questions):
                 if not q_data.get('text'):
                     logging.warning(f"Skipping question {q_index} without text")
                     continue  # Skip questions without text
                     
-                try:
-                    question = Question(
-                        quiz=quiz,
-                        text=q_data['text']
-                    )
-                    db.session.add(question)
-                    db.session.flush()  # Get the question ID
-                    logging.debug(f"Created question with ID: {question.id}, text: {question.text[:30]}...")
+                question = Question(quiz=quiz, text=q_data['text'])
+                db.session.add(question)
+                question_count += 1
                     
-                    # Add options for this question
-                    if q_data.get('options') and isinstance(q_data['options'], list):
-                        for opt_index, opt_data in enumerate(q_data['options']):
-                            if not opt_data.get('text'):
-                                logging.warning(f"Skipping option {opt_index} without text for question {question.id}")
-                                continue  # Skip options without text
-                                
-                            try:
-                                # Handle both 'correct' and 'is_correct' fields in YAML files
-                                is_correct = opt_data.get('correct', False) or opt_data.get('is_correct', False)
+                # Add options for this question
+                for opt_index, opt_data in enumerate(q_data.get('options') or []):
+                    # Ensure text is a string and handle numeric values
+                    option_text = str(opt_data['text']).strip() if opt_data.get('text') is not None else ''
+                    if not option_text:
+                        logging.warning(f"Skipping option {opt_index} without text for question {q_index}")
+                        continue
                                 
-                                # Ensure text is a string and handle numeric values
-                                if 'text' in opt_data:
-                                    # Convert any value to string explicitly
-                                    option_text = str(opt_data['text']).strip()
-                                    if not option_text:
-                                        logging.warning(f"Empty option text for question {question.id}")
-                                        continue
-                                else:
-                                    logging.warning(f"Option missing 'text' field for question {question.id}")
-                                    continue
+                    # Handle both 'correct' and 'is_correct' fields in YAML files
+                    is_correct = opt_data.get('correct', False) or opt_data.get('is_correct', False)
+                    db.session.add(Option(question=question, text=option_text, is_correct=bool(is_correct)))
                                 
-                                option = Option(
-                                    question_id=question.id,  # Use ID directly
-                                    text=option_text,
-                                    is_correct=bool(is_correct)  # Ensure boolean type
-                                )
-                                db.session.add(option)
-                                logging.debug(f"Created option: {option_text[:20]}..., is_correct: {is_correct}")
-                            except Exception as e:
-                                logging.error(f"Error creating option: {e}")
-                                raise
-                except Exception as e:
-                    logging.error(f"Error creating question: {e}")
-                    raise
+                if (q_index + 1) % batch_size == 0:
+                    db.session.flush()
+                    logging.debug(f"Created {question_count} questions of quiz {quiz.id}")
+                    if progress:
+                        progress(quiz, q_index + 1, len(questions))
+            
+            quiz.question_count = question_count
+            db.session.flush()
+            logging.debug(f"Created quiz with ID: {quiz.id} and {question_count} questions")
+            if progress:
+                progress(quiz, len(questions), len(questions))
         except Exception as e:
             db.session.rollback()
             logging.error(f"Error creating quiz: {e}")
@@ -137,6 +167,7 @@ class QuizLoader:
         
         # Commit all changes to database
         db.session.commit()
+        invalidate_quiz_caches(quiz.id)
         return quiz
     
     @staticmethod
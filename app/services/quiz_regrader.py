@@ -0,0 +1,179 @@
+"""
+Bulk re-grading of quiz attempts.
+"""
+import time
+import logging
+import numpy as np
+from sqlalchemy import bindparam
+from app import db
+from app.models import Quiz, UserQuiz, UserAnswer
+from app.services.answer_key_cache import AnswerKeyCache
+from app.services.attempt_events import AttemptEvents
+
+
+def answer_matrix(attempt_ids, question_ids, answers):
+    """
+    Arrange answers as an attempts x questions matrix of selected option ids
+    
+    Args:
+        attempt_ids (ndarray): Attempt ids in ascending order (matrix rows)
+        question_ids (ndarray): Question ids (matrix columns, any order)
+        answers (ndarray): (user_quiz_id, question_id, option_id) rows
+        
+    Returns:
+        ndarray: int64 matrix with 0 where a question was not answered; answers
+                 to attempts or questions that are not listed are dropped
+    """
+    rows = np.searchsorted(attempt_ids, answers[:, 0])
+    in_chunk = (rows < len(attempt_ids)) & (attempt_ids[np.minimum(rows, len(attempt_ids) - 1)] == answers[:, 0])
+    
+    order = np.argsort(question_ids)
+    cols = np.searchsorted(question_ids, answers[:, 1], sorter=order)
+    cols = order[np.minimum(cols, len(order) - 1)]
+    listed = question_ids[cols] == answers[:, 1]
+    
+    mask = in_chunk & listed
+    matrix = np.zeros((len(attempt_ids), len(question_ids)), dtype=np.int64)
+    matrix[rows[mask], cols[mask]] = answers[mask, 2]
+    return matrix
+
+
+def correct_answers(matrix, question_ids, answer_key):
+    """
+    Mark the cells of an answer matrix that select one of their question's correct options
+    
+    Args:
+        matrix (ndarray): attempts x questions matrix of selected option ids (see answer_matrix)
+        question_ids (ndarray): Question ids of the matrix columns
+        answer_key (AnswerKey): Answer key of the quiz
+        
+    Returns:
+        ndarray: Boolean matrix of the same shape
+    """
+    columns = {int(question_id): column for column, question_id in enumerate(question_ids)}
+    pairs = [(columns[question_id], option_id)
+             for question_id, option_ids in answer_key.correct_options.items() if question_id in columns
+             for option_id in option_ids]
+    if not pairs or not matrix.size:
+        return np.zeros(matrix.shape, dtype=bool)
+    
+    # Encode (column, option id) as one integer so a single lookup checks both
+    stride = max(int(matrix.max()), max(option_id for _, option_id in pairs)) + 1
+    keys = np.array([column * stride + option_id for column, option_id in pairs], dtype=np.int64)
+    cells = np.arange(matrix.shape[1], dtype=np.int64) * stride + matrix
+    return np.isin(cells, keys) & (matrix > 0)
+
+
+class QuizRegrader:
+    """Service for re-scoring every completed attempt of a quiz against its current answer key"""
+    
+    @staticmethod
+    def regrade_quiz(quiz_id, chunk_size=5000, per_row=False):
+        """
+        Re-score all completed attempts of a quiz
+        
+        Attempts are processed in chunks of ``chunk_size``. For each chunk the
+        answers are loaded into an attempts x questions matrix of selected
+        option ids and compared against the answer key in one vectorized step;
+        changed scores are written back with a single executemany UPDATE.
+        
+        Args:
+            quiz_id (int): ID of the quiz
+            chunk_size (int): Number of attempts processed per chunk
+            per_row (bool): Use the per-attempt scoring path instead (for comparison)
+            
+        Returns:
+            dict: Summary with attempt/update counts and throughput in attempts/sec,
+                  or None if the quiz was not found
+        """
+        quiz = db.session.get(Quiz, quiz_id)
+        if not quiz:
+            logging.error(f"Quiz with ID {quiz_id} not found")
+            return None
+        
+        answer_key = AnswerKeyCache.get(quiz)
+        started = time.perf_counter()
+        attempts = 0
+        updated = 0
+        
+        for attempt_ids, old_scores in QuizRegrader._iter_attempt_chunks(quiz_id, chunk_size):
+            if per_row:
+                new_scores = QuizRegrader._score_per_row(answer_key, attempt_ids)
+            else:
+                new_scores = QuizRegrader._score_chunk(answer_key, attempt_ids)
+            
+            changed = np.flatnonzero(new_scores != old_scores)
+            if changed.size:
+                db.session.execute(
+                    UserQuiz.__table__.update()
+                    .where(UserQuiz.__table__.c.id == bindparam('attempt_id'))
+                    .values(score=bindparam('new_score')),
+                    [{'attempt_id': int(attempt_ids[i]), 'new_score': int(new_scores[i])} for i in changed]
+                )
+                db.session.commit()
+            
+            attempts += len(attempt_ids)
+            updated += int(changed.size)
+        
+        # Changed scores invalidate the running sums, min/max and leaderboards of the quiz
+        if updated:
+            AttemptEvents.rescored(quiz_id)
+        
+        elapsed = time.perf_counter() - started
+        summary = {
+            'quiz_id': quiz_id,
+            'method': 'per-row' if per_row else 'vectorized',
+            'attempts': attempts,
+            'updated': updated,
+            'seconds': round(elapsed, 3),
+            'attempts_per_second': round(attempts / elapsed, 1) if elapsed > 0 else 0
+        }
+        logging.info(f"Regraded quiz {quiz_id}: {summary}")
+        return summary
+    
+    @staticmethod
+    def _iter_attempt_chunks(quiz_id, chunk_size):
+        # Keyset iteration over completed attempts keeps every chunk query cheap
+        last_id = 0
+        while True:
+            rows = db.session.query(UserQuiz.id, UserQuiz.score).filter(
+                UserQuiz.quiz_id == quiz_id,
+                UserQuiz.completed_at.isnot(None),
+                UserQuiz.id > last_id
+            ).order_by(UserQuiz.id).limit(chunk_size).all()
+            if not rows:
+                return
+            
+            attempt_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            old_scores = np.fromiter((row[1] or 0 for row in rows), dtype=np.int64, count=len(rows))
+            yield attempt_ids, old_scores
+            last_id = int(attempt_ids[-1])
+    
+    @staticmethod
+    def _score_chunk(answer_key, attempt_ids):
+        question_ids = np.fromiter(answer_key.correct_options.keys(), dtype=np.int64)
+        
+        if question_ids.size == 0:
+            return np.zeros(len(attempt_ids), dtype=np.int64)
+        
+        answers = db.session.query(
+            UserAnswer.user_quiz_id, UserAnswer.question_id, UserAnswer.option_id
+        ).join(UserQuiz, UserQuiz.id == UserAnswer.user_quiz_id).filter(
+            UserQuiz.quiz_id == answer_key.quiz_id,
+            UserAnswer.user_quiz_id.between(int(attempt_ids[0]), int(attempt_ids[-1]))
+        ).execution_options(stream_results=True, yield_per=10000)
+        answers = np.array(list(answers), dtype=np.int64).reshape(-1, 3)
+        
+        # Answers to unkeyed questions are dropped
+        matrix = answer_matrix(attempt_ids, question_ids, answers)
+        return correct_answers(matrix, question_ids, answer_key).sum(axis=1)
+    
+    @staticmethod
+    def _score_per_row(answer_key, attempt_ids):
+        scores = []
+        for attempt_id in attempt_ids:
+            answer_map = dict(db.session.query(UserAnswer.question_id, UserAnswer.option_id).filter(
+                UserAnswer.user_quiz_id == int(attempt_id)
+            ).all())
+            scores.append(answer_key.score(answer_map))
+        return np.array(scores, dtype=np.int64)
@@ -1,5 +1,11 @@
+from flask import current_app
 from app import db
 from app.models import Quiz, Question, Option, UserQuiz, UserAnswer
+from app.services.answer_key_cache import AnswerKeyCache
+from app.services.scoring import ScoringService
+from app.services.attempt_events import AttemptEvents, CompletedAttempt
+from app.utils.sql import upsert
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 import logging
 from app.tasks import process_quiz_submission, generate_quiz_statistics
@@ -20,6 +26,24 @@ class QuizService:
         """
         return Quiz.query.all()
     
+    @staticmethod
+    def get_attempt_counts(quiz_ids):
+        """
+        Count the attempts of several quizzes with one grouped query
+        
+        Args:
+            quiz_ids (list): IDs of the quizzes
+            
+        Returns:
+            dict: Mapping of quiz_id to number of attempts (quizzes without attempts are omitted)
+        """
+        if not quiz_ids:
+            return {}
+        rows = db.session.query(UserQuiz.quiz_id, db.func.count(UserQuiz.id)).filter(
+            UserQuiz.quiz_id.in_(quiz_ids)
+        ).group_by(UserQuiz.quiz_id).all()
+        return dict(rows)
+    
     @staticmethod
     def get_quiz_by_id(quiz_id):
         """
@@ -33,6 +57,34 @@ class QuizService:
         """
         return Quiz.query.get(quiz_id)
     
+    @staticmethod
+    def get_user_quiz(user_quiz_id):
+        """
+        Get a quiz attempt together with its quiz in a single query
+        
+        Args:
+            user_quiz_id (int): ID of the user quiz attempt
+            
+        Returns:
+            UserQuiz: UserQuiz object (with quiz loaded) or None if not found
+        """
+        return db.session.get(UserQuiz, user_quiz_id, options=[joinedload(UserQuiz.quiz)])
+    
+    @staticmethod
+    def get_answer_map(user_quiz_id):
+        """
+        Get the answers of a quiz attempt
+        
+        Args:
+            user_quiz_id (int): ID of the user quiz attempt
+            
+        Returns:
+            dict: Mapping of question_id to selected option_id
+        """
+        return dict(db.session.query(UserAnswer.question_id, UserAnswer.option_id).filter(
+            UserAnswer.user_quiz_id == user_quiz_id
+        ).all())
+    
     @staticmethod
     def start_quiz(user, quiz_id):
         """
@@ -70,6 +122,7 @@ class QuizService:
                 created_at=datetime.utcnow()
             )
             db.session.add(user_quiz)
+            AttemptEvents.started(quiz.id, user_quiz.created_at)
             db.session.commit()
             logging.debug(f"Created new UserQuiz with ID {user_quiz.id}, created_at: {user_quiz.created_at}")
             return user_quiz
@@ -91,43 +144,83 @@ class QuizService:
         Returns:
             UserAnswer: Created UserAnswer object or None if not valid
         """
-        user_quiz = UserQuiz.query.get(user_quiz_id)
-        question = Question.query.get(question_id)
-        option = Option.query.get(option_id)
-        
-        if not user_quiz or not question or not option:
+        saved = QuizService.submit_answers(user_quiz_id, {question_id: option_id})
+        if not saved:
             return None
         
-        # Check if question belongs to the quiz
-        if question.quiz_id != user_quiz.quiz_id:
-            return None
-        
-        # Check if option belongs to the question
-        if option.question_id != question.id:
-            return None
-        
-        # Check if answer already exists for this question in this attempt
-        existing_answer = UserAnswer.query.filter_by(
+        return UserAnswer.query.filter_by(
             user_quiz_id=user_quiz_id,
             question_id=question_id
         ).first()
+    
+    @staticmethod
+    def submit_answers(user_quiz_id, answers, skip_invalid=True):
+        """
+        Submit several answers for a quiz attempt in a single transaction
         
-        if existing_answer:
-            # Update existing answer
-            existing_answer.option_id = option_id
+        All question/option pairs are validated against the attempt's quiz in
+        one query and written with a single INSERT ... ON CONFLICT upsert, so
+        a full exam submission costs a fixed number of round trips and one
+        commit regardless of the number of questions.
+        
+        Args:
+            user_quiz_id (int): ID of the user quiz attempt
+            answers (dict): Mapping of question_id to selected option_id
+            skip_invalid (bool): Save the valid pairs and skip the invalid ones;
+                                 when False, nothing is saved if any pair is invalid
+            
+        Returns:
+            dict: Mapping of the question_id/option_id pairs that were saved
+                  (invalid pairs are skipped), or None if the attempt was not found
+        """
+        user_quiz = UserQuiz.query.get(user_quiz_id)
+        if not user_quiz:
+            return None
+        
+        if not answers:
+            return {}
+        
+        # Validate every pair in one query: the option must belong to the
+        # question and the question must belong to the attempt's quiz
+        valid_pairs = set(db.session.query(Option.question_id, Option.id).join(
+            Question, Question.id == Option.question_id
+        ).filter(
+            Question.quiz_id == user_quiz.quiz_id,
+            Option.id.in_(set(answers.values()))
+        ).all())
+        
+        saved = {question_id: option_id for question_id, option_id in answers.items()
+                 if (question_id, option_id) in valid_pairs}
+        if not saved or (not skip_invalid and len(saved) != len(answers)):
+            return {}
+        
+        now = datetime.utcnow()
+        rows = [{
+            'user_quiz_id': user_quiz.id,
+            'question_id': question_id,
+            'option_id': option_id,
+            'created_at': now,
+            'updated_at': now
+        } for question_id, option_id in saved.items()]
+        
+        try:
+            stmt = upsert(UserAnswer.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_quiz_id', 'question_id'],
+                set_={
+                    'option_id': stmt.excluded.option_id,
+                    'updated_at': stmt.excluded.updated_at
+                }
+            )
+            db.session.execute(stmt, rows)
             db.session.commit()
-            return existing_answer
-        
-        # Create new answer
-        user_answer = UserAnswer(
-            user_quiz=user_quiz,
-            question=question,
-            option=option
-        )
-        db.session.add(user_answer)
-        db.session.commit()
+        except Exception as e:
+            logging.error(f"Error saving answers for UserQuiz {user_quiz_id}: {str(e)}")
+            db.session.rollback()
+            return None
         
-        return user_answer
+        logging.debug(f"Saved {len(saved)} answers for UserQuiz {user_quiz_id}")
+        return saved
     
     @staticmethod
     def complete_quiz(user_quiz_id):
@@ -137,6 +230,12 @@ class QuizService:
         This method calculates the score immediately and shows results to the user,
         while still queuing background tasks for additional processing.
         
+        Completion is an atomic compare-and-set on user_quizzes.completed_at:
+        when several requests complete the same attempt concurrently (double
+        clicks, timer auto-submit) exactly one of them scores the attempt and
+        queues the statistics task. The others wait for the winner's row lock
+        and return its result.
+        
         Args:
             user_quiz_id (int): ID of the user quiz attempt
             
@@ -145,7 +244,7 @@ class QuizService:
         """
         logging.info(f"Starting complete_quiz for user_quiz_id={user_quiz_id}")
         
-        user_quiz = UserQuiz.query.get(user_quiz_id)
+        user_quiz = QuizService.get_user_quiz(user_quiz_id)
         if not user_quiz:
             logging.error(f"UserQuiz with ID {user_quiz_id} not found")
             return None
@@ -158,53 +257,43 @@ class QuizService:
             return user_quiz
         
         try:
-            # IMMEDIATE CALCULATION: Calculate the score synchronously
-            logging.info(f"Starting immediate score calculation for UserQuiz {user_quiz_id}")
-            
-            # Get all questions for this quiz
-            questions = Question.query.filter_by(quiz_id=user_quiz.quiz_id).all()
-            total_questions = len(questions)
-            logging.info(f"Found {total_questions} questions for quiz {user_quiz.quiz_id}")
+            if current_app.config.get('SCORING_BACKEND') == 'sql':
+                # Score and complete in a single aggregate UPDATE ... RETURNING
+                logging.info(f"Scoring UserQuiz {user_quiz_id} in the database")
+                completed = ScoringService.complete_attempts([user_quiz.id])
+                won = bool(completed)
+                score = completed[0].score if completed else None
+            else:
+                # Claim the attempt first; the conditional UPDATE holds the row
+                # lock until commit, so concurrent completions block here
+                completed_at = datetime.utcnow()
+                won = ScoringService.claim_attempt(user_quiz.id, completed_at)
+                score = None
+                completed = []
+                if won:
+                    # IMMEDIATE CALCULATION: Calculate the score synchronously
+                    logging.info(f"Starting immediate score calculation for UserQuiz {user_quiz_id}")
+                    score = QuizService._score_attempt(user_quiz)
+                    
+                    # Update user quiz with the score in the same transaction
+                    db.session.execute(
+                        UserQuiz.__table__.update()
+                        .where(UserQuiz.__table__.c.id == user_quiz.id)
+                        .values(score=score)
+                    )
+                    completed = [CompletedAttempt(user_quiz.user_id, user_quiz.quiz_id, score,
+                                                  user_quiz.created_at, completed_at)]
             
-            if total_questions == 0:
-                # No questions to score
-                logging.warning(f"No questions found for quiz {user_quiz.quiz_id}, setting score to 0")
-                user_quiz.score = 0
-                user_quiz.completed_at = datetime.utcnow()
-                db.session.commit()
-                return user_quiz
-            
-            # Get all user answers in a single query
-            user_answers = UserAnswer.query.filter_by(user_quiz_id=user_quiz.id).all()
-            logging.info(f"Found {len(user_answers)} answers for UserQuiz {user_quiz_id}")
-            
-            # Create a mapping of question_id to selected option_id for quick lookup
-            answer_map = {answer.question_id: answer.option_id for answer in user_answers}
-            
-            # Get all correct options for these questions in a single query
-            correct_options = db.session.query(Option.question_id, Option.id).filter(
-                Option.question_id.in_([q.id for q in questions]),
-                Option.is_correct == True
-            ).all()
-            logging.info(f"Found {len(correct_options)} correct options for quiz {user_quiz.quiz_id}")
-            
-            # Create a mapping of question_id to correct option_id
-            correct_map = {question_id: option_id for question_id, option_id in correct_options}
-            
-            # Calculate score by comparing the two maps
-            score = sum(1 for question_id, correct_option_id in correct_map.items() 
-                      if answer_map.get(question_id) == correct_option_id)
-            
-            logging.info(f"Calculated score: {score}/{total_questions} for UserQuiz {user_quiz_id}")
-            
-            # Update user quiz with score and completion time
-            user_quiz.score = score
-            user_quiz.completed_at = datetime.utcnow()
-            user_quiz.pending_completion = False  # Mark as completed immediately
+            # Statistics and leaderboards are updated in the same transaction
+            AttemptEvents.completed(completed)
             
             # Commit the changes
-            logging.info(f"Committing score and completion time for UserQuiz {user_quiz_id}")
             db.session.commit()
+            db.session.refresh(user_quiz)
+            
+            if not won:
+                logging.warning(f"UserQuiz {user_quiz_id} was completed by a concurrent request")
+                return user_quiz
             
             # Still queue the statistics generation task in the background
             logging.info(f"Queueing statistics generation for quiz {user_quiz.quiz_id}")
@@ -224,6 +313,19 @@ class QuizService:
             logging.error(traceback.format_exc())
             db.session.rollback()
             return None
+    
+    @staticmethod
+    def _score_attempt(user_quiz):
+        # The answer key comes from the process-local cache, so the attempt's
+        # own answers are the only per-attempt query
+        answer_key = AnswerKeyCache.get(user_quiz.quiz)
+        if answer_key.question_count == 0:
+            logging.warning(f"No questions found for quiz {user_quiz.quiz_id}, setting score to 0")
+            return 0
+        
+        score = answer_key.score(QuizService.get_answer_map(user_quiz.id))
+        logging.info(f"Calculated score: {score}/{answer_key.question_count} for UserQuiz {user_quiz.id}")
+        return score
             
     @staticmethod
     def calculate_quiz_score(user_quiz_id):
@@ -239,39 +341,21 @@ class QuizService:
         Returns:
             UserQuiz: Updated UserQuiz object or None if not found
         """
-        user_quiz = UserQuiz.query.get(user_quiz_id)
+        user_quiz = QuizService.get_user_quiz(user_quiz_id)
         if not user_quiz:
             return None
         
-        # Get all questions for this quiz
-        questions = Question.query.filter_by(quiz_id=user_quiz.quiz_id).all()
-        total_questions = len(questions)
+        answer_key = AnswerKeyCache.get(user_quiz.quiz)
         
-        if total_questions == 0:
+        if answer_key.question_count == 0:
             # No questions to score
             user_quiz.score = 0
             user_quiz.completed_at = datetime.utcnow()
             db.session.commit()
             return user_quiz
         
-        # Get all user answers in a single query
-        user_answers = UserAnswer.query.filter_by(user_quiz_id=user_quiz.id).all()
-        
-        # Create a mapping of question_id to selected option_id for quick lookup
-        answer_map = {answer.question_id: answer.option_id for answer in user_answers}
-        
-        # Get all correct options for these questions in a single query
-        correct_options = db.session.query(Option.question_id, Option.id).filter(
-            Option.question_id.in_([q.id for q in questions]),
-            Option.is_correct == True
-        ).all()
-        
-        # Create a mapping of question_id to correct option_id
-        correct_map = {question_id: option_id for question_id, option_id in correct_options}
-        
-        # Calculate score by comparing the two maps
-        score = sum(1 for question_id, correct_option_id in correct_map.items() 
-                  if answer_map.get(question_id) == correct_option_id)
+        # Calculate score against the cached answer key
+        score = answer_key.score(QuizService.get_answer_map(user_quiz.id))
         
         # Update user quiz with score and completion time
         user_quiz.score = score
@@ -0,0 +1,146 @@
+"""
+Immutable, cached read model of a quiz's questions and options.
+"""
+from collections import namedtuple
+from flask import current_app, render_template
+from markupsafe import Markup
+from app import db
+from app.models import Question, Option
+from app.utils.cache import VersionedLRUCache
+
+OptionSnapshot = namedtuple('OptionSnapshot', ['id', 'question_id', 'text', 'is_correct'])
+QuestionSnapshot = namedtuple('QuestionSnapshot', ['id', 'text', 'options'])
+
+
+class QuizSnapshot(namedtuple('QuizSnapshot', ['quiz_id', 'version', 'questions'])):
+    """Questions (in id order) with their options as plain tuples"""
+    __slots__ = ()
+    
+    @property
+    def question_count(self):
+        return len(self.questions)
+    
+    def to_dict(self):
+        """Serialize the questions and options (without correct answers) for the API"""
+        return [{
+            'id': question.id,
+            'text': question.text,
+            'options': [{
+                'id': option.id,
+                'text': option.text
+            } for option in question.options]
+        } for question in self.questions]
+
+
+class QuizSnapshotCache:
+    """
+    Versioned, size-bounded LRU cache of quiz snapshots keyed by quiz_id
+    
+    Like AnswerKeyCache, entries are validated against Quiz.version so that
+    edits made by any worker are picked up on the next lookup.
+    """
+    _cache = None
+    
+    @classmethod
+    def _entries(cls):
+        if cls._cache is None:
+            cls._cache = VersionedLRUCache(current_app.config.get('QUIZ_SNAPSHOT_CACHE_SIZE', 64))
+        return cls._cache
+    
+    @classmethod
+    def get(cls, quiz):
+        """
+        Get the snapshot of a quiz, loading it on a miss
+        
+        Args:
+            quiz (Quiz): Quiz object (only id and version are used)
+            
+        Returns:
+            QuizSnapshot: Snapshot of the current version of the quiz
+        """
+        entries = cls._entries()
+        snapshot = entries.get(quiz.id, quiz.version)
+        if snapshot is None:
+            snapshot = cls._load(quiz.id, quiz.version)
+            entries.put(quiz.id, quiz.version, snapshot)
+        return snapshot
+    
+    @classmethod
+    def invalidate(cls, quiz_id):
+        """Drop the cached snapshot of a quiz"""
+        if cls._cache is not None:
+            cls._cache.invalidate(quiz_id)
+    
+    @classmethod
+    def clear(cls):
+        """Drop all cached snapshots"""
+        if cls._cache is not None:
+            cls._cache.clear()
+    
+    @staticmethod
+    def _load(quiz_id, version):
+        # Two queries regardless of the number of questions
+        questions = db.session.query(Question.id, Question.text).filter(
+            Question.quiz_id == quiz_id
+        ).order_by(Question.id).all()
+        
+        options_by_question = {}
+        for row in db.session.query(Option.id, Option.question_id, Option.text, Option.is_correct).join(
+            Question, Question.id == Option.question_id
+        ).filter(Question.quiz_id == quiz_id).order_by(Option.id):
+            options_by_question.setdefault(row.question_id, []).append(
+                OptionSnapshot(row.id, row.question_id, row.text, bool(row.is_correct))
+            )
+        
+        return QuizSnapshot(quiz_id, version, tuple(
+            QuestionSnapshot(question.id, question.text, tuple(options_by_question.get(question.id, ())))
+            for question in questions
+        ))
+
+
+class QuestionBlockCache:
+    """
+    Cache of the rendered question block of quiz/take.html per quiz version
+    
+    The markup is identical for every attempt of a quiz version; only the
+    checked radio buttons differ, and those are applied by the page from a
+    small JSON blob of the user's saved answers.
+    """
+    _cache = None
+    
+    @classmethod
+    def _entries(cls):
+        if cls._cache is None:
+            cls._cache = VersionedLRUCache(current_app.config.get('QUIZ_SNAPSHOT_CACHE_SIZE', 64))
+        return cls._cache
+    
+    @classmethod
+    def get(cls, quiz):
+        """
+        Get the rendered question block of a quiz, rendering it on a miss
+        
+        Args:
+            quiz (Quiz): Quiz object (only id and version are used)
+            
+        Returns:
+            Markup: Rendered questions and options without any answers checked
+        """
+        entries = cls._entries()
+        html = entries.get(quiz.id, quiz.version)
+        if html is None:
+            snapshot = QuizSnapshotCache.get(quiz)
+            html = Markup(render_template('quiz/_questions.html', questions=snapshot.questions))
+            entries.put(quiz.id, quiz.version, html)
+        return html
+    
+    @classmethod
+    def invalidate(cls, quiz_id):
+        """Drop the cached question block of a quiz"""
+        if cls._cache is not None:
+            cls._cache.invalidate(quiz_id)
+    
+    @classmethod
+    def clear(cls):
+        """Drop all cached question blocks"""
+        if cls._cache is not None:
+            cls._cache.clear()
@@ -0,0 +1,236 @@
+"""
+Incrementally maintained per-quiz attempt statistics.
+"""
+import math
+import random
+import logging
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models import QuizStatistics, UserQuiz
+from app.utils.sql import upsert, least, greatest, lock_quiz_aggregates
+
+
+class QuizStatisticsService:
+    """
+    Service for the quiz_statistics running counters
+    
+    Every start and completion adds to one of QUIZ_STATISTICS_SHARDS rows
+    of its quiz, chosen at random, with a single INSERT ... ON CONFLICT in
+    the same transaction as the attempt change. Concurrent completions of
+    a popular quiz therefore rarely wait on the same row lock, and readers
+    sum the few shard rows of a quiz instead of scanning its attempts.
+    """
+    
+    @staticmethod
+    def record_started(quiz_id):
+        """
+        Count a started attempt (the caller commits)
+        
+        Args:
+            quiz_id (int): ID of the quiz
+        """
+        QuizStatisticsService._increment([{
+            'quiz_id': quiz_id,
+            'attempts_started': 1,
+            'attempts_completed': 0,
+            'score_sum': 0,
+            'score_sq_sum': 0,
+            'score_min': None,
+            'score_max': None
+        }])
+    
+    @staticmethod
+    def record_completed(attempts):
+        """
+        Count completed attempts (the caller commits)
+        
+        Args:
+            attempts (iterable): (quiz_id, score) pairs, e.g. the rows
+                                 returned by ScoringService.complete_attempts
+        """
+        per_quiz = {}
+        for quiz_id, score in attempts:
+            score = int(score or 0)
+            counters = per_quiz.get(quiz_id)
+            if counters is None:
+                per_quiz[quiz_id] = counters = {
+                    'quiz_id': quiz_id,
+                    'attempts_started': 0,
+                    'attempts_completed': 0,
+                    'score_sum': 0,
+                    'score_sq_sum': 0,
+                    'score_min': score,
+                    'score_max': score
+                }
+            counters['attempts_completed'] += 1
+            counters['score_sum'] += score
+            counters['score_sq_sum'] += score * score
+            counters['score_min'] = min(counters['score_min'], score)
+            counters['score_max'] = max(counters['score_max'], score)
+        
+        if per_quiz:
+            QuizStatisticsService._increment(list(per_quiz.values()))
+    
+    @staticmethod
+    def _increment(rows):
+        shards = max(1, current_app.config.get('QUIZ_STATISTICS_SHARDS', 8))
+        now = datetime.utcnow()
+        for row in rows:
+            row['shard'] = random.randrange(shards)
+            row['updated_at'] = now
+        # A fixed lock order keeps multi-quiz batches from deadlocking each other
+        rows.sort(key=lambda row: (row['quiz_id'], row['shard']))
+        
+        table = QuizStatistics.__table__
+        stmt = upsert(table)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['quiz_id', 'shard'],
+            set_={
+                'attempts_started': table.c.attempts_started + excluded.attempts_started,
+                'attempts_completed': table.c.attempts_completed + excluded.attempts_completed,
+                'score_sum': table.c.score_sum + excluded.score_sum,
+                'score_sq_sum': table.c.score_sq_sum + excluded.score_sq_sum,
+                # NULL means "no completions yet" on either side
+                'score_min': least(db.func.coalesce(table.c.score_min, excluded.score_min),
+                                   db.func.coalesce(excluded.score_min, table.c.score_min)),
+                'score_max': greatest(db.func.coalesce(table.c.score_max, excluded.score_max),
+                                      db.func.coalesce(excluded.score_max, table.c.score_max)),
+                'updated_at': excluded.updated_at
+            }
+        )
+        db.session.execute(stmt, rows)
+    
+    @staticmethod
+    def merged_query():
+        """
+        Build a subquery with the shard rows of every quiz merged into one
+        
+        Returns:
+            Subquery: Columns quiz_id, attempts_started, attempts_completed,
+                      score_sum, score_sq_sum, score_min, score_max
+        """
+        return db.session.query(
+            QuizStatistics.quiz_id.label('quiz_id'),
+            db.func.sum(QuizStatistics.attempts_started).label('attempts_started'),
+            db.func.sum(QuizStatistics.attempts_completed).label('attempts_completed'),
+            db.func.sum(QuizStatistics.score_sum).label('score_sum'),
+            db.func.sum(QuizStatistics.score_sq_sum).label('score_sq_sum'),
+            db.func.min(QuizStatistics.score_min).label('score_min'),
+            db.func.max(QuizStatistics.score_max).label('score_max')
+        ).group_by(QuizStatistics.quiz_id).subquery()
+    
+    @staticmethod
+    def summarize(quiz_id, row):
+        """
+        Turn merged counters into the derived statistics
+        
+        Args:
+            quiz_id (int): ID of the quiz
+            row: Merged counters (see merged_query), or None for a quiz without attempts
+            
+        Returns:
+            dict: Counts, average, standard deviation, min/max score and completion rate
+        """
+        started = int(row.attempts_started or 0) if row is not None else 0
+        completed = int(row.attempts_completed or 0) if row is not None else 0
+        summary = {
+            'quiz_id': quiz_id,
+            'attempts_started': started,
+            'attempts_completed': completed,
+            'average_score': 0,
+            'score_stddev': 0,
+            'score_min': None,
+            'score_max': None,
+            'completion_rate': completed / started * 100 if started else 0
+        }
+        if completed:
+            mean = int(row.score_sum) / completed
+            summary['average_score'] = mean
+            summary['score_stddev'] = math.sqrt(max(0.0, int(row.score_sq_sum) / completed - mean * mean))
+            summary['score_min'] = row.score_min
+            summary['score_max'] = row.score_max
+        return summary
+    
+    @staticmethod
+    def get(quiz_id):
+        """
+        Get the statistics of one quiz
+        
+        Args:
+            quiz_id (int): ID of the quiz
+            
+        Returns:
+            dict: See summarize()
+        """
+        merged = QuizStatisticsService.merged_query()
+        row = db.session.query(merged).filter(merged.c.quiz_id == quiz_id).first()
+        return QuizStatisticsService.summarize(quiz_id, row)
+    
+    @staticmethod
+    def totals():
+        """
+        Get the attempt counters summed over all quizzes
+        
+        Returns:
+            dict: attempts_started and attempts_completed
+        """
+        started, completed = db.session.query(
+            db.func.coalesce(db.func.sum(QuizStatistics.attempts_started), 0),
+            db.func.coalesce(db.func.sum(QuizStatistics.attempts_completed), 0)
+        ).one()
+        return {'attempts_started': int(started), 'attempts_completed': int(completed)}
+    
+    @staticmethod
+    def reconcile(quiz_id=None):
+        """
+        Rebuild the counters from user_quizzes
+        
+        Replaces the shard rows of one quiz (or of all quizzes) with a single
+        row aggregated from the raw attempts, then commits. Run it after
+        bulk changes that bypass the counters, such as a regrade or a manual
+        data fix.
+        
+        Args:
+            quiz_id (int): ID of the quiz to rebuild (None rebuilds every quiz)
+            
+        Returns:
+            int: Number of quizzes with attempts that were rebuilt
+        """
+        table = QuizStatistics.__table__
+        completed = UserQuiz.completed_at.isnot(None)
+        score = db.func.coalesce(UserQuiz.score, 0)
+        
+        source = db.select(
+            UserQuiz.quiz_id,
+            db.literal(0),
+            db.func.count(UserQuiz.id),
+            db.func.count(UserQuiz.completed_at),
+            db.func.coalesce(db.func.sum(db.case((completed, score), else_=0)), 0),
+            db.func.coalesce(db.func.sum(db.case((completed, score * score), else_=0)), 0),
+            db.func.min(db.case((completed, score), else_=None)),
+            db.func.max(db.case((completed, score), else_=None)),
+            db.literal(datetime.utcnow())
+        ).group_by(UserQuiz.quiz_id)
+        
+        delete = table.delete()
+        if quiz_id is not None:
+            source = source.where(UserQuiz.quiz_id == quiz_id)
+            delete = delete.where(table.c.quiz_id == quiz_id)
+        
+        try:
+            lock_quiz_aggregates(None if quiz_id is None else [quiz_id], exclusive=True)
+            db.session.execute(delete)
+            result = db.session.execute(table.insert().from_select([
+                'quiz_id', 'shard', 'attempts_started', 'attempts_completed', 'score_sum',
+                'score_sq_sum', 'score_min', 'score_max', 'updated_at'
+            ], source))
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error reconciling quiz statistics: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        logging.info(f"Reconciled statistics of {result.rowcount} quizzes")
+        return result.rowcount
@@ -0,0 +1,111 @@
+"""
+Filtered, projected listing of completed quiz attempts.
+"""
+from datetime import datetime, timedelta
+from app import db
+from app.models import User, Quiz, UserQuiz
+from app.utils.pagination import keyset_paginate
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+class ResultsService:
+    """
+    Service for the admin results page and exports
+    
+    The quiz, user and date range filters are each served by an index on
+    user_quizzes that ends with the (completed_at, id) sort key: quiz by
+    (quiz_id, completed_at, id), user by (user_id, completed_at, id) and
+    the date range by (completed_at, id) itself. The score range is on the
+    percentage, so it compares attempts of quizzes with different question
+    counts fairly; it has no index of its own and is checked on the rows
+    the other filters (or the plain sort index) read.
+    """
+    
+    @staticmethod
+    def filters_from_args(args):
+        """
+        Read the results filters from a query string
+        
+        Malformed values are ignored rather than rejected, like malformed cursors.
+        
+        Args:
+            args (MultiDict): Query string arguments (quiz_filter, user, completed_from,
+                              completed_to as YYYY-MM-DD, score_min, score_max as percentages)
+        
+        Returns:
+            dict: quiz_id, username, completed_from, completed_to, score_min and
+                  score_max, None where not set
+        """
+        return {
+            'quiz_id': args.get('quiz_filter', type=int),
+            'username': args.get('user', '').strip() or None,
+            'completed_from': _parse_date(args.get('completed_from')),
+            'completed_to': _parse_date(args.get('completed_to')),
+            'score_min': args.get('score_min', type=int),
+            'score_max': args.get('score_max', type=int),
+        }
+    
+    @staticmethod
+    def apply_filters(query, filters):
+        """
+        Restrict a query over completed attempts joined with users and quizzes to the filters
+        
+        Args:
+            query (Query or Select): Query selecting from user_quizzes joined with users and quizzes
+            filters (dict): Filter values as returned by filters_from_args
+        
+        Returns:
+            The filtered query
+        """
+        query = query.filter(UserQuiz.completed_at.isnot(None))
+        if filters.get('quiz_id'):
+            query = query.filter(UserQuiz.quiz_id == filters['quiz_id'])
+        if filters.get('username'):
+            query = query.filter(User.username == filters['username'])
+        if filters.get('completed_from'):
+            query = query.filter(UserQuiz.completed_at >= datetime.combine(filters['completed_from'], datetime.min.time()))
+        if filters.get('completed_to'):
+            # The end date is inclusive
+            end = datetime.combine(filters['completed_to'] + timedelta(days=1), datetime.min.time())
+            query = query.filter(UserQuiz.completed_at < end)
+        if filters.get('score_min') is not None or filters.get('score_max') is not None:
+            # Same percentage as shown on the page and in the exports
+            percentage = db.case(
+                (Quiz.question_count > 0, db.func.coalesce(UserQuiz.score, 0) * 100.0 / Quiz.question_count),
+                else_=0.0
+            )
+            if filters.get('score_min') is not None:
+                query = query.filter(percentage >= filters['score_min'])
+            if filters.get('score_max') is not None:
+                query = query.filter(percentage <= filters['score_max'])
+        return query
+    
+    @staticmethod
+    def page(filters, cursor=None, limit=50):
+        """
+        Fetch one page of completed attempts, newest completions first
+        
+        Only the displayed columns are selected, with the user name, quiz
+        title and question count joined in, so a page costs one query
+        regardless of its size.
+        
+        Args:
+            filters (dict): Filter values as returned by filters_from_args
+            cursor (str): Cursor from a previous page
+            limit (int): Page size
+        
+        Returns:
+            KeysetPage: Rows with id, user_id, username, quiz_id, quiz_title,
+                        question_count, score, created_at and completed_at
+        """
+        query = db.session.query(
+            UserQuiz.id, UserQuiz.user_id, User.username, UserQuiz.quiz_id, Quiz.title.label('quiz_title'),
+            Quiz.question_count, UserQuiz.score, UserQuiz.created_at, UserQuiz.completed_at
+        ).join(User, User.id == UserQuiz.user_id).join(Quiz, Quiz.id == UserQuiz.quiz_id)
+        query = ResultsService.apply_filters(query, filters)
+        return keyset_paginate(query, [UserQuiz.completed_at, UserQuiz.id], cursor, limit, descending=True)
@@ -0,0 +1,125 @@
+"""
+Streaming export of completed quiz attempts.
+"""
+import csv
+import io
+import json
+from app import db
+from app.models import User, Quiz, UserQuiz
+from app.services.results import ResultsService
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+COLUMNS = ('attempt_id', 'user_id', 'username', 'quiz_id', 'quiz_title', 'started_at', 'completed_at',
+           'duration_seconds', 'score', 'question_count', 'percentage')
+
+# Leading characters that make spreadsheets evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_safe(record):
+    # Quote user-entered text that a spreadsheet would run as a formula
+    return {key: "'" + value if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+            for key, value in record.items()}
+
+
+class ResultsExport:
+    """
+    Service streaming completed attempts as CSV or NDJSON
+    
+    Attempts are read with one joined query through a server-side cursor
+    (stream_results) in batches of batch_size rows, and are written out in
+    chunks of the same size, so memory use does not depend on how many
+    attempts are exported.
+    """
+    
+    @staticmethod
+    def query(filters=None):
+        """
+        Build the export query, newest completions first like the results page
+        
+        Args:
+            filters (dict): Results page filters (see ResultsService.filters_from_args)
+        
+        Returns:
+            Select: Query of the plain export columns
+        """
+        stmt = db.select(
+            UserQuiz.id, User.id, User.username, Quiz.id, Quiz.title,
+            UserQuiz.created_at, UserQuiz.completed_at, UserQuiz.score, Quiz.question_count
+        ).join(User, User.id == UserQuiz.user_id).join(Quiz, Quiz.id == UserQuiz.quiz_id)
+        stmt = ResultsService.apply_filters(stmt, filters or {})
+        return stmt.order_by(UserQuiz.completed_at.desc(), UserQuiz.id.desc())
+    
+    @staticmethod
+    def records(stmt, batch_size=1000):
+        """
+        Stream the export records of a query
+        
+        Args:
+            stmt (Select): Query built by query()
+            batch_size (int): Rows fetched from the cursor at a time
+        
+        Yields:
+            dict: One record per attempt, keyed by COLUMNS
+        """
+        result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+        for attempt_id, user_id, username, quiz_id, quiz_title, created_at, completed_at, score, question_count in result:
+            score = score or 0
+            yield {
+                'attempt_id': attempt_id,
+                'user_id': user_id,
+                'username': username,
+                'quiz_id': quiz_id,
+                'quiz_title': quiz_title,
+                'started_at': created_at.isoformat() if created_at else None,
+                'completed_at': completed_at.isoformat(),
+                'duration_seconds': int((completed_at - created_at).total_seconds()) if created_at else None,
+                'score': score,
+                'question_count': question_count,
+                'percentage': round(score / question_count * 100) if question_count else 0
+            }
+    
+    @staticmethod
+    def stream(fmt, filters=None, batch_size=1000):
+        """
+        Stream the export as text chunks of batch_size records
+        
+        Args:
+            fmt (str): 'csv' (with a header row, text cells that start like a formula
+                       prefixed with ') or 'ndjson' (one JSON object per line)
+            filters (dict): Results page filters (see ResultsService.filters_from_args)
+            batch_size (int): Records per chunk
+        
+        Yields:
+            str: Chunks of the export
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f'Unknown export format {fmt!r}')
+        
+        buffer = io.StringIO()
+        if fmt == 'csv':
+            writer = csv.DictWriter(buffer, fieldnames=COLUMNS, lineterminator='\n')
+            writer.writeheader()
+            def write(record):
+                writer.writerow(_csv_safe(record))
+        else:
+            def write(record):
+                buffer.write(json.dumps(record, separators=(',', ':')))
+                buffer.write('\n')
+        
+        pending = 0
+        for record in ResultsExport.records(ResultsExport.query(filters), batch_size):
+            write(record)
+            pending += 1
+            if pending == batch_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        
+        if buffer.tell():
+            yield buffer.getvalue()
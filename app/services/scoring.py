@@ -0,0 +1,99 @@
+"""
+Set-based scoring of quiz attempts inside the database.
+"""
+from datetime import datetime
+from sqlalchemy import and_, func, select
+from app import db
+from app.models import Option, UserQuiz, UserAnswer
+
+
+class ScoringService:
+    """Service for scoring and completing quiz attempts with a single SQL statement"""
+    
+    @staticmethod
+    def correct_answer_count():
+        """
+        Build a scalar subquery counting the correct answers of the
+        user_quizzes row it is correlated with
+        
+        Returns:
+            ScalarSelect: COUNT(*) of user_answers joined to correct options
+        """
+        user_quizzes = UserQuiz.__table__
+        user_answers = UserAnswer.__table__
+        options = Option.__table__
+        
+        return select(func.count()).select_from(
+            user_answers.join(options, and_(
+                options.c.id == user_answers.c.option_id,
+                options.c.question_id == user_answers.c.question_id
+            ))
+        ).where(
+            user_answers.c.user_quiz_id == user_quizzes.c.id,
+            options.c.is_correct == True
+        ).scalar_subquery()
+    
+    @staticmethod
+    def claim_attempt(user_quiz_id, completed_at):
+        """
+        Mark an attempt completed if no one else has yet
+        
+        The conditional UPDATE is a compare-and-set on completed_at and holds
+        the row lock until commit, so concurrent completions block here and
+        then find the attempt already claimed. The caller scores the attempt
+        and commits.
+        
+        Args:
+            user_quiz_id (int): ID of the user quiz attempt
+            completed_at (datetime): Completion time
+            
+        Returns:
+            bool: True if this transaction completed the attempt
+        """
+        user_quizzes = UserQuiz.__table__
+        result = db.session.execute(
+            user_quizzes.update().where(
+                user_quizzes.c.id == user_quiz_id,
+                user_quizzes.c.completed_at.is_(None)
+            ).values(completed_at=completed_at, pending_completion=False)
+        )
+        return result.rowcount == 1
+    
+    @staticmethod
+    def complete_attempts(user_quiz_ids, completed_at=None):
+        """
+        Score and complete attempts in one UPDATE ... RETURNING statement
+        
+        Only attempts that are not completed yet are touched, so the
+        statement doubles as an atomic compare-and-set on completed_at.
+        The caller is responsible for committing.
+        
+        Args:
+            user_quiz_ids (iterable): IDs of the user quiz attempts
+            completed_at (datetime): Completion time (defaults to now)
+            
+        Returns:
+            list: Rows of (id, user_id, quiz_id, score, created_at, completed_at)
+                  for the attempts that were completed by this call
+        """
+        user_quiz_ids = list(user_quiz_ids)
+        if not user_quiz_ids:
+            return []
+        
+        user_quizzes = UserQuiz.__table__
+        stmt = user_quizzes.update().where(
+            user_quizzes.c.id.in_(user_quiz_ids),
+            user_quizzes.c.completed_at.is_(None)
+        ).values(
+            score=ScoringService.correct_answer_count(),
+            completed_at=completed_at or datetime.utcnow(),
+            pending_completion=False
+        ).returning(
+            user_quizzes.c.id,
+            user_quizzes.c.user_id,
+            user_quizzes.c.quiz_id,
+            user_quizzes.c.score,
+            user_quizzes.c.created_at,
+            user_quizzes.c.completed_at
+        )
+        return db.session.execute(stmt).all()
@@ -0,0 +1,76 @@
+"""
+Admin user directory with prefix search and per-user activity.
+"""
+from collections import namedtuple
+from app import db
+from app.models import User, Quiz, UserQuiz
+from app.utils.pagination import keyset_paginate
+from app.utils.sql import prefix_match
+
+DirectoryEntry = namedtuple('DirectoryEntry', ['id', 'username', 'email', 'is_admin', 'created_at',
+                                               'attempts', 'last_activity', 'average_score'])
+
+
+class UserDirectory:
+    """
+    Service for the paginated, searchable admin user list
+    
+    A page costs two queries whatever its size: the page of users (a range
+    scan on the primary key, or on the username/email search indexes) and
+    one grouped query over the attempts of just those users, served by the
+    (user_id, completed_at, id) index on user_quizzes.
+    """
+    
+    @staticmethod
+    def page(search=None, cursor=None, limit=50):
+        """
+        Fetch one page of users in id order
+        
+        Args:
+            search (str): Case-insensitive prefix of the username or email
+            cursor (str): Cursor from a previous page
+            limit (int): Page size
+        
+        Returns:
+            KeysetPage: Page of DirectoryEntry items
+        """
+        query = db.session.query(User.id, User.username, User.email, User.is_admin, User.created_at)
+        if search:
+            query = query.filter(db.or_(prefix_match(User.username, search), prefix_match(User.email, search)))
+        page = keyset_paginate(query, [User.id], cursor, limit)
+        
+        activity = UserDirectory.activity([row.id for row in page.items])
+        page.items = [DirectoryEntry(*row, *activity.get(row.id, (0, None, None))) for row in page.items]
+        return page
+    
+    @staticmethod
+    def activity(user_ids):
+        """
+        Get attempt counts, last activity and average score of some users
+        
+        Args:
+            user_ids (list): IDs of the users
+        
+        Returns:
+            dict: user_id -> (attempts started, time of the latest start or completion,
+                  average score percentage of the completed attempts or None)
+        """
+        if not user_ids:
+            return {}
+        
+        percentage = db.case(
+            (db.and_(UserQuiz.completed_at.isnot(None), Quiz.question_count > 0),
+             UserQuiz.score * 100.0 / Quiz.question_count),
+            else_=None
+        )
+        rows = db.session.query(
+            UserQuiz.user_id,
+            db.func.count(UserQuiz.id),
+            db.func.max(db.func.coalesce(UserQuiz.completed_at, UserQuiz.created_at)),
+            db.func.avg(percentage)
+        ).join(Quiz, Quiz.id == UserQuiz.quiz_id).filter(
+            UserQuiz.user_id.in_(user_ids)
+        ).group_by(UserQuiz.user_id)
+        
+        return {user_id: (attempts, last_activity, round(average, 1) if average is not None else None)
+                for user_id, attempts, last_activity, average in rows}
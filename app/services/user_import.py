@@ -0,0 +1,404 @@
+"""
+Bulk user provisioning from CSV.
+"""
+import csv
+import io
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import User, UserImportJob
+
+REQUIRED_COLUMNS = ('username', 'email', 'password')
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+# Usernames and emails checked against the users table per query; one query
+# covers any file up to this many rows
+UNIQUENESS_CHECK_CHUNK = 10000
+
+
+class UserImport:
+    """
+    Service creating many users at once from CSV rows
+    
+    Rows are validated first, then checked against each other and, with
+    one query, against the existing users. Password hashing is CPU bound
+    (PBKDF2 by design), so the hashes of the valid rows are computed by a
+    process pool, and the users are inserted with executemany batches in
+    one transaction.
+    
+    Uploads through the admin page are staged as a UserImportJob of at
+    most USER_IMPORT_MAX_ROWS rows and imported by a Celery task, so the
+    hashing never runs in (or forks) a web worker. The staged upload
+    contains plaintext passwords: run() clears it however it ends, and
+    purge_unfinished() clears the uploads of jobs that never ran to the end.
+    """
+    
+    @staticmethod
+    def stage(filename, content, user_id=None):
+        """
+        Save an uploaded users CSV as a pending import job
+        
+        Args:
+            filename (str): Name of the uploaded file
+            content (bytes): The uploaded CSV
+            user_id (int): ID of the admin who uploaded it
+        
+        Returns:
+            UserImportJob: The pending job
+        """
+        try:
+            # utf-8-sig drops the byte order mark spreadsheet programs write
+            payload = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ValueError('File must be UTF-8 encoded')
+        
+        total = max(0, sum(1 for _ in csv.reader(io.StringIO(payload, newline=''))) - 1)
+        max_rows = current_app.config.get('USER_IMPORT_MAX_ROWS')
+        if max_rows and total > max_rows:
+            raise ValueError(f"File has {total} rows, at most {max_rows} can be uploaded; "
+                             f"import larger files with 'flask users import'")
+        
+        job = UserImportJob(filename=filename, payload=payload, total=total, created_by=user_id)
+        db.session.add(job)
+        db.session.commit()
+        logging.info(f"Staged user import job {job.id} for {filename} ({total} rows)")
+        return job
+    
+    @staticmethod
+    def run(job_id):
+        """
+        Import the users of a pending job
+        
+        Problems with the file, and usernames or emails taken by a concurrent
+        insert, are recorded on the job rather than raised.
+        
+        Args:
+            job_id (int): ID of the UserImportJob
+        
+        Returns:
+            dict: Status of the job (see status()), or None if it does not exist
+        """
+        job = db.session.get(UserImportJob, job_id)
+        if not job:
+            logging.error(f"UserImportJob with ID {job_id} not found")
+            return None
+        
+        # Claim the job with a compare-and-set, so a job delivered twice runs once
+        jobs = UserImportJob.__table__
+        claimed = db.session.execute(
+            jobs.update().where(
+                jobs.c.id == job_id,
+                jobs.c.status == UserImportJob.PENDING
+            ).values(status=UserImportJob.RUNNING, updated_at=datetime.utcnow())
+        ).rowcount == 1
+        db.session.commit()
+        if not claimed:
+            logging.info(f"User import job {job_id} already {job.status}")
+            return UserImport.status(job)
+        
+        workers = current_app.config.get('USER_IMPORT_TASK_WORKERS', 1)
+        payload, job.payload = job.payload, None
+        try:
+            job.summary = UserImport.import_csv(io.StringIO(payload, newline=''), workers=workers)
+            job.status = UserImportJob.COMPLETED
+        except ValueError as e:
+            job.status = UserImportJob.FAILED
+            job.error = str(e)
+        except IntegrityError:
+            # import_csv has rolled back, so none of the users were created
+            job.status = UserImportJob.FAILED
+            job.error = ('Some of these usernames or emails were taken while the file was '
+                         'being imported, so no users were created; import the file again')
+        except Exception:
+            job.status = UserImportJob.FAILED
+            job.error = 'The import failed unexpectedly, please upload the file again'
+            raise
+        finally:
+            # The upload holds plaintext passwords, so it is cleared on every
+            # exit; purge_unfinished() covers runs that never get this far
+            UserImport._finish(job)
+        return UserImport.status(job)
+    
+    @staticmethod
+    def _finish(job):
+        if job.status == UserImportJob.FAILED:
+            logging.error(f"User import job {job.id} failed: {job.error}")
+        try:
+            # import_csv rolls back on errors, which expires the job's attributes
+            db.session.execute(
+                UserImportJob.__table__.update()
+                .where(UserImportJob.__table__.c.id == job.id)
+                .values(status=job.status, summary=job.summary, error=job.error, payload=None,
+                        updated_at=datetime.utcnow())
+            )
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error recording the result of user import job {job.id}: {str(e)}")
+            db.session.rollback()
+            raise
+    
+    @staticmethod
+    def _fail(job, error):
+        logging.error(f"User import job {job.id} failed: {error}")
+        try:
+            job.status = UserImportJob.FAILED
+            job.error = error
+            job.payload = None
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error recording failure of user import job {job.id}: {str(e)}")
+            db.session.rollback()
+            raise
+    
+    @staticmethod
+    def fail_unqueued(job):
+        """
+        Mark a job that could not be queued as failed
+        
+        Args:
+            job (UserImportJob): The pending job
+        """
+        UserImport._fail(job, 'The import could not be queued, please upload the file again later')
+    
+    @staticmethod
+    def expire_stale(job):
+        """
+        Fail a job that has been pending or running for longer than USER_IMPORT_STALE_SECONDS
+        
+        Args:
+            job (UserImportJob): The job
+        
+        Returns:
+            bool: True if the job was stale and is now failed
+        """
+        timeout = current_app.config.get('USER_IMPORT_STALE_SECONDS', 3600)
+        if job.status not in (UserImportJob.PENDING, UserImportJob.RUNNING) or job.updated_at > datetime.utcnow() - timedelta(seconds=timeout):
+            return False
+        UserImport._fail(job, f'Import did not finish within {timeout // 60} minutes, please upload the file again')
+        return True
+    
+    @staticmethod
+    def purge_unfinished(stale_seconds=None):
+        """
+        Fail jobs that are stuck and drop the upload of every finished job, then commit
+        
+        Staged uploads hold plaintext passwords. run() clears them, but a job
+        that was never queued, or whose worker was killed, keeps its upload
+        until this runs (scheduled by Celery beat).
+        
+        Args:
+            stale_seconds (int): Age of the last update after which pending or
+                                 running jobs are failed (default USER_IMPORT_STALE_SECONDS)
+        
+        Returns:
+            int: Number of jobs whose upload was dropped
+        """
+        if stale_seconds is None:
+            stale_seconds = current_app.config.get('USER_IMPORT_STALE_SECONDS', 3600)
+        jobs = UserImportJob.__table__
+        now = datetime.utcnow()
+        try:
+            failed = db.session.execute(
+                jobs.update().where(
+                    jobs.c.status.in_([UserImportJob.PENDING, UserImportJob.RUNNING]),
+                    jobs.c.updated_at < now - timedelta(seconds=stale_seconds)
+                ).values(status=UserImportJob.FAILED, payload=None, updated_at=now,
+                         error=f'Import did not finish within {stale_seconds // 60} minutes, '
+                               f'please upload the file again')
+            ).rowcount
+            scrubbed = db.session.execute(
+                jobs.update().where(
+                    jobs.c.status.in_([UserImportJob.COMPLETED, UserImportJob.FAILED]),
+                    jobs.c.payload.isnot(None)
+                ).values(payload=None)
+            ).rowcount
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error purging user import jobs: {str(e)}")
+            db.session.rollback()
+            raise
+        
+        if failed or scrubbed:
+            logging.info(f"Failed {failed} stuck user import jobs and dropped {scrubbed} leftover uploads")
+        return failed + scrubbed
+    
+    @staticmethod
+    def status(job):
+        """
+        Describe the state of an import job
+        
+        Args:
+            job (UserImportJob): The job
+        
+        Returns:
+            dict: id, filename, status, total, summary (once completed) and error
+        """
+        return {
+            'id': job.id,
+            'filename': job.filename,
+            'status': job.status,
+            'total': job.total,
+            'summary': job.summary,
+            'error': job.error
+        }
+    
+    @staticmethod
+    def import_csv(stream, workers=None, batch_size=None):
+        """
+        Create users from CSV text with username, email, password and optional is_admin columns
+        
+        Invalid rows are skipped and reported; the valid rows are created.
+        
+        Args:
+            stream (iterable): Text file or lines of the CSV, with a header row
+            workers (int): Hashing processes (default USER_IMPORT_WORKERS, 0 = one per CPU,
+                           1 = hash in this process)
+            batch_size (int): Users per INSERT batch (default USER_IMPORT_BATCH_SIZE)
+        
+        Returns:
+            dict: rows, created, errors (list of {'line', 'username', 'error'}),
+                  seconds, hash_seconds and users_per_second
+        """
+        started = time.perf_counter()
+        reader = csv.DictReader(stream)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"CSV is missing the column(s): {', '.join(missing)}")
+        
+        rows, errors = UserImport._validate(reader)
+        rows = UserImport._check_existing(rows, errors)
+        
+        hash_started = time.perf_counter()
+        hashes = UserImport.hash_passwords([row['password'] for row in rows], workers)
+        hash_seconds = time.perf_counter() - hash_started
+        
+        now = datetime.utcnow()
+        users = [{
+            'username': row['username'],
+            'email': row['email'],
+            'password_hash': password_hash,
+            'is_admin': row['is_admin'],
+            'created_at': now,
+            'updated_at': now
+        } for row, password_hash in zip(rows, hashes)]
+        UserImport._insert(users, batch_size)
+        
+        elapsed = time.perf_counter() - started
+        errors.sort(key=lambda error: error['line'])
+        summary = {
+            'rows': len(users) + len(errors),
+            'created': len(users),
+            'errors': errors,
+            'seconds': round(elapsed, 3),
+            'hash_seconds': round(hash_seconds, 3),
+            'users_per_second': round(len(users) / elapsed, 1) if elapsed > 0 else 0
+        }
+        logging.info(f"Imported {summary['created']} of {summary['rows']} users in {summary['seconds']}s "
+                     f"({len(errors)} rejected)")
+        return summary
+    
+    @staticmethod
+    def _validate(reader):
+        rows = []
+        errors = []
+        usernames = {}
+        emails = {}
+        for row in reader:
+            # Line numbers of the file, the header being line 1
+            line = reader.line_num
+            username = (row.get('username') or '').strip()
+            email = (row.get('email') or '').strip()
+            password = row.get('password') or ''
+            
+            error = None
+            if not username or len(username) > 64:
+                error = 'Username is required (at most 64 characters)'
+            elif not email or '@' not in email or len(email) > 120:
+                error = 'A valid email is required (at most 120 characters)'
+            elif not password:
+                error = 'Password is required'
+            elif username in usernames:
+                error = f'Duplicate username (line {usernames[username]})'
+            elif email in emails:
+                error = f'Duplicate email (line {emails[email]})'
+            if error:
+                errors.append({'line': line, 'username': username, 'error': error})
+                continue
+            
+            usernames[username] = emails[email] = line
+            rows.append({
+                'line': line,
+                'username': username,
+                'email': email,
+                'password': password,
+                'is_admin': (row.get('is_admin') or '').strip().lower() in TRUE_VALUES
+            })
+        return rows, errors
+    
+    @staticmethod
+    def _check_existing(rows, errors):
+        taken_usernames = set()
+        taken_emails = set()
+        for start in range(0, len(rows), UNIQUENESS_CHECK_CHUNK):
+            chunk = rows[start:start + UNIQUENESS_CHECK_CHUNK]
+            existing = db.session.query(User.username, User.email).filter(db.or_(
+                User.username.in_([row['username'] for row in chunk]),
+                User.email.in_([row['email'] for row in chunk])
+            ))
+            for username, email in existing:
+                taken_usernames.add(username)
+                taken_emails.add(email)
+        
+        remaining = []
+        for row in rows:
+            if row['username'] in taken_usernames:
+                errors.append({'line': row['line'], 'username': row['username'], 'error': 'Username already exists'})
+            elif row['email'] in taken_emails:
+                errors.append({'line': row['line'], 'username': row['username'], 'error': 'Email already exists'})
+            else:
+                remaining.append(row)
+        return remaining
+    
+    @staticmethod
+    def hash_passwords(passwords, workers=None):
+        """
+        Hash passwords like User.password does, spread over worker processes
+        
+        Args:
+            passwords (list): Plain text passwords
+            workers (int): Number of processes (None reads USER_IMPORT_WORKERS,
+                           0 = one per CPU, 1 = hash in this process)
+        
+        Returns:
+            list: Password hashes in the order of the passwords
+        """
+        if workers is None:
+            workers = current_app.config.get('USER_IMPORT_WORKERS', 0)
+        workers = min(workers or os.cpu_count() or 1, len(passwords))
+        if workers <= 1:
+            return [generate_password_hash(password) for password in passwords]
+        
+        # A few chunks per worker balance the load while keeping IPC overhead low
+        chunksize = max(1, len(passwords) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(generate_password_hash, passwords, chunksize=chunksize))
+    
+    @staticmethod
+    def _insert(users, batch_size=None):
+        if batch_size is None:
+            batch_size = current_app.config.get('USER_IMPORT_BATCH_SIZE', 1000)
+        
+        table = User.__table__
+        try:
+            for start in range(0, len(users), batch_size):
+                db.session.execute(table.insert(), users[start:start + batch_size])
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error inserting imported users: {str(e)}")
+            db.session.rollback()
+            raise
@@ -28,6 +28,19 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Auto-save quiz answers
     const quizForm = document.getElementById('quiz-form');
+
+    // Restore saved answers on top of the cached question markup
+    const savedAnswers = document.getElementById('saved-answers');
+    if (quizForm && savedAnswers) {
+        const answers = JSON.parse(savedAnswers.textContent || '{}');
+        Object.keys(answers).forEach(questionId => {
+            const input = document.getElementById(`option_${answers[questionId]}`);
+            if (input && input.name === `question_${questionId}`) {
+                input.checked = true;
+            }
+        });
+    }
+
     if (quizForm) {
         const formInputs = quizForm.querySelectorAll('input[type="radio"]');
         formInputs.forEach(input => {
@@ -76,6 +89,15 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Disable the submit button once a quiz is submitted to avoid double submits
+    if (quizForm) {
+        quizForm.addEventListener('submit', function() {
+            quizForm.querySelectorAll('button[type="submit"]').forEach(button => {
+                button.disabled = true;
+            });
+        });
+    }
+
     // Confirm delete actions
     const deleteButtons = document.querySelectorAll('.btn-delete');
     deleteButtons.forEach(button => {
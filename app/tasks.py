@@ -5,6 +5,18 @@ This module defines background tasks to be processed by Celery workers.
 import logging
 from app import celery, db
 from app.models import Quiz, Question, Option, User, UserQuiz, UserAnswer
+from app.services.answer_key_cache import AnswerKeyCache
+from app.services.quiz_regrader import QuizRegrader
+from app.services.attempt_sweeper import AttemptSweeper
+from app.services.quiz_statistics import QuizStatisticsService
+from app.services.attempt_events import AttemptEvents, CompletedAttempt
+from app.services.scoring import ScoringService
+from app.services.daily_activity import DailyActivityService
+from app.services.item_analysis import ItemAnalysis
+from app.services.quiz_import import QuizImport
+from app.services.user_import import UserImport
+from flask import current_app
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 import time
 
@@ -24,8 +36,8 @@ def process_quiz_submission(user_quiz_id):
         
         # No artificial delay needed in production
         
-        # Get the user quiz
-        user_quiz = UserQuiz.query.get(user_quiz_id)
+        # Get the user quiz together with its quiz
+        user_quiz = db.session.get(UserQuiz, user_quiz_id, options=[joinedload(UserQuiz.quiz)])
         if not user_quiz:
             logging.error(f"UserQuiz with ID {user_quiz_id} not found")
             return
@@ -35,40 +47,39 @@ def process_quiz_submission(user_quiz_id):
             logging.info(f"UserQuiz {user_quiz_id} already processed")
             return
             
-        # Get all questions for this quiz - use eager loading to reduce queries
-        quiz = Quiz.query.get(user_quiz.quiz_id)
-        questions = Question.query.filter_by(quiz_id=quiz.id).all()
+        # The answer key comes from the process-local cache, so only the
+        # attempt's own answers need to be queried
+        answer_key = AnswerKeyCache.get(user_quiz.quiz)
+        total_questions = answer_key.question_count
         
-        # Get user answers with a single query - eager load related data
-        user_answers = UserAnswer.query.filter_by(user_quiz_id=user_quiz.id).all()
+        answer_map = dict(db.session.query(UserAnswer.question_id, UserAnswer.option_id).filter(
+            UserAnswer.user_quiz_id == user_quiz.id
+        ).all())
+        correct_answers = answer_key.score(answer_map)
         
-        # Calculate score
-        total_questions = len(questions)
-        correct_answers = 0
-        
-        # Optimize by fetching all correct options in a single query
-        correct_options = {opt.question_id: opt.id for opt in 
-                          Option.query.filter(Option.question_id.in_([q.id for q in questions]), 
-                                             Option.is_correct == True).all()}
-        
-        # Process answers without additional database queries
-        for answer in user_answers:
-            correct_option_id = correct_options.get(answer.question_id)
-            if correct_option_id and answer.option_id == correct_option_id:
-                correct_answers += 1
-        
-        # Calculate percentage score
-        score_percentage = (correct_answers / total_questions * 100) if total_questions > 0 else 0
+        # Only the transaction that claims the attempt records it, so a
+        # concurrent completion cannot count it in the aggregates twice
+        completed_at = datetime.utcnow()
+        if not ScoringService.claim_attempt(user_quiz.id, completed_at):
+            db.session.rollback()
+            logging.info(f"UserQuiz {user_quiz_id} was completed concurrently")
+            return
         
-        # Update user quiz record
-        user_quiz.score = score_percentage
-        user_quiz.completed_at = datetime.utcnow()
+        # Update user quiz record with the correct-answer count, the same
+        # value the aggregates record, so rebuilds reproduce them exactly
+        db.session.execute(
+            UserQuiz.__table__.update()
+            .where(UserQuiz.__table__.c.id == user_quiz.id)
+            .values(score=correct_answers)
+        )
+        AttemptEvents.completed([CompletedAttempt(user_quiz.user_id, user_quiz.quiz_id, correct_answers,
+                                                  user_quiz.created_at, completed_at)])
         
         # Commit changes to database
         db.session.commit()
         
-        logging.info(f"Quiz {user_quiz_id} processed successfully. Score: {score_percentage:.2f}%")
-        return score_percentage
+        logging.info(f"Quiz {user_quiz_id} processed successfully. Score: {correct_answers}/{total_questions}")
+        return correct_answers
         
     except Exception as e:
         logging.error(f"Error processing quiz submission: {str(e)}")
@@ -81,8 +92,8 @@ def generate_quiz_statistics(quiz_id):
     """
     Generate statistics for a quiz asynchronously.
     
-    This task computes statistics about quiz performance across all users
-    who have taken the quiz.
+    This task reports statistics about quiz performance across all users
+    who have taken the quiz, read from the quiz_statistics counters.
     
     Args:
         quiz_id: ID of the Quiz to analyze
@@ -90,37 +101,14 @@ def generate_quiz_statistics(quiz_id):
     try:
         logging.info(f"Generating statistics for Quiz ID: {quiz_id}")
         
-        # No artificial delay needed in production
-        
-        # Get all completed user quizzes for this quiz
-        user_quizzes = UserQuiz.query.filter(
-            UserQuiz.quiz_id == quiz_id,
-            UserQuiz.completed_at.isnot(None)
-        ).all()
-        
-        if not user_quizzes:
-            logging.info(f"No completed quizzes found for Quiz ID {quiz_id}")
-            return {
-                'quiz_id': quiz_id,
-                'total_attempts': 0,
-                'average_score': 0,
-                'completion_rate': 0
-            }
-        
-        # Calculate statistics
-        total_attempts = len(user_quizzes)
-        total_score = sum(uq.score for uq in user_quizzes if uq.score is not None)
-        average_score = total_score / total_attempts if total_attempts > 0 else 0
-        
-        # Get all started quizzes (including incomplete)
-        all_started = UserQuiz.query.filter_by(quiz_id=quiz_id).count()
-        completion_rate = (total_attempts / all_started * 100) if all_started > 0 else 0
-        
+        # The running counters are maintained on every start and completion,
+        # so this reads a handful of shard rows instead of every attempt
+        summary = QuizStatisticsService.get(quiz_id)
         stats = {
             'quiz_id': quiz_id,
-            'total_attempts': total_attempts,
-            'average_score': average_score,
-            'completion_rate': completion_rate
+            'total_attempts': summary['attempts_completed'],
+            'average_score': summary['average_score'],
+            'completion_rate': summary['completion_rate']
         }
         
         logging.info(f"Statistics generated for Quiz ID {quiz_id}: {stats}")
@@ -129,3 +117,140 @@ def generate_quiz_statistics(quiz_id):
     except Exception as e:
         logging.error(f"Error generating quiz statistics: {str(e)}")
         raise
+
+@celery.task(name='app.tasks.regrade_quiz', time_limit=3600)
+def regrade_quiz(quiz_id, chunk_size=5000):
+    """
+    Re-score every completed attempt of a quiz asynchronously.
+    
+    Used after an answer key has been corrected. The heavy lifting is done
+    in vectorized chunks by QuizRegrader.
+    
+    Args:
+        quiz_id: ID of the Quiz to regrade
+        chunk_size: Number of attempts scored per chunk
+    """
+    try:
+        return QuizRegrader.regrade_quiz(quiz_id, chunk_size=chunk_size)
+    except Exception as e:
+        logging.error(f"Error regrading quiz {quiz_id}: {str(e)}")
+        db.session.rollback()
+        raise
+
+@celery.task(name='app.tasks.sweep_expired_attempts', time_limit=300)
+def sweep_expired_attempts():
+    """
+    Close expired timed attempts and abandoned untimed attempts.
+    
+    Scheduled by Celery beat every SWEEPER_INTERVAL_SECONDS. Statistics are
+    regenerated once for every quiz that had attempts closed.
+    
+    Returns:
+        dict: Number of attempts closed in this run
+    """
+    try:
+        config = current_app.config
+        summary = AttemptSweeper.sweep(
+            batch_size=config['SWEEPER_BATCH_SIZE'],
+            grace_seconds=config['SWEEPER_GRACE_SECONDS'],
+            abandon_after_hours=config['SWEEPER_ABANDON_AFTER_HOURS']
+        )
+        
+        for quiz_id in summary['quiz_ids']:
+            generate_quiz_statistics.delay(quiz_id)
+        
+        return summary
+    except Exception as e:
+        logging.error(f"Error sweeping expired attempts: {str(e)}")
+        db.session.rollback()
+        raise
+
+@celery.task(name='app.tasks.compact_daily_activity', time_limit=300)
+def compact_daily_activity():
+    """
+    Merge the shard rows of past days in the daily_activity rollup.
+    
+    Scheduled by Celery beat once a night (UTC).
+    
+    Returns:
+        int: Number of (day, quiz) rows in the compacted days
+    """
+    try:
+        return DailyActivityService.compact()
+    except Exception as e:
+        logging.error(f"Error compacting daily activity: {str(e)}")
+        db.session.rollback()
+        raise
+
+@celery.task(name='app.tasks.analyze_quiz_items', time_limit=3600)
+def analyze_quiz_items(quiz_id, full=False):
+    """
+    Compute the item statistics (difficulty, discrimination, distractors) of a quiz.
+    
+    Only attempts completed since the previous run are read, unless the quiz
+    changed since then or a full recompute is requested.
+    
+    Args:
+        quiz_id: ID of the Quiz to analyze
+        full: Recompute from every completed attempt
+    """
+    try:
+        return ItemAnalysis.analyze_quiz(quiz_id, full=full)
+    except Exception as e:
+        logging.error(f"Error analyzing items of quiz {quiz_id}: {str(e)}")
+        db.session.rollback()
+        raise
+
+@celery.task(name='app.tasks.import_quiz_file', time_limit=3600)
+def import_quiz_file(job_id):
+    """
+    Import a quiz file uploaded through the admin import page.
+    
+    Progress is committed to the job after every batch of questions, and
+    problems with the file are recorded on the job.
+    
+    Args:
+        job_id: ID of the QuizImportJob to run
+    """
+    try:
+        return QuizImport.run(job_id)
+    except Exception as e:
+        logging.error(f"Error running quiz import job {job_id}: {str(e)}")
+        db.session.rollback()
+        raise
+
+@celery.task(name='app.tasks.import_users_file', time_limit=3600)
+def import_users_file(job_id):
+    """
+    Create the users of a CSV file uploaded through the admin import page.
+    
+    Password hashing is CPU bound, so it runs here instead of in the web
+    request; the summary (or the reason the file was rejected) is recorded
+    on the job.
+    
+    Args:
+        job_id: ID of the UserImportJob to run
+    """
+    try:
+        return UserImport.run(job_id)
+    except Exception as e:
+        logging.error(f"Error running user import job {job_id}: {str(e)}")
+        db.session.rollback()
+        raise
+
+@celery.task(name='app.tasks.purge_user_import_jobs', time_limit=300)
+def purge_user_import_jobs():
+    """
+    Fail stuck user import jobs and drop leftover uploads (with their passwords).
+    
+    Scheduled by Celery beat every USER_IMPORT_PURGE_INTERVAL_SECONDS.
+    
+    Returns:
+        int: Number of jobs whose upload was dropped
+    """
+    try:
+        return UserImport.purge_unfinished()
+    except Exception as e:
+        logging.error(f"Error purging user import jobs: {str(e)}")
+        db.session.rollback()
+        raise
@@ -0,0 +1,71 @@
+"""
+In-process caching primitives.
+"""
+import threading
+from collections import OrderedDict
+
+
+class VersionedLRUCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries carry a version
+    
+    A lookup only hits when the caller's version matches the version the
+    entry was stored with, so readers that know the current version of the
+    underlying data (e.g. Quiz.version) never see stale values, even when
+    another process changed the data.
+    """
+    
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, version):
+        """
+        Get a cached value
+        
+        Args:
+            key: Cache key
+            version: Version the value must have been stored with
+            
+        Returns:
+            The cached value or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, version, value):
+        """
+        Store a value, evicting the least recently used entries if needed
+        
+        Args:
+            key: Cache key
+            version: Version of the data the value was built from
+            value: Value to cache
+        """
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,158 @@
+"""
+Streaming gzip compression of dynamic responses.
+
+GzipMiddleware sits in the WSGI stack (inside the static asset layer,
+whose files are already precompressed) and compresses HTML and JSON
+responses for clients that accept gzip. Responses with a known length
+are compressed when they reach COMPRESS_MIN_SIZE; streamed responses
+without a Content-Length are compressed chunk by chunk with a sync
+flush after each chunk so the client keeps receiving data as it is
+produced.
+"""
+import zlib
+
+
+def _quality(params):
+    # q-value of one Accept-Encoding entry; a malformed one counts as a refusal
+    for param in params.split(';'):
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                return float(value.strip())
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Check whether an Accept-Encoding header allows gzip
+    
+    Every entry is parsed first, so an explicit gzip entry takes precedence
+    over the * wildcard wherever each appears in the header.
+    
+    Args:
+        accept_encoding (str): Value of the Accept-Encoding header
+        
+    Returns:
+        bool: True if gzip (or *, without a gzip entry) is listed with a q-value above 0
+    """
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.strip().partition(';')
+        name = name.strip().lower()
+        if name == 'x-gzip':
+            name = 'gzip'
+        if name in ('gzip', '*'):
+            qualities[name] = max(qualities.get(name, 0.0), _quality(params))
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+class GzipMiddleware:
+    """
+    WSGI middleware gzip-compressing responses by content type and size
+    
+    Args:
+        wsgi_app (callable): Application to wrap
+        minimum_size (int): Smallest Content-Length worth compressing
+        compress_level (int): Default zlib level (1-9)
+        mimetypes (dict): Compressible mimetypes mapped to a level override (or None)
+    """
+    
+    def __init__(self, wsgi_app, minimum_size=1024, compress_level=6, mimetypes=None):
+        self.wsgi_app = wsgi_app
+        self.minimum_size = minimum_size
+        self.compress_level = compress_level
+        self.mimetypes = dict(mimetypes or {})
+    
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or not accepts_gzip(environ.get('HTTP_ACCEPT_ENCODING', '')):
+            return self.wsgi_app(environ, start_response)
+        
+        state = {}
+        
+        def gzip_start_response(status, headers, exc_info=None):
+            level = self._compress_level(status, headers)
+            if level is not None:
+                streamed = not any(name.lower() == 'content-length' for name, _ in headers)
+                headers = self._rewrite_headers(headers)
+                state['compressor'] = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+                state['streamed'] = streamed
+            write = start_response(status, headers, exc_info)
+            state['started'] = True
+            
+            def gzip_write(data):
+                if 'compressor' in state:
+                    data = state['compressor'].compress(data) + state['compressor'].flush(zlib.Z_SYNC_FLUSH)
+                write(data)
+            return gzip_write
+        
+        app_iter = self.wsgi_app(environ, gzip_start_response)
+        if state.get('started') and 'compressor' not in state:
+            # Already known to pass through; keep the server's file wrapper intact
+            return app_iter
+        return self._iter_compressed(app_iter, state)
+    
+    def _compress_level(self, status, headers):
+        # Returns the zlib level to use, or None to pass the response through untouched
+        if not status.startswith('200'):
+            return None
+        values = {}
+        for name, value in headers:
+            values[name.lower()] = value
+        if 'content-encoding' in values or 'no-transform' in values.get('cache-control', '').lower():
+            return None
+        
+        mimetype = values.get('content-type', '').split(';', 1)[0].strip().lower()
+        if mimetype not in self.mimetypes:
+            return None
+        
+        length = values.get('content-length')
+        if length is not None and int(length) < self.minimum_size:
+            return None
+        
+        level = self.mimetypes[mimetype]
+        return self.compress_level if level is None else level
+    
+    @staticmethod
+    def _rewrite_headers(headers):
+        rewritten = []
+        vary = None
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered == 'content-length':
+                continue
+            if lowered == 'vary':
+                vary = value
+                continue
+            if lowered == 'etag' and not value.startswith('W/'):
+                # The encoded body differs from the identity one, so only weak comparison holds
+                value = f'W/{value}'
+            rewritten.append((name, value))
+        
+        if vary is None:
+            vary = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            vary = f'{vary}, Accept-Encoding'
+        rewritten.append(('Vary', vary))
+        rewritten.append(('Content-Encoding', 'gzip'))
+        return rewritten
+    
+    @staticmethod
+    def _iter_compressed(app_iter, state):
+        try:
+            for chunk in app_iter:
+                compressor = state.get('compressor')
+                if compressor is None:
+                    yield chunk
+                    continue
+                data = compressor.compress(chunk)
+                if state['streamed']:
+                    data += compressor.flush(zlib.Z_SYNC_FLUSH)
+                if data:
+                    yield data
+            if 'compressor' in state:
+                yield state['compressor'].flush()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
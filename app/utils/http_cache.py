@@ -0,0 +1,85 @@
+"""
+Conditional GET helpers (ETag / If-None-Match) and Cache-Control policies.
+"""
+import hashlib
+import time
+from flask import current_app, request, session
+from flask_login import current_user
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag value from the parts that identify a representation
+    
+    Args:
+        *parts: Values such as an endpoint name, quiz id and Quiz.version
+        
+    Returns:
+        str: Opaque ETag value (without quotes)
+    """
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def page_etag(*parts):
+    """
+    Build an ETag for an HTML page rendered through base.html
+    
+    Pages also depend on the logged-in user (navigation bar), embed CSRF
+    tokens that expire after WTF_CSRF_TIME_LIMIT and link the fingerprinted
+    assets of the current build, so all three are folded in.
+    
+    Args:
+        *parts: Values identifying the page content
+        
+    Returns:
+        str: Opaque ETag value (without quotes)
+    """
+    csrf_lifetime = current_app.config.get('WTF_CSRF_TIME_LIMIT') or 3600
+    csrf_window = int(time.time() // max(csrf_lifetime // 2, 1))
+    user_id = current_user.get_id() if current_user.is_authenticated else None
+    static_assets = current_app.extensions.get('static_assets')
+    build_id = static_assets.build_id if static_assets is not None else None
+    return make_etag(user_id, session.get('csrf_token'), csrf_window, build_id, *parts)
+
+
+def not_modified(etag, policy):
+    """
+    Answer a conditional GET before any rendering work is done
+    
+    If-None-Match uses the weak comparison, so ETags that a proxy such as
+    the ingress weakened (W/"...") while compressing still match.
+    Requests with pending flash messages are never answered with 304 so
+    the messages are not swallowed.
+    
+    Args:
+        etag (str): Current ETag of the resource
+        policy (str): Name of the Cache-Control policy (see HTTP_CACHE_POLICIES)
+        
+    Returns:
+        Response: 304 response, or None if the full response must be sent
+    """
+    if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+        return None
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    
+    response = current_app.response_class(status=304)
+    return add_validators(response, etag, policy)
+
+
+def add_validators(response, etag, policy):
+    """
+    Attach the ETag and Cache-Control headers to a full response
+    
+    Args:
+        response (Response): Response object
+        etag (str): Current ETag of the resource
+        policy (str): Name of the Cache-Control policy (see HTTP_CACHE_POLICIES)
+        
+    Returns:
+        Response: The same response object
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = current_app.config['HTTP_CACHE_POLICIES'][policy]
+    response.vary.add('Cookie')
+    return response
@@ -0,0 +1,232 @@
+"""
+Keyset (seek) pagination shared by the list endpoints.
+
+Pages are addressed by opaque cursors holding the sort key of the first or
+last row of the neighbouring page instead of an OFFSET, so fetching page N
+costs one index range scan no matter how deep the user has paged.
+"""
+import base64
+from bisect import bisect_left, bisect_right
+import json
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import bindparam, tuple_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not fit the list"""
+
+
+class KeysetPage:
+    """One page of results together with the cursors of its neighbours"""
+    
+    def __init__(self, items, limit, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.limit = limit
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+    
+    def __iter__(self):
+        return iter(self.items)
+    
+    def __len__(self):
+        return len(self.items)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def _coerce_key(columns, key):
+    # A decodable cursor may still come from another list (or be forged), so
+    # its values must match the sort key columns before they reach the query
+    if len(key) != len(columns):
+        raise InvalidCursor(f'Cursor has {len(key)} key values, expected {len(columns)}')
+    values = []
+    for column, value in zip(columns, key):
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = object
+        if python_type is datetime and isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise InvalidCursor(f'Invalid cursor value for {column.key}: {value!r}')
+        elif python_type is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if value is None or isinstance(value, bool) != (python_type is bool) or not isinstance(value, python_type):
+            raise InvalidCursor(f'Invalid cursor value for {column.key}: {value!r}')
+        values.append(value)
+    return tuple(values)
+
+
+def encode_cursor(direction, key):
+    """
+    Encode a cursor
+    
+    Args:
+        direction (str): 'next' (rows after key) or 'prev' (rows before key)
+        key (tuple): Sort key values of the boundary row
+        
+    Returns:
+        str: URL-safe opaque cursor
+    """
+    payload = json.dumps({'d': direction, 'k': [_encode_value(v) for v in key]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor created by encode_cursor
+    
+    Args:
+        cursor (str): Opaque cursor
+        
+    Returns:
+        tuple: (direction, key values)
+        
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        direction = payload['d']
+        key = tuple(_decode_value(v) for v in payload['k'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+    if direction not in ('next', 'prev'):
+        raise InvalidCursor(f'Invalid cursor direction: {direction}')
+    return direction, key
+
+
+def page_args():
+    """
+    Read the cursor and page size from the query string
+    
+    The page size is taken from ?limit= and clamped to MAX_PAGE_SIZE;
+    malformed cursors are ignored and start from the first page. Cursors
+    that decode but do not fit the list they are used on are ignored by
+    keyset_paginate() and paginate_sequence() the same way.
+    
+    Returns:
+        tuple: (cursor or None, limit)
+    """
+    limit = request.args.get('limit', type=int) or current_app.config.get('PAGE_SIZE', 50)
+    limit = max(1, min(limit, current_app.config.get('MAX_PAGE_SIZE', 200)))
+    cursor = request.args.get('cursor') or None
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor:
+            cursor = None
+    return cursor, limit
+
+
+def keyset_paginate(query, columns, cursor=None, limit=50, descending=False):
+    """
+    Fetch one page of a query ordered by an indexed, unique sort key
+    
+    Args:
+        query (Query): Query to paginate (without ORDER BY / LIMIT)
+        columns (list): Sort key columns, ending with a unique column such as id
+        cursor (str): Cursor from a previous page (None for the first page)
+        limit (int): Page size
+        descending (bool): Sort newest/highest first
+        
+    Returns:
+        KeysetPage: Page of items with next/prev cursors (the first page if
+                    the cursor does not fit the sort key columns)
+    """
+    direction, key = 'next', None
+    if cursor:
+        try:
+            direction, key = decode_cursor(cursor)
+            key = _coerce_key(columns, key)
+        except InvalidCursor:
+            direction, key = 'next', None
+    backwards = direction == 'prev'
+    
+    # Walking backwards reverses the scan order and the comparison
+    scan_descending = descending != backwards
+    if key is not None:
+        sort_key = tuple_(*columns)
+        bound = tuple_(*[bindparam(None, value, type_=column.type) for column, value in zip(columns, key)])
+        query = query.filter(sort_key < bound if scan_descending else sort_key > bound)
+    
+    order_by = [column.desc() if scan_descending else column.asc() for column in columns]
+    rows = query.order_by(*order_by).limit(limit + 1).all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+    
+    def row_key(row):
+        return tuple(getattr(row, column.key) for column in columns)
+    
+    next_cursor = prev_cursor = None
+    if rows:
+        if backwards or has_more:
+            next_cursor = encode_cursor('next', row_key(rows[-1]))
+        if (backwards and has_more) or (not backwards and key is not None):
+            prev_cursor = encode_cursor('prev', row_key(rows[0]))
+    
+    return KeysetPage(rows, limit, next_cursor, prev_cursor)
+
+
+def paginate_sequence(items, key, cursor=None, limit=50):
+    """
+    Keyset-paginate an in-memory sequence already sorted ascending by key
+    
+    Produces the same cursors as keyset_paginate, so cached lists can back
+    the same endpoints as queries.
+    
+    Args:
+        items (Sequence): Items sorted ascending by key
+        key (callable): Returns the sort key tuple of an item
+        cursor (str): Cursor from a previous page (None for the first page)
+        limit (int): Page size
+        
+    Returns:
+        KeysetPage: Page of items with next/prev cursors (the first page if
+                    the cursor does not fit the sort key)
+    """
+    keys = [key(item) for item in items]
+    start, end = 0, min(limit, len(items))
+    if cursor and keys:
+        try:
+            direction, bound = decode_cursor(cursor)
+            # The cursor must have the shape and value types of the sort key
+            if len(bound) != len(keys[0]) or any(type(a) is not type(b) for a, b in zip(bound, keys[0])):
+                raise InvalidCursor('Cursor does not fit the sort key')
+        except InvalidCursor:
+            direction = None
+        if direction == 'next':
+            start = bisect_right(keys, bound)
+            end = min(start + limit, len(items))
+        elif direction == 'prev':
+            end = bisect_left(keys, bound)
+            start = max(end - limit, 0)
+    
+    rows = list(items[start:end])
+    next_cursor = encode_cursor('next', keys[end - 1]) if rows and end < len(items) else None
+    prev_cursor = encode_cursor('prev', keys[start]) if rows and start > 0 else None
+    return KeysetPage(rows, limit, next_cursor, prev_cursor)
@@ -0,0 +1,206 @@
+"""
+Cache shared by the worker processes of one host, backed by a SQLite file.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+COUNTERS = ('hits', 'stale_hits', 'misses', 'computes', 'waits')
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+)
+
+
+class SharedCache:
+    """
+    TTL cache of JSON values with single-flight recomputes and stale-while-revalidate
+    
+    The entries live in a SQLite file in WAL mode, so every worker process
+    on the host (e.g. the gunicorn workers of a pod) reads the same values
+    without an external service. A value is fresh for ttl seconds and may
+    then be served stale for another stale_ttl seconds.
+    
+    Recomputes are coordinated with a lease row per key: only the process
+    that inserts the lease computes the value. While it does, the others
+    return the stale value if there is one, or wait for the new value
+    otherwise. A lease expires after lock_timeout seconds so that a crashed
+    worker cannot block a key for good.
+    
+    A ttl of 0 disables the cache; get_or_compute() then always computes.
+    """
+    
+    def __init__(self, app=None):
+        self.path = None
+        self.ttl = 0
+        self.stale_ttl = 0
+        self.lock_timeout = 30
+        self.poll_interval = 0.05
+        self._local = threading.local()
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        self.configure(
+            app.config.get('ANALYTICS_CACHE_PATH'),
+            ttl=app.config.get('ANALYTICS_CACHE_TTL', 0),
+            stale_ttl=app.config.get('ANALYTICS_CACHE_STALE_SECONDS', 0),
+            lock_timeout=app.config.get('ANALYTICS_CACHE_LOCK_TIMEOUT', 30)
+        )
+        app.extensions['analytics_cache'] = self
+    
+    def configure(self, path, ttl, stale_ttl=0, lock_timeout=30):
+        """
+        Point the cache at a database file and set its timings
+        
+        Args:
+            path (str): SQLite file shared by the worker processes
+            ttl (float): Seconds a value is fresh (0 disables the cache)
+            stale_ttl (float): Seconds a value may be served stale after that
+            lock_timeout (float): Seconds after which a recompute lease is abandoned
+        """
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self._local = threading.local()
+    
+    @property
+    def enabled(self):
+        return bool(self.path) and self.ttl > 0
+    
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.lock_timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # The cache can always be recomputed, so skip the fsyncs
+            connection.execute('PRAGMA synchronous=OFF')
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+    
+    def get_or_compute(self, key, compute):
+        """
+        Get the value of a key, computing it at most once across processes on a miss
+        
+        Args:
+            key (str): Cache key
+            compute (callable): Function returning the JSON-serializable value
+        
+        Returns:
+            The cached or freshly computed value
+        """
+        if not self.enabled:
+            return compute()
+        
+        try:
+            connection = self._connection()
+        except sqlite3.Error as e:
+            logging.error(f"Shared cache unavailable, computing {key}: {str(e)}")
+            return compute()
+        
+        deadline = time.time() + self.lock_timeout
+        waiting = False
+        while True:
+            now = time.time()
+            row = self._read(connection, key)
+            if row is not None and now < row[1]:
+                if not waiting:
+                    self._count(connection, 'hits')
+                return json.loads(row[0])
+            
+            owner = self._acquire(connection, key, now)
+            if owner is not None:
+                try:
+                    # The previous holder may have stored the value since we looked
+                    row = self._read(connection, key)
+                    if row is not None and time.time() < row[1]:
+                        if not waiting:
+                            self._count(connection, 'hits')
+                        return json.loads(row[0])
+                    if not waiting:
+                        self._count(connection, 'misses')
+                    value = compute()
+                    self._store(connection, key, value)
+                    self._count(connection, 'computes')
+                    return value
+                finally:
+                    connection.execute('DELETE FROM leases WHERE key = ? AND owner = ?', (key, owner))
+            
+            # Another process is recomputing this key
+            if row is not None and now < row[1] + self.stale_ttl and not waiting:
+                self._count(connection, 'stale_hits')
+                return json.loads(row[0])
+            if now >= deadline:
+                logging.warning(f"Timed out waiting for the shared cache to compute {key}")
+                return compute()
+            if not waiting:
+                self._count(connection, 'misses')
+                self._count(connection, 'waits')
+                waiting = True
+            time.sleep(self.poll_interval)
+    
+    def _read(self, connection, key):
+        return connection.execute('SELECT value, expires_at FROM entries WHERE key = ?', (key,)).fetchone()
+    
+    def _acquire(self, connection, key, now):
+        owner = uuid.uuid4().hex
+        cursor = connection.execute(
+            'INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+            'WHERE leases.expires_at < ?',
+            (key, owner, now + self.lock_timeout, now)
+        )
+        return owner if cursor.rowcount == 1 else None
+    
+    def _store(self, connection, key, value):
+        now = time.time()
+        connection.execute(
+            'INSERT INTO entries (key, value, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at',
+            (key, json.dumps(value), now + self.ttl)
+        )
+        # Values past their stale window will never be served again
+        connection.execute('DELETE FROM entries WHERE expires_at < ?', (now - self.stale_ttl,))
+    
+    def _count(self, connection, name):
+        connection.execute(
+            'INSERT INTO counters (name, value) VALUES (?, 1) '
+            'ON CONFLICT (name) DO UPDATE SET value = value + 1',
+            (name,)
+        )
+    
+    def stats(self):
+        """
+        Get the counters shared by all processes
+        
+        Returns:
+            dict: hits (fresh), stale_hits (served while another process recomputes),
+                  misses (computed or waited for), computes, waits and the number of entries
+        """
+        stats = dict.fromkeys(COUNTERS, 0)
+        stats['entries'] = 0
+        if not self.enabled:
+            return stats
+        connection = self._connection()
+        stats.update(connection.execute('SELECT name, value FROM counters').fetchall())
+        stats['entries'] = connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        return stats
+    
+    def clear(self):
+        """Drop all entries, leases and counters"""
+        if not self.enabled:
+            return
+        connection = self._connection()
+        for table in ('entries', 'leases', 'counters'):
+            connection.execute(f'DELETE FROM {table}')
@@ -0,0 +1,158 @@
+"""
+SQL helpers shared by the services.
+This module hides the few places where PostgreSQL and SQLite differ.
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+# Namespace (first key) of the advisory locks taken by lock_quiz_aggregates();
+# quiz 0 stands for every quiz
+QUIZ_AGGREGATES_LOCK = 7301
+
+
+def dialect_name():
+    """
+    Get the name of the dialect the current session is bound to
+    
+    Returns:
+        str: 'postgresql', 'sqlite', ...
+    """
+    return db.session.get_bind().dialect.name
+
+
+def upsert(table):
+    """
+    Create an INSERT statement that supports ON CONFLICT clauses
+    
+    Both PostgreSQL and SQLite (3.24+) understand INSERT ... ON CONFLICT,
+    but SQLAlchemy exposes it through dialect specific constructs.
+    
+    Args:
+        table (Table): Table to insert into
+        
+    Returns:
+        Insert: Dialect specific insert construct with on_conflict_do_update()
+    """
+    if dialect_name() == 'postgresql':
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def duration_seconds(start, end):
+    """
+    Build an expression for the number of seconds between two timestamps
+    
+    Args:
+        start (ColumnElement): Start timestamp
+        end (ColumnElement): End timestamp
+        
+    Returns:
+        ColumnElement: Float number of seconds
+    """
+    if dialect_name() == 'postgresql':
+        return db.func.extract('epoch', end - start)
+    # julianday() arithmetic is off by float noise, round it to milliseconds
+    return db.func.round((db.func.julianday(end) - db.func.julianday(start)) * 86400.0, 3)
+
+
+def truncate_to_day(column):
+    """
+    Build an expression truncating a timestamp to its calendar day
+    
+    Args:
+        column (ColumnElement): Timestamp column
+        
+    Returns:
+        ColumnElement: Day value (a date on PostgreSQL, a 'YYYY-MM-DD' string on SQLite);
+                       str() of either is the ISO date
+    """
+    if dialect_name() == 'postgresql':
+        return db.cast(column, db.Date)
+    return db.func.date(column)
+
+
+def least(*args):
+    """
+    Build a scalar minimum of several expressions (LEAST on PostgreSQL, MIN on SQLite)
+    
+    Args:
+        *args (ColumnElement): Expressions to compare
+        
+    Returns:
+        ColumnElement: Smallest value
+    """
+    if dialect_name() == 'postgresql':
+        return db.func.least(*args)
+    return db.func.min(*args)
+
+
+def greatest(*args):
+    """
+    Build a scalar maximum of several expressions (GREATEST on PostgreSQL, MAX on SQLite)
+    
+    Args:
+        *args (ColumnElement): Expressions to compare
+        
+    Returns:
+        ColumnElement: Largest value
+    """
+    if dialect_name() == 'postgresql':
+        return db.func.greatest(*args)
+    return db.func.max(*args)
+
+
+def prefix_match(column, prefix):
+    """
+    Build a case-insensitive "starts with" condition that can use an index
+    
+    PostgreSQL gets an escaped ILIKE pattern, which a pg_trgm GIN index on
+    the column answers. SQLite only uses an index for LIKE without an
+    ESCAPE clause, so it gets the range scan its LIKE optimization would
+    produce instead, over a NOCASE index on the column (both ignore ASCII
+    case only).
+    
+    Args:
+        column (ColumnElement): Text column
+        prefix (str): Prefix to match literally
+    
+    Returns:
+        ColumnElement: Condition
+    """
+    if dialect_name() == 'postgresql':
+        pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return column.ilike(pattern, escape='\\')
+    nocase = column.collate('NOCASE')
+    return db.and_(nocase >= prefix, nocase < prefix + '\U0010ffff')
+
+
+def lock_quiz_aggregates(quiz_ids=None, exclusive=False):
+    """
+    Lock the maintained per-quiz aggregates until the transaction ends
+    
+    Recorders take shared locks, which never wait for each other. Rebuilds
+    read the raw attempts, then delete and reinsert aggregate rows, so they
+    take an exclusive lock first; otherwise an attempt recorded between the
+    read and the delete would be lost. On PostgreSQL these are transaction
+    level advisory locks: the every-quiz key first, then the quiz keys in
+    ascending order, so lockers cannot deadlock each other. SQLite runs one
+    writing transaction at a time, so a rebuild only takes the database
+    write lock before it reads.
+    
+    Args:
+        quiz_ids (iterable): IDs of the quizzes (None locks every quiz)
+        exclusive (bool): Lock for a rebuild instead of for recording
+    """
+    if dialect_name() != 'postgresql':
+        if exclusive:
+            # Any write statement takes the write lock, even one matching no rows
+            db.session.execute(db.text('UPDATE quizzes SET id = id WHERE 1 = 0'))
+        return
+    
+    shared_lock = db.func.pg_advisory_xact_lock_shared
+    if quiz_ids is None:
+        locks = [((db.func.pg_advisory_xact_lock if exclusive else shared_lock), 0)]
+    else:
+        quiz_lock = db.func.pg_advisory_xact_lock if exclusive else shared_lock
+        locks = [(shared_lock, 0)] + [(quiz_lock, quiz_id) for quiz_id in sorted(set(quiz_ids))]
+    for lock, key in locks:
+        db.session.execute(db.select(lock(QUIZ_AGGREGATES_LOCK, key)))
@@ -0,0 +1,112 @@
+"""
+Benchmark bytes on the wire and CPU per request for gzip levels 1-9 on
+representative pages and analytics JSON.
+
+Each response is rendered once; the compression cost is then measured by
+running GzipMiddleware over the captured body, and reported next to the
+CPU needed to render the response itself.
+
+Usage:
+    python benchmarks/bench_compression.py [--questions 100] [--attempts 200] [--requests 50]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+from app import create_app, db
+from app.models import User, Quiz, Question, Option, UserQuiz
+from app.utils.compression import GzipMiddleware
+
+
+def build_fixture(question_count, attempt_count):
+    quiz = Quiz(title='Benchmark Quiz', is_live=True, question_count=question_count)
+    db.session.add(quiz)
+    db.session.flush()
+    for i in range(question_count):
+        question = Question(quiz=quiz, text=f'Benchmark question {i} about a longer topic sentence')
+        for j in range(4):
+            question.options.append(Option(text=f'Option {j} of question {i}', is_correct=(j == 0)))
+        db.session.add(question)
+    
+    admin = User(username='bench', email='bench@example.com', is_admin=True)
+    admin.password = 'bench'
+    db.session.add(admin)
+    db.session.flush()
+    
+    now = datetime.utcnow()
+    for i in range(attempt_count):
+        db.session.add(UserQuiz(user_id=admin.id, quiz_id=quiz.id, score=i % question_count,
+                                created_at=now - timedelta(minutes=i + 10), completed_at=now - timedelta(minutes=i)))
+    open_attempt = UserQuiz(user_id=admin.id, quiz_id=quiz.id)
+    db.session.add(open_attempt)
+    db.session.commit()
+    return admin.id, open_attempt.id
+
+
+def render(client, url, requests):
+    started = time.process_time()
+    for _ in range(requests):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+    return response, (time.process_time() - started) / requests * 1000
+
+
+def compress(response, level, requests):
+    body = response.get_data()
+    mimetype = response.mimetype
+    middleware = GzipMiddleware(
+        lambda environ, start_response: Response(body, mimetype=mimetype)(environ, start_response),
+        minimum_size=0, compress_level=level, mimetypes={mimetype: None}
+    )
+    client = Client(middleware)
+    started = time.process_time()
+    for _ in range(requests):
+        compressed = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    return len(compressed.data), (time.process_time() - started) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--attempts', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+    
+    logging.disable(logging.CRITICAL)
+    app = create_app('testing')
+    app.config['COMPRESS_ENABLED'] = False
+    
+    with app.app_context():
+        db.create_all()
+        user_id, user_quiz_id = build_fixture(args.questions, args.attempts)
+        
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+        app.login_manager.session_protection = None
+        
+        urls = [f'/quiz/{user_quiz_id}', f'/admin/results?limit={args.attempts}',
+                '/api/activity-over-time', '/api/user-performance']
+        for url in urls:
+            response, render_ms = render(client, url, args.requests)
+            identity = len(response.get_data())
+            print(f'{url}  ({response.mimetype}, {identity} bytes, {render_ms:.2f} ms CPU to render)')
+            print(f'  {"level":>5} {"bytes":>8} {"ratio":>6} {"ms CPU":>8} {"+% CPU":>7}')
+            for level in range(1, 10):
+                size, compress_ms = compress(response, level, args.requests)
+                print(f'  {level:>5} {size:>8} {size / identity:>6.1%} {compress_ms:>8.3f} '
+                      f'{compress_ms / render_ms:>7.1%}')
+            print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark the vectorized item analysis of a quiz with about a million answers.
+
+A full run reads every completed attempt; the incremental run that follows
+only reads the attempts completed since, which is what the periodic job
+does in practice.
+
+Usage:
+    python benchmarks/bench_item_analysis.py [--questions 40] [--attempts 25000] [--new-attempts 1000]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+
+from app import create_app, db
+from app.models import User, Quiz, Question, Option, UserQuiz, UserAnswer
+from app.services import item_analysis
+from app.services.item_analysis import ItemAnalysis
+
+
+def build_fixture(question_count):
+    quiz = Quiz(title='Benchmark Quiz', is_live=True, question_count=question_count)
+    db.session.add(quiz)
+    db.session.flush()
+    for i in range(question_count):
+        question = Question(quiz=quiz, text=f'Benchmark question {i}')
+        for j in range(4):
+            question.options.append(Option(text=f'Option {j}', is_correct=(j == 0)))
+        db.session.add(question)
+    
+    user = User(username='bench', email='bench@example.com')
+    db.session.add(user)
+    db.session.commit()
+    
+    options = np.array([[option.id for option in question.options.order_by(Option.id)]
+                        for question in quiz.questions.order_by(Question.id)], dtype=np.int64)
+    return quiz.id, user.id, options
+
+
+def add_attempts(quiz_id, user_id, options, count, completed_at, rng):
+    """Insert completed attempts answering every question, better attempts choosing the key more often"""
+    question_count = len(options)
+    first_id = (db.session.query(db.func.max(UserQuiz.id)).scalar() or 0) + 1
+    db.session.execute(UserQuiz.__table__.insert(), [{
+        'id': first_id + i, 'user_id': user_id, 'quiz_id': quiz_id, 'score': 0,
+        'created_at': completed_at - timedelta(minutes=10), 'completed_at': completed_at
+    } for i in range(count)])
+    
+    ability = rng.random(count)[:, None]
+    correct = rng.random((count, question_count)) < 0.3 + 0.6 * ability
+    choice = np.where(correct, 0, rng.integers(1, 4, (count, question_count)))
+    selected = options[np.arange(question_count), choice]
+    question_ids = db.session.query(Question.id).filter_by(quiz_id=quiz_id).order_by(Question.id).all()
+    question_ids = [question_id for question_id, in question_ids]
+    db.session.execute(UserAnswer.__table__.insert(), [{
+        'user_quiz_id': first_id + i, 'question_id': question_ids[j], 'option_id': int(selected[i, j]),
+        'created_at': completed_at
+    } for i in range(count) for j in range(question_count)])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--questions', type=int, default=40)
+    parser.add_argument('--attempts', type=int, default=25000)
+    parser.add_argument('--new-attempts', type=int, default=1000)
+    args = parser.parse_args()
+    
+    logging.disable(logging.CRITICAL)
+    app = create_app('testing')
+    # Attempts are inserted with final completion times, so nothing needs to settle
+    item_analysis.SETTLE_SECONDS = 0
+    rng = np.random.default_rng(0)
+    
+    with app.app_context():
+        db.create_all()
+        quiz_id, user_id, options = build_fixture(args.questions)
+        started = time.perf_counter()
+        add_attempts(quiz_id, user_id, options, args.attempts, datetime.utcnow() - timedelta(hours=2), rng)
+        print(f'Inserted {args.attempts * args.questions} answers in {time.perf_counter() - started:.1f}s')
+        
+        for label, full in (('full', True), ('incremental (no new attempts)', False)):
+            summary = ItemAnalysis.analyze_quiz(quiz_id, full=full)
+            print(f"{label:>30}: {summary['attempts']:>7} attempts {summary['answers']:>9} answers "
+                  f"{summary['seconds']:>7.2f}s {summary['answers_per_second']:>12,.0f} answers/sec")
+        
+        # Attempts completed after the stored watermark
+        add_attempts(quiz_id, user_id, options, args.new_attempts, datetime.utcnow(), rng)
+        summary = ItemAnalysis.analyze_quiz(quiz_id)
+        print(f"{'incremental':>30}: {summary['attempts']:>7} attempts {summary['answers']:>9} answers "
+              f"{summary['seconds']:>7.2f}s {summary['answers_per_second']:>12,.0f} answers/sec")
+
+
+if __name__ == '__main__':
+    main()
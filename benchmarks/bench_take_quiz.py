@@ -0,0 +1,82 @@
+"""
+Benchmark CPU time per take_quiz request with and without the cached
+question block.
+
+Usage:
+    python benchmarks/bench_take_quiz.py [--questions 100] [--requests 200]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+
+from app import create_app, db
+from app.models import User, Quiz, Question, Option, UserQuiz
+from app.services.quiz_snapshot import QuestionBlockCache
+
+
+def build_fixture(question_count):
+    quiz = Quiz(title='Benchmark Quiz', is_live=True)
+    db.session.add(quiz)
+    db.session.flush()
+    for i in range(question_count):
+        question = Question(quiz=quiz, text=f'Benchmark question {i}')
+        for j in range(4):
+            question.options.append(Option(text=f'Option {j} of question {i}', is_correct=(j == 0)))
+        db.session.add(question)
+    
+    user = User(username='bench', email='bench@example.com')
+    user.password = 'bench'
+    db.session.add(user)
+    db.session.flush()
+    user_quiz = UserQuiz(user_id=user.id, quiz_id=quiz.id)
+    db.session.add(user_quiz)
+    db.session.commit()
+    return user.id, user_quiz.id
+
+
+def measure(client, url, requests, clear_cache):
+    started = time.process_time()
+    for _ in range(requests):
+        if clear_cache:
+            QuestionBlockCache.clear()
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+    return (time.process_time() - started) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    
+    logging.disable(logging.CRITICAL)
+    app = create_app('testing')
+    
+    with app.app_context():
+        db.create_all()
+        user_id, user_quiz_id = build_fixture(args.questions)
+        
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+        app.login_manager.session_protection = None
+        url = f'/quiz/{user_quiz_id}'
+        
+        uncached = measure(client, url, args.requests, clear_cache=True)
+        cached = measure(client, url, args.requests, clear_cache=False)
+    
+    print(f'take_quiz with {args.questions} questions, {args.requests} requests')
+    print(f'  render every time : {uncached:7.2f} ms CPU/request')
+    print(f'  cached fragment   : {cached:7.2f} ms CPU/request')
+    print(f'  reduction         : {(1 - cached / uncached) * 100:6.1f}%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark paging and searching the admin user directory.
+
+Builds a user base with a few attempts per user, then times the first
+page, a deep page reached through cursors and prefix searches of
+different selectivity, including the query for the page's activity.
+
+Usage:
+    python benchmarks/bench_user_directory.py [--users 100000] [--attempts 3] [--repeat 20]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+
+from app import create_app, db
+from app.models import User, Quiz, UserQuiz
+from app.services.user_directory import UserDirectory
+
+
+def build_fixture(user_count, attempts_per_user):
+    quiz = Quiz(title='Benchmark Quiz', is_live=True, question_count=10)
+    db.session.add(quiz)
+    db.session.flush()
+    
+    db.session.execute(User.__table__.insert(), [{
+        'username': f'user{i:06d}', 'email': f'person{i}@example{i % 7}.com', 'is_admin': False
+    } for i in range(user_count)])
+    
+    now = datetime.utcnow()
+    db.session.execute(UserQuiz.__table__.insert(), [{
+        'user_id': user_id, 'quiz_id': quiz.id, 'score': (user_id + j) % 11,
+        'created_at': now - timedelta(hours=j + 1), 'completed_at': now - timedelta(hours=j)
+    } for user_id in range(1, user_count + 1) for j in range(attempts_per_user)])
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+
+
+def timed(label, repeat, fetch):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        page = fetch()
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+    print(f'{label:>36}: {len(page.items):>3} users {elapsed:>8.2f} ms')
+    return page
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--attempts', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    
+    logging.disable(logging.CRITICAL)
+    app = create_app('testing')
+    
+    with app.app_context():
+        db.create_all()
+        build_fixture(args.users, args.attempts)
+        
+        timed('first page', args.repeat, lambda: UserDirectory.page())
+        page = UserDirectory.page(limit=200)
+        while page.has_next and page.items[-1].id < args.users // 2:
+            page = UserDirectory.page(None, page.next_cursor, limit=200)
+        cursor = page.next_cursor
+        timed(f'page after user {page.items[-1].id}', args.repeat, lambda: UserDirectory.page(None, cursor))
+        
+        for search in ('user05', 'USER0999', 'person1234', 'u', 'nobody'):
+            timed(f'search {search!r}', args.repeat, lambda: UserDirectory.page(search))
+
+
+if __name__ == '__main__':
+    main()
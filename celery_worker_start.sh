@@ -3,5 +3,5 @@
 # Wait for RabbitMQ to be ready
 /app/wait-for-it.sh rabbitmq:5672 -t 60
 
-# Start Celery worker
-exec celery -A app.celery worker --loglevel=info
+# Start Celery worker with an embedded beat scheduler for periodic tasks
+exec celery -A app.celery worker --beat --loglevel=info
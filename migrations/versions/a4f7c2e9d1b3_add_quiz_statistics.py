@@ -0,0 +1,49 @@
+"""Add sharded quiz_statistics counters
+
+Revision ID: a4f7c2e9d1b3
+Revises: f1c6d8e3a5b2
+Create Date: 2026-10-18 15:37:09.804113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f7c2e9d1b3'
+down_revision = 'f1c6d8e3a5b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('quiz_statistics',
+        sa.Column('quiz_id', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.SmallInteger(), autoincrement=False, nullable=False),
+        sa.Column('attempts_started', sa.BigInteger(), nullable=False),
+        sa.Column('attempts_completed', sa.BigInteger(), nullable=False),
+        sa.Column('score_sum', sa.BigInteger(), nullable=False),
+        sa.Column('score_sq_sum', sa.BigInteger(), nullable=False),
+        sa.Column('score_min', sa.Integer(), nullable=True),
+        sa.Column('score_max', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('quiz_id', 'shard')
+    )
+    
+    # Seed shard 0 of every quiz from the existing attempts
+    op.execute(
+        "INSERT INTO quiz_statistics (quiz_id, shard, attempts_started, attempts_completed, "
+        "score_sum, score_sq_sum, score_min, score_max, updated_at) "
+        "SELECT quiz_id, 0, COUNT(*), COUNT(completed_at), "
+        "COALESCE(SUM(CASE WHEN completed_at IS NOT NULL THEN COALESCE(score, 0) ELSE 0 END), 0), "
+        "COALESCE(SUM(CASE WHEN completed_at IS NOT NULL THEN COALESCE(score, 0) * COALESCE(score, 0) ELSE 0 END), 0), "
+        "MIN(CASE WHEN completed_at IS NOT NULL THEN COALESCE(score, 0) END), "
+        "MAX(CASE WHEN completed_at IS NOT NULL THEN COALESCE(score, 0) END), "
+        "CURRENT_TIMESTAMP "
+        "FROM user_quizzes GROUP BY quiz_id"
+    )
+
+
+def downgrade():
+    op.drop_table('quiz_statistics')
@@ -0,0 +1,37 @@
+"""Add username/email prefix search indexes for the user directory
+
+Revision ID: a9d4e7b2c5f8
+Revises: f3a7c1e5b9d2
+Create Date: 2026-10-18 21:14:26.550873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d4e7b2c5f8'
+down_revision = 'f3a7c1e5b9d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_users_username_trgm', 'users', ['username'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'})
+        op.create_index('ix_users_email_trgm', 'users', ['email'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+    else:
+        op.execute('CREATE INDEX ix_users_username_nocase ON users (username COLLATE NOCASE)')
+        op.execute('CREATE INDEX ix_users_email_nocase ON users (email COLLATE NOCASE)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_users_email_trgm', table_name='users')
+        op.drop_index('ix_users_username_trgm', table_name='users')
+    else:
+        op.drop_index('ix_users_email_nocase', table_name='users')
+        op.drop_index('ix_users_username_nocase', table_name='users')
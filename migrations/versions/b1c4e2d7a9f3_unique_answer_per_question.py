@@ -0,0 +1,33 @@
+"""Add unique constraint on user answers per attempt and question
+
+Revision ID: b1c4e2d7a9f3
+Revises: 420ab4b5f5d9
+Create Date: 2026-10-18 09:12:40.512339
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1c4e2d7a9f3'
+down_revision = '420ab4b5f5d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep only the most recent answer for any duplicated (attempt, question) pair
+    op.execute(
+        "DELETE FROM user_answers WHERE id NOT IN ("
+        "SELECT max_id FROM (SELECT MAX(id) AS max_id FROM user_answers "
+        "GROUP BY user_quiz_id, question_id) AS latest)"
+    )
+
+    with op.batch_alter_table('user_answers', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_user_answers_user_quiz_question', ['user_quiz_id', 'question_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('user_answers', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_user_answers_user_quiz_question', type_='unique')
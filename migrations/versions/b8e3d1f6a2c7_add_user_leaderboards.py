@@ -0,0 +1,68 @@
+"""Add maintained user leaderboards
+
+Revision ID: b8e3d1f6a2c7
+Revises: a4f7c2e9d1b3
+Create Date: 2026-10-18 16:52:41.218730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3d1f6a2c7'
+down_revision = 'a4f7c2e9d1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_quiz_scores',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('quiz_id', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('percentage_sum', sa.Float(), nullable=False),
+        sa.Column('avg_percentage', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'quiz_id')
+    )
+    op.create_index('ix_user_quiz_scores_leaderboard', 'user_quiz_scores',
+                    ['quiz_id', sa.text('avg_percentage DESC'), 'user_id'], unique=False)
+    op.create_table('user_score_totals',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('percentage_sum', sa.Float(), nullable=False),
+        sa.Column('avg_percentage', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_score_totals_leaderboard', 'user_score_totals',
+                    [sa.text('avg_percentage DESC'), 'user_id'], unique=False)
+    
+    # Seed both leaderboards from the completed attempts
+    percentage = ("CASE WHEN COALESCE(qc.question_count, 0) > 0 "
+                  "THEN COALESCE(uq.score, 0) * 100.0 / qc.question_count ELSE 0.0 END")
+    op.execute(
+        "INSERT INTO user_quiz_scores (user_id, quiz_id, attempts, percentage_sum, avg_percentage, updated_at) "
+        f"SELECT uq.user_id, uq.quiz_id, COUNT(*), SUM({percentage}), SUM({percentage}) / COUNT(*), CURRENT_TIMESTAMP "
+        "FROM user_quizzes uq "
+        "LEFT JOIN (SELECT quiz_id, COUNT(*) AS question_count FROM questions GROUP BY quiz_id) qc "
+        "ON qc.quiz_id = uq.quiz_id "
+        "WHERE uq.completed_at IS NOT NULL "
+        "GROUP BY uq.user_id, uq.quiz_id"
+    )
+    op.execute(
+        "INSERT INTO user_score_totals (user_id, attempts, percentage_sum, avg_percentage, updated_at) "
+        "SELECT user_id, SUM(attempts), SUM(percentage_sum), SUM(percentage_sum) / SUM(attempts), CURRENT_TIMESTAMP "
+        "FROM user_quiz_scores GROUP BY user_id"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_user_score_totals_leaderboard', table_name='user_score_totals')
+    op.drop_table('user_score_totals')
+    op.drop_index('ix_user_quiz_scores_leaderboard', table_name='user_quiz_scores')
+    op.drop_table('user_quiz_scores')
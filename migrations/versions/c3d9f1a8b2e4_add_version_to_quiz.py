@@ -0,0 +1,26 @@
+"""Add content version to Quiz model
+
+Revision ID: c3d9f1a8b2e4
+Revises: b1c4e2d7a9f3
+Create Date: 2026-10-18 10:03:17.204581
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d9f1a8b2e4'
+down_revision = 'b1c4e2d7a9f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,51 @@
+"""Add per-quiz completion time sketches
+
+Revision ID: c6a9e2f4b8d1
+Revises: b8e3d1f6a2c7
+Create Date: 2026-10-18 17:40:12.553108
+
+"""
+import math
+from collections import Counter
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6a9e2f4b8d1'
+down_revision = 'b8e3d1f6a2c7'
+branch_labels = None
+depends_on = None
+
+# Must match app/services/completion_times.py
+RELATIVE_ACCURACY = 0.02
+LOG_GAMMA = math.log((1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY))
+MAX_BUCKET = math.ceil(math.log(366 * 86400) / LOG_GAMMA)
+
+
+def upgrade():
+    buckets = op.create_table('completion_time_buckets',
+        sa.Column('quiz_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.SmallInteger(), autoincrement=False, nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('quiz_id', 'bucket')
+    )
+    
+    # Seed the sketches from the completed attempts (log() is not portable SQL)
+    counts = Counter()
+    rows = op.get_bind().execute(sa.text(
+        "SELECT quiz_id, created_at, completed_at FROM user_quizzes "
+        "WHERE completed_at IS NOT NULL AND created_at IS NOT NULL"
+    ))
+    for quiz_id, created_at, completed_at in rows:
+        seconds = (completed_at - created_at).total_seconds()
+        bucket = 0 if seconds <= 1 else min(MAX_BUCKET, math.ceil(math.log(seconds) / LOG_GAMMA))
+        counts[quiz_id, bucket] += 1
+    if counts:
+        op.bulk_insert(buckets, [{'quiz_id': quiz_id, 'bucket': bucket, 'count': count}
+                                 for (quiz_id, bucket), count in sorted(counts.items())])
+
+
+def downgrade():
+    op.drop_table('completion_time_buckets')
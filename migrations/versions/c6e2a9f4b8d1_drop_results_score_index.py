@@ -0,0 +1,26 @@
+"""Drop the (score, completed_at, id) index; the results score filter is on percentages
+
+Revision ID: c6e2a9f4b8d1
+Revises: b3f8e1a6d4c9
+Create Date: 2026-10-18 23:41:09.582716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e2a9f4b8d1'
+down_revision = 'b3f8e1a6d4c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_quizzes', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_quizzes_score_completed_at')
+
+
+def downgrade():
+    with op.batch_alter_table('user_quizzes', schema=None) as batch_op:
+        batch_op.create_index('ix_user_quizzes_score_completed_at', ['score', 'completed_at', 'id'], unique=False)
@@ -0,0 +1,48 @@
+"""Add daily_activity rollup
+
+Revision ID: d2b7f5a1c9e3
+Revises: c6a9e2f4b8d1
+Create Date: 2026-10-18 18:21:37.402516
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b7f5a1c9e3'
+down_revision = 'c6a9e2f4b8d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_activity',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('quiz_id', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.SmallInteger(), autoincrement=False, nullable=False),
+        sa.Column('attempts_started', sa.Integer(), nullable=False),
+        sa.Column('attempts_completed', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('day', 'quiz_id', 'shard')
+    )
+    op.create_index('ix_daily_activity_quiz_day', 'daily_activity', ['quiz_id', 'day'], unique=False)
+    
+    # Seed shard 0 of every (day, quiz) from the existing attempts
+    day = 'CAST({} AS DATE)' if op.get_bind().dialect.name == 'postgresql' else 'DATE({})'
+    op.execute(
+        "INSERT INTO daily_activity (day, quiz_id, shard, attempts_started, attempts_completed, score_sum) "
+        "SELECT day, quiz_id, 0, SUM(started), SUM(completed), SUM(score_sum) FROM ("
+        f"  SELECT {day.format('created_at')} AS day, quiz_id, COUNT(*) AS started, 0 AS completed, 0 AS score_sum "
+        "  FROM user_quizzes WHERE created_at IS NOT NULL GROUP BY 1, 2 "
+        "  UNION ALL "
+        f"  SELECT {day.format('completed_at')}, quiz_id, 0, COUNT(*), COALESCE(SUM(score), 0) "
+        "  FROM user_quizzes WHERE completed_at IS NOT NULL GROUP BY 1, 2"
+        ") activity GROUP BY day, quiz_id"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_daily_activity_quiz_day', table_name='daily_activity')
+    op.drop_table('daily_activity')
@@ -0,0 +1,30 @@
+"""Add partial index over open quiz attempts
+
+Revision ID: d5e8a3c1f7b6
+Revises: c3d9f1a8b2e4
+Create Date: 2026-10-18 11:26:52.338104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e8a3c1f7b6'
+down_revision = 'c3d9f1a8b2e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_quizzes', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_user_quizzes_open_quiz_created_at', ['quiz_id', 'created_at'], unique=False,
+            postgresql_where=sa.text('completed_at IS NULL'),
+            sqlite_where=sa.text('completed_at IS NULL')
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('user_quizzes', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_quizzes_open_quiz_created_at')
@@ -0,0 +1,37 @@
+"""Add user_import_jobs for background user imports
+
+Revision ID: e2b7d4f9a6c3
+Revises: c6e2a9f4b8d1
+Create Date: 2026-10-19 00:12:36.407159
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7d4f9a6c3'
+down_revision = 'c6e2a9f4b8d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_import_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('summary', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_import_jobs')
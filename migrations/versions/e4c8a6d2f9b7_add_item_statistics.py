@@ -0,0 +1,49 @@
+"""Add item_statistics and the (quiz_id, completed_at, id) attempts index
+
+Revision ID: e4c8a6d2f9b7
+Revises: d2b7f5a1c9e3
+Create Date: 2026-10-18 19:42:08.113590
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4c8a6d2f9b7'
+down_revision = 'd2b7f5a1c9e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('item_statistics',
+        sa.Column('question_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('quiz_id', sa.Integer(), nullable=False),
+        sa.Column('quiz_version', sa.Integer(), nullable=False),
+        sa.Column('watermark', sa.DateTime(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.BigInteger(), nullable=False),
+        sa.Column('score_sq_sum', sa.BigInteger(), nullable=False),
+        sa.Column('correct', sa.Integer(), nullable=False),
+        sa.Column('correct_score_sum', sa.BigInteger(), nullable=False),
+        sa.Column('option_counts', sa.JSON(), nullable=False),
+        sa.Column('p_value', sa.Float(), nullable=True),
+        sa.Column('point_biserial', sa.Float(), nullable=True),
+        sa.Column('computed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('question_id')
+    )
+    op.create_index(op.f('ix_item_statistics_quiz_id'), 'item_statistics', ['quiz_id'], unique=False)
+    
+    with op.batch_alter_table('user_quizzes', schema=None) as batch_op:
+        batch_op.create_index('ix_user_quizzes_quiz_completed_at', ['quiz_id', 'completed_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_quizzes', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_quizzes_quiz_completed_at')
+    
+    op.drop_index(op.f('ix_item_statistics_quiz_id'), table_name='item_statistics')
+    op.drop_table('item_statistics')
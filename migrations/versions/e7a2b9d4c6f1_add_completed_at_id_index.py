@@ -0,0 +1,26 @@
+"""Add (completed_at, id) index for keyset pagination of results
+
+Revision ID: e7a2b9d4c6f1
+Revises: d5e8a3c1f7b6
+Create Date: 2026-10-18 13:04:17.512690
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2b9d4c6f1'
+down_revision = 'd5e8a3c1f7b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_quizzes', schema=None) as batch_op:
+        batch_op.create_index('ix_user_quizzes_completed_at_id', ['completed_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_quizzes', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_quizzes_completed_at_id')
@@ -0,0 +1,34 @@
+"""Add denormalized question_count to quizzes and a live catalog index
+
+Revision ID: f1c6d8e3a5b2
+Revises: e7a2b9d4c6f1
+Create Date: 2026-10-18 14:12:40.221847
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6d8e3a5b2'
+down_revision = 'e7a2b9d4c6f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('question_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_quizzes_is_live_id', ['is_live', 'id'], unique=False)
+    
+    # Backfill from the existing questions
+    op.execute(
+        "UPDATE quizzes SET question_count = "
+        "(SELECT COUNT(*) FROM questions WHERE questions.quiz_id = quizzes.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.drop_index('ix_quizzes_is_live_id')
+        batch_op.drop_column('question_count')
@@ -0,0 +1,28 @@
+"""Add (user_id, completed_at, id) and (score, completed_at, id) indexes for the results filters
+
+Revision ID: f3a7c1e5b9d2
+Revises: e4c8a6d2f9b7
+Create Date: 2026-10-18 20:37:51.264118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a7c1e5b9d2'
+down_revision = 'e4c8a6d2f9b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_quizzes', schema=None) as batch_op:
+        batch_op.create_index('ix_user_quizzes_user_completed_at', ['user_id', 'completed_at', 'id'], unique=False)
+        batch_op.create_index('ix_user_quizzes_score_completed_at', ['score', 'completed_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_quizzes', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_quizzes_score_completed_at')
+        batch_op.drop_index('ix_user_quizzes_user_completed_at')
@@ -6,6 +6,7 @@ import os
 import sys
 import pytest
 from unittest.mock import patch, MagicMock
+from sqlalchemy import event
 from datetime import datetime, timedelta
 
 # Set test environment variables before importing app
@@ -76,6 +77,19 @@ def session(db):
     db.session = old_session
 
 
+@pytest.fixture
+def query_counter(db):
+    """Collect the SQL statements executed while a test runs."""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
 @pytest.fixture
 def client(app):
     """Create a test client for the app."""
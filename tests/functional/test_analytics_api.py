@@ -0,0 +1,112 @@
+"""
+Functional tests for the admin analytics API endpoints.
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.models import User, Quiz, Question, UserQuiz
+from app.services.quiz_statistics import QuizStatisticsService
+from app.services.leaderboard import LeaderboardService
+from app.services.completion_times import CompletionTimeSketch
+from app.services.daily_activity import DailyActivityService
+from tests.test_helpers import call_view
+
+ENDPOINTS = ('api.quiz_completion_rate', 'api.average_scores', 'api.time_distribution',
+             'api.user_performance', 'api.activity_over_time', 'api.time_percentiles')
+
+
+@pytest.fixture
+def admin_user(session):
+    admin = User(username='analytics_admin', email='analytics@example.com', is_admin=True)
+    admin.password = 'password'
+    session.add(admin)
+    session.commit()
+    return admin
+
+
+def add_dataset(session, scale):
+    """Add scale users taking scale quizzes (two questions each), one open attempt per quiz."""
+    now = datetime.utcnow()
+    users = [User(username=f'user{scale}_{i}', email=f'user{scale}_{i}@example.com') for i in range(scale)]
+    quizzes = [Quiz(title=f'Quiz {scale}.{i}') for i in range(scale)]
+    session.add_all(users + quizzes)
+    session.flush()
+    for quiz in quizzes:
+        session.add_all([Question(quiz_id=quiz.id, text='Q1'), Question(quiz_id=quiz.id, text='Q2')])
+        session.add(UserQuiz(user_id=users[0].id, quiz_id=quiz.id, created_at=now))
+        for i, user in enumerate(users):
+            started = now - timedelta(minutes=3 + 7 * i)
+            session.add(UserQuiz(user_id=user.id, quiz_id=quiz.id, score=i % 3,
+                                 created_at=started, completed_at=started + timedelta(minutes=3 + 7 * i)))
+    session.commit()
+    # The attempts were inserted directly, so rebuild the maintained counters
+    QuizStatisticsService.reconcile()
+    LeaderboardService.rebuild()
+    CompletionTimeSketch.rebuild()
+    DailyActivityService.rebuild()
+
+
+def test_analytics_output(app, session, admin_user):
+    """Test the aggregated values of every analytics endpoint."""
+    add_dataset(session, 2)
+    
+    completion = call_view(app, 'api.quiz_completion_rate', admin_user).get_json()
+    assert completion == [{'quiz_title': 'Quiz 2.0', 'completion_rate': 66.7},
+                          {'quiz_title': 'Quiz 2.1', 'completion_rate': 66.7}]
+    
+    averages = call_view(app, 'api.average_scores', admin_user).get_json()
+    assert averages == [{'quiz_title': 'Quiz 2.0', 'avg_score_percentage': 25.0},
+                        {'quiz_title': 'Quiz 2.1', 'avg_score_percentage': 25.0}]
+    
+    distribution = call_view(app, 'api.time_distribution', admin_user).get_json()
+    assert distribution == [{'range': 'Under 5 min', 'count': 2}, {'range': '5-10 min', 'count': 0},
+                            {'range': '10-15 min', 'count': 2}, {'range': '15-30 min', 'count': 0},
+                            {'range': 'Over 30 min', 'count': 0}]
+    
+    quiz_id = Quiz.query.filter_by(title='Quiz 2.1').one().id
+    distribution = call_view(app, 'api.time_distribution', admin_user,
+                             query_string={'edges': '12,4', 'quiz_id': quiz_id}).get_json()
+    assert distribution == [{'range': 'Under 4 min', 'count': 1}, {'range': '4-12 min', 'count': 1},
+                            {'range': 'Over 12 min', 'count': 0}]
+    response = call_view(app, 'api.time_distribution', admin_user, query_string={'edges': '5,x'})
+    assert response.status_code == 400
+    
+    percentiles = call_view(app, 'api.time_percentiles', admin_user).get_json()
+    assert percentiles['count'] == 4
+    assert percentiles['p50'] == pytest.approx(180, rel=0.02)
+    assert percentiles['p90'] == pytest.approx(600, rel=0.02)
+    percentiles = call_view(app, 'api.time_percentiles', admin_user, query_string={'quiz_id': quiz_id}).get_json()
+    assert (percentiles['quiz_id'], percentiles['count']) == (quiz_id, 2)
+    
+    performance = call_view(app, 'api.user_performance', admin_user).get_json()
+    assert performance == [{'username': 'user2_1', 'avg_score': 50.0, 'quizzes_taken': 2},
+                           {'username': 'user2_0', 'avg_score': 0.0, 'quizzes_taken': 2}]
+    
+    activity = call_view(app, 'api.activity_over_time', admin_user).get_json()
+    assert len(activity) == 30
+    assert sum(day['attempts'] for day in activity) == 6
+    assert sum(day['completions'] for day in activity) == 4
+    
+    activity = call_view(app, 'api.activity_over_time', admin_user,
+                         query_string={'range': '365d', 'granularity': 'month', 'quiz_id': quiz_id}).get_json()
+    assert len(activity) in (12, 13)
+    assert sum(month['attempts'] for month in activity) == 3
+    assert activity[-1]['average_score'] == 0.5
+    response = call_view(app, 'api.activity_over_time', admin_user, query_string={'granularity': 'hour'})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_analytics_query_count_is_constant(app, session, admin_user, query_counter, endpoint):
+    """Test that the number of queries does not grow with users, quizzes or attempts."""
+    add_dataset(session, 2)
+    query_counter.clear()
+    call_view(app, endpoint, admin_user)
+    small = len(query_counter)
+    
+    add_dataset(session, 12)
+    query_counter.clear()
+    call_view(app, endpoint, admin_user)
+    
+    assert len(query_counter) == small
+    # One aggregate query plus the login lookups
+    assert small <= 3
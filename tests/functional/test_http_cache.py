@@ -0,0 +1,73 @@
+"""
+Functional tests for conditional GET support on quiz content endpoints.
+"""
+from app.models import Question, User
+from app.services.quiz_service import QuizService
+from tests.test_helpers import call_view
+
+
+def test_api_get_quiz_conditional_get(app, session, test_user, test_quiz):
+    """Test that an unchanged quiz is answered with 304 and an edited one is not."""
+    response = call_view(app, 'quiz.api_get_quiz', test_user, quiz_id=test_quiz.id)
+    assert response.status_code == 200
+    etag = response.get_etag()[0]
+    assert etag
+    assert 'must-revalidate' in response.headers['Cache-Control']
+    
+    # Strong and proxy-weakened validators both match
+    for validator in (f'"{etag}"', f'W/"{etag}"'):
+        response = call_view(app, 'quiz.api_get_quiz', test_user,
+                             headers={'If-None-Match': validator}, quiz_id=test_quiz.id)
+        assert response.status_code == 304
+        assert response.data == b''
+    
+    # Editing a question bumps the quiz version and therefore the ETag
+    question = Question.query.filter_by(quiz_id=test_quiz.id).first()
+    question.text = 'Changed question'
+    session.commit()
+    
+    response = call_view(app, 'quiz.api_get_quiz', test_user,
+                         headers={'If-None-Match': f'"{etag}"'}, quiz_id=test_quiz.id)
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+
+
+def test_api_list_quizzes_conditional_get(app, session, test_user, test_quiz):
+    """Test that the quiz list is answered with 304 until a quiz changes."""
+    response = call_view(app, 'quiz.api_list_quizzes', test_user)
+    etag = response.get_etag()[0]
+    
+    response = call_view(app, 'quiz.api_list_quizzes', test_user, headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    
+    test_quiz.title = 'Renamed quiz'
+    session.commit()
+    
+    response = call_view(app, 'quiz.api_list_quizzes', test_user, headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 200
+
+
+def test_admin_view_quiz_etag_tracks_attempts_and_build(app, session, test_user, test_quiz):
+    """Test that the admin quiz page is revalidated after a new attempt or an asset build."""
+    admin = User(username='etag_admin', email='etag_admin@example.com', is_admin=True)
+    session.add(admin)
+    session.commit()
+    
+    response = call_view(app, 'admin.view_quiz', admin, quiz_id=test_quiz.id)
+    etag = response.get_etag()[0]
+    response = call_view(app, 'admin.view_quiz', admin, headers={'If-None-Match': f'"{etag}"'}, quiz_id=test_quiz.id)
+    assert response.status_code == 304
+    
+    QuizService.start_quiz(test_user, test_quiz.id)
+    response = call_view(app, 'admin.view_quiz', admin, headers={'If-None-Match': f'"{etag}"'}, quiz_id=test_quiz.id)
+    assert response.status_code == 200
+    assert '<strong>Attempts:</strong> 1' in response.get_data(as_text=True)
+    etag = response.get_etag()[0]
+    
+    static_assets = app.extensions['static_assets']
+    build_id, static_assets.build_id = static_assets.build_id, 'new-build'
+    try:
+        response = call_view(app, 'admin.view_quiz', admin, headers={'If-None-Match': f'"{etag}"'}, quiz_id=test_quiz.id)
+    finally:
+        static_assets.build_id = build_id
+    assert response.status_code == 200
@@ -0,0 +1,129 @@
+"""
+Functional tests for background quiz imports.
+"""
+import io
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app.models import User, Quiz, QuizImportJob
+from app.routes import admin as admin_routes
+from app.services.quiz_import import QuizImport
+from tests.test_helpers import call_view
+
+
+def quiz_yaml(question_count):
+    lines = ['title: Imported quiz', 'description: Many questions', 'questions:']
+    for i in range(question_count):
+        lines += [f'  - text: Question {i}', '    options:',
+                  '      - text: Right', '        is_correct: true',
+                  '      - text: 42', '        is_correct: false']
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def import_admin(session):
+    admin = User(username='import_admin', email='import@example.com', is_admin=True)
+    session.add(admin)
+    session.commit()
+    return admin
+
+
+def test_upload_is_imported_by_job(app, session, import_admin):
+    """Test that the upload is staged, imported by the task and reported by the status endpoint."""
+    response = call_view(app, 'admin.import_quiz', import_admin, method='POST',
+                         data={'quiz_file': (io.BytesIO(quiz_yaml(3).encode('utf-8')), 'bank.yaml')})
+    assert response.status_code == 302
+    job = session.query(QuizImportJob).one()
+    assert response.location.endswith(f'/admin/quizzes/import?job={job.id}')
+    
+    assert job.status == QuizImportJob.COMPLETED
+    assert job.payload is None
+    quiz = session.get(Quiz, job.quiz_id)
+    assert quiz.title == 'Imported quiz'
+    assert quiz.question_count == 3
+    assert not quiz.is_live
+    assert [option.text for option in quiz.questions.first().options] == ['Right', '42']
+    
+    response = call_view(app, 'admin.quiz_import_status', import_admin, job_id=job.id)
+    assert response.headers['Cache-Control'] == 'no-store'
+    status = response.get_json()
+    assert status == dict(status, status='completed', processed=3, total=3, percent=100)
+    assert status['quiz_url'].endswith(f'/admin/quizzes/{quiz.id}')
+    
+    page = call_view(app, 'admin.import_quiz', import_admin, query_string={'job': job.id})
+    assert 'Imported 3 questions' in page.get_data(as_text=True)
+
+
+def test_job_reports_progress_per_batch(app, session):
+    """Test that progress is saved after every batch of questions."""
+    job = QuizImport.stage('bank.yml', quiz_yaml(5).encode('utf-8'))
+    progress = []
+    
+    def record(mapper, connection, target):
+        progress.append((target.status, target.processed))
+    
+    event.listen(QuizImportJob, 'before_update', record)
+    try:
+        summary = QuizImport.run(job.id, batch_size=2)
+    finally:
+        event.remove(QuizImportJob, 'before_update', record)
+    
+    assert summary['status'] == 'completed'
+    assert progress == [('running', 0), ('running', 2), ('running', 4), ('running', 5), ('completed', 5)]
+
+
+def test_invalid_file_fails_job(app, session):
+    """Test that validation errors are recorded on the job and no quiz is created."""
+    job = QuizImport.stage('bank.yml', b'title: No questions\n')
+    summary = QuizImport.run(job.id)
+    
+    assert summary['status'] == 'failed'
+    assert summary['error'] == 'Quiz must have questions as a list'
+    assert session.query(Quiz).count() == 0
+    
+    with pytest.raises(ValueError):
+        QuizImport.stage('bank.yml', 'titre: Qüiz'.encode('latin-1'))
+
+
+def test_stale_job_fails_and_can_be_retried(app, session, import_admin):
+    """Test that a running job without recent progress is failed and that it can be queued again."""
+    job = QuizImport.stage('bank.yml', quiz_yaml(2).encode('utf-8'))
+    job.status = QuizImportJob.RUNNING
+    session.commit()
+    
+    # Still making progress
+    status = call_view(app, 'admin.quiz_import_status', import_admin, job_id=job.id).get_json()
+    assert status['status'] == 'running'
+    
+    session.execute(QuizImportJob.__table__.update().values(updated_at=datetime.utcnow() - timedelta(hours=1)))
+    session.commit()
+    status = call_view(app, 'admin.quiz_import_status', import_admin, job_id=job.id).get_json()
+    assert status == dict(status, status='failed', retryable=True)
+    assert 'Retry' in call_view(app, 'admin.import_quiz', import_admin,
+                                query_string={'job': job.id}).get_data(as_text=True)
+    
+    response = call_view(app, 'admin.retry_quiz_import', import_admin, method='POST', job_id=job.id)
+    assert response.status_code == 302
+    session.refresh(job)
+    assert job.status == QuizImportJob.COMPLETED
+    assert session.get(Quiz, job.quiz_id).question_count == 2
+    
+    # Finished jobs are not queued again
+    assert not QuizImport.retry(job)
+    assert QuizImport.run(job.id)['status'] == 'completed'
+    assert session.query(Quiz).count() == 1
+
+
+def test_queue_failure_fails_job(app, session, import_admin, monkeypatch):
+    """Test that a job that cannot be queued is failed instead of left pending."""
+    def unavailable(job_id):
+        raise ConnectionError('broker unavailable')
+    
+    monkeypatch.setattr(admin_routes.import_quiz_file, 'delay', unavailable)
+    response = call_view(app, 'admin.import_quiz', import_admin, method='POST',
+                         data={'quiz_file': (io.BytesIO(quiz_yaml(1).encode('utf-8')), 'bank.yaml')})
+    assert response.status_code == 302
+    
+    job = session.query(QuizImportJob).one()
+    assert job.status == QuizImportJob.FAILED
+    assert QuizImport.status(job)['retryable']
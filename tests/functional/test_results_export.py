@@ -0,0 +1,82 @@
+"""
+Functional tests for the streaming results export.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from werkzeug.exceptions import NotFound
+from app.models import User, Quiz, UserQuiz
+from app.services.results_export import ResultsExport
+from tests.test_helpers import call_view
+
+
+@pytest.fixture
+def export_data(session):
+    admin = User(username='export_admin', email='export@example.com', is_admin=True)
+    student = User(username='export_student', email='student@example.com')
+    quizzes = [Quiz(title='Export, "quoted" quiz', question_count=4), Quiz(title='Other quiz', question_count=0)]
+    session.add_all([admin, student] + quizzes)
+    session.flush()
+    now = datetime.utcnow()
+    for i in range(5):
+        session.add(UserQuiz(user_id=student.id, quiz_id=quizzes[i % 2].id, score=i % 4,
+                             created_at=now - timedelta(minutes=10 + i), completed_at=now - timedelta(minutes=i)))
+    # Open attempts are never exported
+    session.add(UserQuiz(user_id=student.id, quiz_id=quizzes[0].id, created_at=now))
+    session.commit()
+    return admin, quizzes
+
+
+def test_export_csv(app, session, export_data):
+    """Test the CSV export of every completed attempt, newest first."""
+    admin, quizzes = export_data
+    response = call_view(app, 'admin.export_results', admin, fmt='csv')
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'].startswith('attachment; filename="quiz-results-')
+    
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 5
+    assert rows[0]['quiz_title'] == 'Export, "quoted" quiz'
+    assert rows[0]['username'] == 'export_student'
+    assert [row['completed_at'] for row in rows] == sorted((row['completed_at'] for row in rows), reverse=True)
+    assert rows[2] == dict(rows[2], score='2', question_count='4', percentage='50', duration_seconds='600')
+
+
+def test_export_ndjson_filtered(app, session, export_data):
+    """Test that the NDJSON export applies the results page filter."""
+    admin, quizzes = export_data
+    response = call_view(app, 'admin.export_results', admin, query_string={'quiz_filter': quizzes[1].id},
+                         fmt='ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record['score'] for record in records] == [1, 3]
+    assert {record['quiz_id'] for record in records} == {quizzes[1].id}
+    assert records[0]['percentage'] == 0
+    
+    with pytest.raises(NotFound):
+        call_view(app, 'admin.export_results', admin, fmt='xlsx')
+
+
+def test_export_stream_chunks(app, session, export_data):
+    """Test that the export is produced in chunks of batch_size records."""
+    chunks = list(ResultsExport.stream('csv', batch_size=2))
+    assert len(chunks) == 3
+    assert chunks[0].startswith('attempt_id,user_id,username')
+    assert sum(chunk.count('\n') for chunk in chunks) == 6
+
+
+def test_export_csv_escapes_formulas(app, session, export_data):
+    """Test that text cells starting like a spreadsheet formula are quoted in CSV but not in NDJSON."""
+    admin, quizzes = export_data
+    quizzes[1].title = '=HYPERLINK("http://example.com")'
+    session.commit()
+    
+    rows = list(csv.DictReader(io.StringIO(''.join(ResultsExport.stream('csv')))))
+    assert {row['quiz_title'] for row in rows} == {'Export, "quoted" quiz', '\'=HYPERLINK("http://example.com")'}
+    
+    records = [json.loads(line) for line in ''.join(ResultsExport.stream('ndjson')).splitlines()]
+    assert {record['quiz_title'] for record in records} == {'Export, "quoted" quiz', '=HYPERLINK("http://example.com")'}
@@ -0,0 +1,112 @@
+"""
+Functional tests for the admin results page.
+"""
+from datetime import datetime, timedelta
+from werkzeug.datastructures import MultiDict
+import pytest
+from app.models import User, Quiz, UserQuiz
+from app.services.results import ResultsService
+from app.utils.pagination import encode_cursor
+from tests.test_helpers import call_view
+
+
+@pytest.fixture
+def results_admin(session):
+    admin = User(username='results_admin', email='results@example.com', is_admin=True)
+    session.add(admin)
+    session.commit()
+    return admin
+
+
+def add_results(session, count, completed_at=None):
+    """Add count completed attempts of two users on two quizzes, one day apart, scores 0-4."""
+    completed_at = completed_at or datetime(2026, 3, 31, 12, 0)
+    suffix = session.query(User).count()
+    users = [User(username=f'student{suffix}_{i}', email=f'student{suffix}_{i}@example.com') for i in range(2)]
+    quizzes = [Quiz(title=f'Results quiz {suffix}.{i}', question_count=4) for i in range(2)]
+    session.add_all(users + quizzes)
+    session.flush()
+    for i in range(count):
+        finished = completed_at - timedelta(days=i)
+        session.add(UserQuiz(user_id=users[i % 2].id, quiz_id=quizzes[i // 2 % 2].id, score=i % 5,
+                             created_at=finished - timedelta(minutes=5), completed_at=finished))
+    session.commit()
+    return users, quizzes
+
+
+def _filters(**args):
+    return ResultsService.filters_from_args(MultiDict(args))
+
+
+def test_results_filters(app, session, results_admin):
+    """Test each filter of the results page and that malformed values are ignored."""
+    users, quizzes = add_results(session, 10)
+    
+    def ids(**args):
+        return [row.id for row in ResultsService.page(_filters(**args), limit=50)]
+    
+    everything = ids()
+    assert len(everything) == 10
+    assert ids(quiz_filter=str(quizzes[0].id)) == everything[0:2] + everything[4:6] + everything[8:10]
+    assert ids(user=users[1].username) == everything[1::2]
+    assert ids(user='nobody') == []
+    # Days are inclusive at both ends
+    assert ids(completed_from='2026-03-28', completed_to='2026-03-30') == everything[1:4]
+    # Scores are filtered as percentages of the quiz's questions
+    assert ids(score_min='50', score_max='75') == [everything[i] for i in (2, 3, 7, 8)]
+    assert ids(score_min='x', completed_to='31/03/2026') == everything
+    
+    # The same raw score is a different percentage on a longer quiz
+    long_quiz = Quiz(title='Long results quiz', question_count=8)
+    session.add(long_quiz)
+    session.flush()
+    long_attempt = UserQuiz(user_id=users[0].id, quiz_id=long_quiz.id, score=3,
+                            created_at=datetime(2026, 1, 1, 11, 55), completed_at=datetime(2026, 1, 1, 12, 0))
+    session.add(long_attempt)
+    session.commit()
+    assert long_attempt.id not in ids(score_min='50')
+    assert long_attempt.id in ids(score_min='35', score_max='40')
+    
+    row = ResultsService.page(_filters(), limit=1).items[0]
+    assert (row.username, row.quiz_title, row.question_count) == (users[0].username, quizzes[0].title, 4)
+
+
+def test_results_page_query_count_is_constant(app, session, results_admin, query_counter):
+    """Test that a page costs the same number of queries whatever its size."""
+    add_results(session, 3)
+    query_counter.clear()
+    response = call_view(app, 'admin.view_results', results_admin, query_string={'limit': 100})
+    assert response.status_code == 200
+    small = len(query_counter)
+    
+    add_results(session, 150, completed_at=datetime(2026, 2, 1))
+    query_counter.clear()
+    response = call_view(app, 'admin.view_results', results_admin,
+                         query_string={'limit': 100, 'score_min': 0, 'completed_to': '2026-12-31'})
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).count('View Details') == 100
+    
+    assert len(query_counter) == small
+    # The page of rows and the quiz dropdown
+    assert small <= 3
+
+
+def test_cursor_from_another_list_starts_over(app, session, results_admin):
+    """Test that a cursor that decodes but does not fit the list gives the first page instead of an error."""
+    add_results(session, 3)
+    first_page = call_view(app, 'admin.view_results', results_admin).get_data(as_text=True)
+    
+    for key in [(5,), ('yesterday', 5), (datetime(2026, 3, 31).isoformat(), 'five')]:
+        response = call_view(app, 'admin.view_results', results_admin,
+                             query_string={'cursor': encode_cursor('next', key)})
+        assert response.status_code == 200
+        assert response.get_data(as_text=True) == first_page
+    
+    # Users are paged by id, so a results cursor does not fit either
+    cursor = encode_cursor('next', (datetime(2026, 3, 31), 5))
+    assert call_view(app, 'admin.list_users', results_admin, query_string={'cursor': cursor}).status_code == 200
+    
+    # An ISO string where the cursor holds a datetime still pages
+    iso = encode_cursor('next', (datetime(2026, 3, 31, 12, 0).isoformat(), 0))
+    assert [row.id for row in ResultsService.page({}, cursor=iso)] == \
+        [row.id for row in ResultsService.page({})][1:]
@@ -114,3 +114,46 @@ def generate_quiz_statistics(quiz_id):
     except Exception as e:
         logging.error(f"Error generating quiz statistics: {str(e)}")
         raise
+
+@mock_task(name='app.tasks.analyze_quiz_items')
+def analyze_quiz_items(quiz_id, full=False):
+    """
+    Mock version of the analyze_quiz_items task for testing (runs synchronously).
+    
+    Args:
+        quiz_id: ID of the Quiz to analyze
+        full: Recompute from every completed attempt
+    
+    Returns:
+        Summary of the analysis run
+    """
+    from app.services.item_analysis import ItemAnalysis
+    return ItemAnalysis.analyze_quiz(quiz_id, full=full)
+
+@mock_task(name='app.tasks.import_quiz_file')
+def import_quiz_file(job_id):
+    """
+    Mock version of the import_quiz_file task for testing (runs synchronously).
+    
+    Args:
+        job_id: ID of the QuizImportJob to run
+    
+    Returns:
+        Status of the job
+    """
+    from app.services.quiz_import import QuizImport
+    return QuizImport.run(job_id)
+
+@mock_task(name='app.tasks.import_users_file')
+def import_users_file(job_id):
+    """
+    Mock version of the import_users_file task for testing (runs synchronously).
+    
+    Args:
+        job_id: ID of the UserImportJob to run
+    
+    Returns:
+        Status of the job
+    """
+    from app.services.user_import import UserImport
+    return UserImport.run(job_id)
@@ -1,9 +1,12 @@
 """
 Test helper functions for the exam application.
-This module provides synchronous versions of Celery tasks for testing.
+This module provides synchronous versions of Celery tasks and a helper for
+calling views as a logged-in user.
 """
 from datetime import datetime
 import logging
+from flask import g
+from flask_login import login_user
 from app.models import UserQuiz, UserAnswer, Option, Question
 from app import db
 
@@ -106,3 +109,14 @@ def generate_quiz_statistics_sync(quiz_id):
     except Exception as e:
         logging.error(f"Error generating quiz statistics: {str(e)}")
         raise
+
+
+def call_view(app, endpoint, user, headers=None, query_string=None, method='GET', data=None, **view_args):
+    """Call a view function as a logged-in user and return the response."""
+    with app.test_request_context(headers=headers or {}, query_string=query_string, method=method, data=data):
+        login_user(user)
+        try:
+            return app.make_response(app.view_functions[endpoint](**view_args))
+        finally:
+            # The app context (and flask.g) is shared by the whole test session
+            g.pop('_login_user', None)
@@ -0,0 +1,70 @@
+"""
+Unit tests for the AnswerKeyCache class.
+"""
+import numpy as np
+from app.services.answer_key_cache import AnswerKeyCache
+from app.services.quiz_regrader import answer_matrix, correct_answers
+from app.services.scoring import ScoringService
+from app.models import Option, UserQuiz, UserAnswer
+
+
+def test_answer_key_is_cached_per_version(app, session, test_quiz):
+    """Test that answer keys are cached and reloaded when the quiz version changes."""
+    AnswerKeyCache.clear()
+    
+    answer_key = AnswerKeyCache.get(test_quiz)
+    assert answer_key.question_count == 3
+    assert len(answer_key.correct_options) == 3
+    
+    # A second lookup with the same version is served from the cache
+    assert AnswerKeyCache.get(test_quiz) is answer_key
+    
+    # Changing the correct option bumps the quiz version
+    question = test_quiz.questions.first()
+    old_correct = question.options.filter_by(is_correct=True).first()
+    new_correct = question.options.filter_by(is_correct=False).first()
+    old_correct.is_correct = False
+    new_correct.is_correct = True
+    session.commit()
+    
+    assert test_quiz.version == answer_key.version + 1
+    reloaded = AnswerKeyCache.get(test_quiz)
+    assert reloaded is not answer_key
+    assert reloaded.correct_options[question.id] == {new_correct.id}
+
+
+def test_answer_key_score(app, session, test_quiz):
+    """Test scoring an answer map against an answer key."""
+    answer_key = AnswerKeyCache.get(test_quiz)
+    question_ids = list(answer_key.correct_options)
+    
+    answer_map = {question_ids[0]: next(iter(answer_key.correct_options[question_ids[0]]))}
+    wrong_option = Option.query.filter_by(question_id=question_ids[1], is_correct=False).first()
+    answer_map[question_ids[1]] = wrong_option.id
+    
+    assert answer_key.score(answer_map) == 1
+
+
+def test_every_correct_option_counts(app, session, test_user, test_quiz):
+    """Test that the answer key, the SQL scoring and the vectorized regrader agree on multi-answer questions."""
+    question = test_quiz.questions.first()
+    second_correct = question.options.filter_by(is_correct=False).first()
+    second_correct.is_correct = True
+    session.commit()
+    
+    user_quiz = UserQuiz(user_id=test_user.id, quiz_id=test_quiz.id)
+    session.add(user_quiz)
+    session.flush()
+    session.add(UserAnswer(user_quiz_id=user_quiz.id, question_id=question.id, option_id=second_correct.id))
+    session.commit()
+    
+    answer_key = AnswerKeyCache.get(test_quiz)
+    assert len(answer_key.correct_options[question.id]) == 2
+    assert answer_key.score({question.id: second_correct.id}) == 1
+    
+    question_ids = np.array(list(answer_key.correct_options), dtype=np.int64)
+    matrix = answer_matrix(np.array([user_quiz.id]), question_ids,
+                           np.array([[user_quiz.id, question.id, second_correct.id]], dtype=np.int64))
+    assert correct_answers(matrix, question_ids, answer_key).sum() == 1
+    
+    assert ScoringService.complete_attempts([user_quiz.id])[0].score == 1
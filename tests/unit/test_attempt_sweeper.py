@@ -0,0 +1,41 @@
+"""
+Unit tests for the AttemptSweeper class.
+"""
+from datetime import datetime, timedelta
+from app.services.attempt_sweeper import AttemptSweeper
+from app.models import Quiz, UserQuiz, UserAnswer, Option
+
+
+def test_sweep_closes_expired_and_abandoned_attempts(app, session, test_user, test_quiz):
+    """Test that the sweeper closes only expired timed and abandoned untimed attempts."""
+    now = datetime.utcnow()
+    untimed_quiz = Quiz(title='Untimed Quiz', is_live=True)
+    session.add(untimed_quiz)
+    session.flush()
+    
+    expired = [UserQuiz(user_id=test_user.id, quiz_id=test_quiz.id, created_at=now - timedelta(minutes=30))
+               for _ in range(3)]
+    running = UserQuiz(user_id=test_user.id, quiz_id=test_quiz.id, created_at=now - timedelta(minutes=5))
+    abandoned = UserQuiz(user_id=test_user.id, quiz_id=untimed_quiz.id, created_at=now - timedelta(days=2))
+    recent = UserQuiz(user_id=test_user.id, quiz_id=untimed_quiz.id, created_at=now - timedelta(hours=1))
+    session.add_all(expired + [running, abandoned, recent])
+    session.flush()
+    
+    # One expired attempt answered a question correctly
+    correct = Option.query.filter_by(is_correct=True).join(Option.question).filter_by(quiz_id=test_quiz.id).first()
+    session.add(UserAnswer(user_quiz_id=expired[0].id, question_id=correct.question_id, option_id=correct.id))
+    session.commit()
+    
+    summary = AttemptSweeper.sweep(batch_size=2, now=now)
+    
+    assert summary['expired'] == 3
+    assert summary['abandoned'] == 1
+    assert summary['closed'] == 4
+    assert summary['batches'] == 3
+    assert sorted(summary['quiz_ids']) == sorted([test_quiz.id, untimed_quiz.id])
+    
+    session.expire_all()
+    assert all(uq.completed_at == now for uq in expired + [abandoned])
+    assert expired[0].score == 1
+    assert running.completed_at is None
+    assert recent.completed_at is None
@@ -0,0 +1,39 @@
+"""
+Unit tests for the CompletionTimeSketch class.
+"""
+import random
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app.models import UserQuiz
+from app.services.attempt_events import CompletedAttempt
+from app.services.completion_times import CompletionTimeSketch, RELATIVE_ACCURACY
+
+
+def test_percentiles_within_relative_accuracy(app, session, test_user, test_quiz):
+    """Test that sketch percentiles stay within the relative accuracy and survive a rebuild."""
+    rng = random.Random(17)
+    now = datetime.utcnow()
+    durations = [rng.lognormvariate(6, 1) for _ in range(2000)]
+    attempts = [CompletedAttempt(test_user.id, test_quiz.id, 0, now - timedelta(seconds=seconds), now)
+                for seconds in durations]
+    
+    # Recorded in batches, like the sweeper does
+    for start in range(0, len(attempts), 500):
+        CompletionTimeSketch.record_completed(attempts[start:start + 500])
+    session.commit()
+    
+    result = CompletionTimeSketch.percentiles(test_quiz.id)
+    assert result['count'] == len(durations)
+    for percentile in (50, 90, 99):
+        exact = np.percentile(durations, percentile, method='lower')
+        assert result[f'p{percentile}'] == pytest.approx(exact, rel=RELATIVE_ACCURACY, abs=0.1)
+    assert CompletionTimeSketch.percentiles(test_quiz.id + 1)['p50'] is None
+    
+    # Rebuilding from the attempts table gives the same sketch
+    session.add_all(UserQuiz(user_id=attempt.user_id, quiz_id=attempt.quiz_id, score=0,
+                             created_at=attempt.created_at, completed_at=attempt.completed_at)
+                    for attempt in attempts)
+    session.commit()
+    assert CompletionTimeSketch.rebuild(test_quiz.id) == len(durations)
+    assert CompletionTimeSketch.percentiles() == result | {'quiz_id': None}
@@ -0,0 +1,71 @@
+"""
+Unit tests for the gzip response middleware.
+"""
+import gzip
+import zlib
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+from app.utils.compression import GzipMiddleware, accepts_gzip
+
+MIMETYPES = {'text/html': None, 'application/x-ndjson': 1}
+
+
+def make_client(response, **kwargs):
+    middleware = GzipMiddleware(response, minimum_size=100, mimetypes=MIMETYPES, **kwargs)
+    return Client(middleware)
+
+
+def test_accepts_gzip():
+    """Test Accept-Encoding parsing, including explicit refusals."""
+    assert accepts_gzip('br, gzip, deflate')
+    assert accepts_gzip('*')
+    assert not accepts_gzip('gzip;q=0, br')
+    assert not accepts_gzip('')
+    # An explicit gzip entry overrides the wildcard, wherever it appears
+    assert accepts_gzip('*;q=0, gzip')
+    assert not accepts_gzip('*, gzip;q=0')
+    # Malformed q-values refuse the coding instead of raising
+    assert not accepts_gzip('gzip;q=abc')
+    assert not accepts_gzip('gzip;q=abc, *')
+    assert accepts_gzip('gzip; level=1; q=0.5')
+
+
+def test_malformed_accept_encoding_is_served(app):
+    """Test that a malformed q-value does not break requests."""
+    client = make_client(Response('<p>quiz</p>' * 50, mimetype='text/html'))
+    response = client.get('/', headers={'Accept-Encoding': 'gzip;q=abc'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_compresses_by_type_and_size():
+    """Test that only large enough responses of listed types are compressed."""
+    body = '<p>quiz</p>' * 50
+    page = Response(body, mimetype='text/html', headers={'ETag': '"abc"', 'Vary': 'Cookie'})
+    
+    response = make_client(page).get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Cookie, Accept-Encoding'
+    assert response.headers['ETag'] == 'W/"abc"'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.data).decode() == body
+    
+    assert 'Content-Encoding' not in make_client(page).get('/').headers
+    assert 'Content-Encoding' not in make_client(Response('<p>small</p>', mimetype='text/html')).get(
+        '/', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in make_client(Response(b'\x00' * 500, mimetype='image/png')).get(
+        '/', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+def test_streamed_response_is_flushed_per_chunk():
+    """Test that each streamed chunk can be decoded as soon as it arrives."""
+    rows = [f'{{"attempt": {i}}}\n'.encode() for i in range(3)]
+    stream = Response(iter(rows), mimetype='application/x-ndjson')
+    
+    response = make_client(stream).get('/', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    received = [decoder.decompress(chunk) for chunk in response.iter_encoded()]
+    assert received[:3] == rows
+    assert b''.join(received) + decoder.flush() == b''.join(rows)
@@ -0,0 +1,63 @@
+"""
+Unit tests for the DailyActivityService class.
+"""
+from datetime import datetime, timedelta
+from app.models import DailyActivity, UserQuiz
+from app.services.attempt_events import CompletedAttempt
+from app.services.daily_activity import DailyActivityService
+from app.services.quiz_service import QuizService
+
+
+def test_rollup_follows_attempts_and_compacts(app, session, test_user, test_quiz, mock_celery_task):
+    """Test that starts and completions are rolled up per UTC day and that compaction keeps the totals."""
+    attempts = [QuizService.start_quiz(test_user, test_quiz.id) for _ in range(5)]
+    for user_quiz in attempts[:3]:
+        QuizService.complete_quiz(user_quiz.id)
+    
+    # Completions of attempts started two days ago, like the sweeper closes them
+    now = datetime.utcnow()
+    old = now - timedelta(days=2)
+    for _ in range(6):
+        user_quiz = UserQuiz(user_id=test_user.id, quiz_id=test_quiz.id, score=2, created_at=old, completed_at=old)
+        session.add(user_quiz)
+        DailyActivityService.record_started(test_quiz.id, old)
+        DailyActivityService.record_completed([CompletedAttempt(test_user.id, test_quiz.id, 2, old, old)])
+    session.commit()
+    
+    series = DailyActivityService.series(days=7)
+    assert len(series) == 7
+    assert series[-1] == {'date': now.date().isoformat(), 'attempts': 5, 'completions': 3, 'average_score': 0.0}
+    assert series[-3] == {'date': old.date().isoformat(), 'attempts': 6, 'completions': 6, 'average_score': 2.0}
+    assert sum(week['attempts'] for week in DailyActivityService.series(days=7, granularity='week')) == 11
+    
+    # Compaction leaves one row for the past day and today's shards untouched
+    assert DailyActivityService.compact() == 1
+    assert DailyActivity.query.filter_by(day=old.date()).count() == 1
+    assert DailyActivityService.series(days=7) == series
+    
+    # So does a rebuild from the raw attempts
+    assert DailyActivityService.rebuild() == 2
+    assert DailyActivityService.series(days=7) == series
+
+
+def test_rebuild_locks_out_recorders(app, session, monkeypatch):
+    """Test the advisory lock protocol between recorders and rebuilds on PostgreSQL."""
+    from app import db
+    from app.utils import sql
+    
+    locks = []
+    monkeypatch.setattr(sql, 'dialect_name', lambda: 'postgresql')
+    monkeypatch.setattr(db.session, 'execute', lambda stmt: locks.append(
+        (stmt.selected_columns[0].name, *stmt.compile().params.values())))
+    
+    # Recorders share every lock; quizzes are locked in ascending order after the every-quiz key
+    sql.lock_quiz_aggregates({7, 3, 7})
+    # A one-quiz rebuild excludes that quiz's recorders, a full rebuild excludes all of them
+    sql.lock_quiz_aggregates([3], exclusive=True)
+    sql.lock_quiz_aggregates(exclusive=True)
+    
+    key = sql.QUIZ_AGGREGATES_LOCK
+    shared, exclusive = 'pg_advisory_xact_lock_shared', 'pg_advisory_xact_lock'
+    assert locks == [(shared, key, 0), (shared, key, 3), (shared, key, 7),
+                     (shared, key, 0), (exclusive, key, 3),
+                     (exclusive, key, 0)]
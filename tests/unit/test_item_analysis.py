@@ -0,0 +1,92 @@
+"""
+Unit tests for the ItemAnalysis class.
+"""
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app.services import item_analysis
+from app.services.item_analysis import ItemAnalysis
+from app.models import UserQuiz, UserAnswer, ItemStatistics
+
+
+def _completed_attempt(session, user, quiz, options, completed_at=None):
+    user_quiz = UserQuiz(user_id=user.id, quiz_id=quiz.id, score=0,
+                         completed_at=completed_at or datetime.utcnow() - timedelta(hours=1))
+    session.add(user_quiz)
+    session.flush()
+    for option in options:
+        session.add(UserAnswer(user_quiz_id=user_quiz.id, question_id=option.question_id, option_id=option.id))
+    return user_quiz
+
+
+def _options(quiz):
+    questions = quiz.questions.order_by('id').all()
+    correct = [q.options.filter_by(is_correct=True).first() for q in questions]
+    wrong = [q.options.filter_by(is_correct=False).first() for q in questions]
+    return questions, correct, wrong
+
+
+def test_analyze_quiz_statistics(app, session, test_user, test_quiz):
+    """Test p-values, point-biserials and option counts against a direct computation."""
+    questions, correct, wrong = _options(test_quiz)
+    answer_sets = [
+        correct,
+        [correct[0], correct[1], wrong[2]],
+        [correct[0], wrong[1]],
+        [wrong[0], wrong[1], wrong[2]],
+        [],
+    ]
+    for options in answer_sets:
+        _completed_attempt(session, test_user, test_quiz, options)
+    session.commit()
+    
+    summary = ItemAnalysis.analyze_quiz(test_quiz.id, chunk_size=2)
+    assert summary['mode'] == 'full'
+    assert summary['attempts'] == 5
+    assert summary['answers'] == 11
+    
+    matrix = np.array([[option in options for option in correct] for options in answer_sets], dtype=float)
+    totals = matrix.sum(axis=1)
+    rows = {row.question_id: row for row in ItemStatistics.query.filter_by(quiz_id=test_quiz.id)}
+    for column, question in enumerate(questions):
+        row = rows[question.id]
+        assert row.attempts == 5
+        assert row.p_value == pytest.approx(matrix[:, column].mean())
+        assert row.point_biserial == pytest.approx(np.corrcoef(matrix[:, column], totals)[0, 1])
+        assert row.option_counts[str(wrong[column].id)] == sum(wrong[column] in options for options in answer_sets)
+    
+    report = ItemAnalysis.report(test_quiz)
+    assert report['attempts'] == 5
+    assert [item['question'].id for item in report['items']] == [q.id for q in questions]
+
+
+def test_analyze_quiz_incremental_matches_full(app, session, test_user, test_quiz, monkeypatch):
+    """Test that a rerun only reads new attempts and gives the same result as a full run."""
+    monkeypatch.setattr(item_analysis, 'SETTLE_SECONDS', 0)
+    questions, correct, wrong = _options(test_quiz)
+    _completed_attempt(session, test_user, test_quiz, correct)
+    _completed_attempt(session, test_user, test_quiz, [wrong[0], correct[1]])
+    session.commit()
+    assert ItemAnalysis.analyze_quiz(test_quiz.id)['attempts'] == 2
+    
+    _completed_attempt(session, test_user, test_quiz, [correct[0], wrong[1], wrong[2]],
+                       completed_at=datetime.utcnow())
+    session.commit()
+    summary = ItemAnalysis.analyze_quiz(test_quiz.id)
+    assert summary['mode'] == 'incremental'
+    assert summary['attempts'] == 1
+    assert summary['total_attempts'] == 3
+    incremental = {row.question_id: (row.correct, row.p_value, row.point_biserial, row.option_counts)
+                   for row in ItemStatistics.query.filter_by(quiz_id=test_quiz.id)}
+    
+    summary = ItemAnalysis.analyze_quiz(test_quiz.id, full=True)
+    assert summary['mode'] == 'full'
+    assert summary['attempts'] == 3
+    full = {row.question_id: (row.correct, row.p_value, row.point_biserial, row.option_counts)
+            for row in ItemStatistics.query.filter_by(quiz_id=test_quiz.id)}
+    assert incremental == full
+    
+    # Editing the quiz invalidates the stored sums
+    test_quiz.version += 1
+    session.commit()
+    assert ItemAnalysis.analyze_quiz(test_quiz.id)['mode'] == 'full'
@@ -0,0 +1,37 @@
+"""
+Unit tests for the LeaderboardService class.
+"""
+import pytest
+from app.models import User, Option, UserScoreTotal
+from app.services.quiz_service import QuizService
+from app.services.leaderboard import LeaderboardService
+
+
+@pytest.mark.parametrize('backend', ['python', 'sql'])
+def test_leaderboard_follows_completions(app, session, test_user, test_quiz, mock_celery_task, monkeypatch, backend):
+    """Test that completions maintain the overall and per-quiz leaderboards."""
+    monkeypatch.setitem(app.config, 'SCORING_BACKEND', backend)
+    other = User(username='other', email='other@example.com')
+    session.add(other)
+    session.commit()
+    correct = list({option.question_id: option.id for option in Option.query.filter_by(is_correct=True)}.items())
+    
+    # testuser scores 3/3 and 1/3, other scores 3/3
+    for user, answered in ((test_user, 3), (test_user, 1), (other, 3)):
+        user_quiz = QuizService.start_quiz(user, test_quiz.id)
+        QuizService.submit_answers(user_quiz.id, dict(correct[:answered]))
+        QuizService.complete_quiz(user_quiz.id)
+    
+    expected = [{'username': 'other', 'avg_score': 100.0, 'quizzes_taken': 1},
+                {'username': 'testuser', 'avg_score': 66.7, 'quizzes_taken': 2}]
+    assert LeaderboardService.top() == expected
+    assert LeaderboardService.top(quiz_id=test_quiz.id) == expected
+    assert LeaderboardService.top(limit=1) == expected[:1]
+    assert LeaderboardService.top(quiz_id=test_quiz.id + 1) == []
+    
+    # A rebuild from the raw attempts gives the same leaderboards
+    assert LeaderboardService.rebuild(test_quiz.id) == 2
+    assert LeaderboardService.top() == expected
+    assert LeaderboardService.rebuild() == 2
+    assert LeaderboardService.top(quiz_id=test_quiz.id) == expected
+    assert session.get(UserScoreTotal, test_user.id).percentage_sum == pytest.approx(400 / 3)
@@ -0,0 +1,45 @@
+"""
+Unit tests for the keyset pagination helpers.
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.models import UserQuiz
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_paginate, InvalidCursor
+
+
+def test_cursor_round_trip():
+    """Test that cursors survive encoding, including datetimes."""
+    key = (datetime(2026, 10, 18, 12, 30, 5, 123456), 42)
+    assert decode_cursor(encode_cursor('prev', key)) == ('prev', key)
+    
+    with pytest.raises(InvalidCursor):
+        decode_cursor('not-a-cursor')
+
+
+def test_keyset_paginate_walks_forward_and_back(app, session, test_user, test_quiz):
+    """Test paging newest-first over completed attempts with tied completion times."""
+    base = datetime(2026, 1, 1)
+    attempts = [
+        UserQuiz(user_id=test_user.id, quiz_id=test_quiz.id, created_at=base,
+                 completed_at=base + timedelta(minutes=i // 2))
+        for i in range(7)
+    ]
+    session.add_all(attempts)
+    session.commit()
+    
+    query = UserQuiz.query.filter(UserQuiz.completed_at.isnot(None))
+    columns = [UserQuiz.completed_at, UserQuiz.id]
+    expected = [uq.id for uq in sorted(attempts, key=lambda uq: (uq.completed_at, uq.id), reverse=True)]
+    
+    pages = [keyset_paginate(query, columns, limit=3, descending=True)]
+    while pages[-1].has_next:
+        pages.append(keyset_paginate(query, columns, pages[-1].next_cursor, limit=3, descending=True))
+    
+    assert [uq.id for page in pages for uq in page] == expected
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert not pages[0].has_prev
+    
+    # Walking back from the last page returns the same middle page
+    back = keyset_paginate(query, columns, pages[-1].prev_cursor, limit=3, descending=True)
+    assert [uq.id for uq in back] == [uq.id for uq in pages[1]]
+    assert back.has_prev and back.has_next
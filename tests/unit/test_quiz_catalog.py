@@ -0,0 +1,67 @@
+"""
+Unit tests for the QuizCatalog service.
+"""
+import pytest
+from app.models import Quiz
+from app.services.quiz_catalog import QuizCatalog
+from app.services.quiz_loader import QuizLoader
+
+QUIZ_YAML = """
+title: Catalog Quiz
+description: Loaded from YAML
+questions:
+  - text: First?
+    options:
+      - text: A
+        correct: true
+      - text: B
+  - text: Second?
+    options:
+      - text: A
+      - text: B
+        correct: true
+"""
+
+
+@pytest.fixture
+def catalog_recheck(app):
+    """Let the catalog trust its cached watermark for a while, as in production."""
+    QuizCatalog.invalidate()
+    app.config['QUIZ_CATALOG_RECHECK_SECONDS'] = 60
+    yield
+    app.config['QUIZ_CATALOG_RECHECK_SECONDS'] = 0
+    QuizCatalog.invalidate()
+
+
+def test_loader_maintains_question_count(app, session, tmp_path):
+    """Test that QuizLoader stores the number of imported questions."""
+    quiz_file = tmp_path / 'catalog.yml'
+    quiz_file.write_text(QUIZ_YAML)
+    
+    quiz = QuizLoader.load_quiz_from_file(str(quiz_file))
+    
+    assert quiz.question_count == 2
+    entry = next(entry for entry in QuizCatalog.entries() if entry.id == quiz.id)
+    assert entry.question_count == 2
+    assert not entry.is_live
+
+
+def test_catalog_filters_live_and_serves_from_cache(app, session, catalog_recheck, query_counter):
+    """Test the live filter and that cached lookups run no queries until invalidated."""
+    draft = Quiz(title='Draft', is_live=False)
+    live = Quiz(title='Live', is_live=True, question_count=3)
+    session.add_all([draft, live])
+    session.commit()
+    
+    assert [entry.id for entry in QuizCatalog.entries(live_only=True)] == [live.id]
+    assert {draft.id, live.id} <= {entry.id for entry in QuizCatalog.entries()}
+    
+    query_counter.clear()
+    page = QuizCatalog.page(limit=1, live_only=True)
+    assert [entry.title for entry in page] == ['Live']
+    assert query_counter == []
+    
+    draft.is_live = True
+    session.commit()
+    QuizCatalog.invalidate()
+    assert [entry.id for entry in QuizCatalog.entries(live_only=True)] == [draft.id, live.id]
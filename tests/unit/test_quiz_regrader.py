@@ -0,0 +1,44 @@
+"""
+Unit tests for the QuizRegrader class.
+"""
+from datetime import datetime
+from app.services.quiz_regrader import QuizRegrader
+from app.services.daily_activity import DailyActivityService
+from app.models import UserQuiz, UserAnswer
+
+
+def _completed_attempt(session, user, quiz, options):
+    user_quiz = UserQuiz(user_id=user.id, quiz_id=quiz.id, score=0, completed_at=datetime.utcnow())
+    session.add(user_quiz)
+    session.flush()
+    for option in options:
+        session.add(UserAnswer(user_quiz_id=user_quiz.id, question_id=option.question_id, option_id=option.id))
+    return user_quiz
+
+
+def test_regrade_quiz_vectorized_matches_per_row(app, session, test_user, test_quiz):
+    """Test that vectorized regrading gives the same scores as the per-attempt path."""
+    questions = test_quiz.questions.all()
+    correct = [q.options.filter_by(is_correct=True).first() for q in questions]
+    wrong = [q.options.filter_by(is_correct=False).first() for q in questions]
+    
+    all_correct = _completed_attempt(session, test_user, test_quiz, correct)
+    one_correct = _completed_attempt(session, test_user, test_quiz, [correct[0], wrong[1]])
+    no_answers = _completed_attempt(session, test_user, test_quiz, [])
+    session.commit()
+    
+    summary = QuizRegrader.regrade_quiz(test_quiz.id, chunk_size=2)
+    assert summary['attempts'] == 3
+    assert summary['updated'] == 2
+    
+    scores = {uq.id: uq.score for uq in UserQuiz.query.filter_by(quiz_id=test_quiz.id)}
+    assert scores == {all_correct.id: 3, one_correct.id: 1, no_answers.id: 0}
+    
+    # The daily rollup of the quiz is rebuilt with the new scores
+    today = DailyActivityService.series(days=1, quiz_id=test_quiz.id)[0]
+    assert today['completions'] == 3
+    assert today['average_score'] == round(4 / 3, 2)
+    
+    # The per-row path agrees, so nothing changes
+    summary = QuizRegrader.regrade_quiz(test_quiz.id, per_row=True)
+    assert summary['updated'] == 0
@@ -1,9 +1,11 @@
 """
 Unit tests for the QuizService class.
 """
+import threading
 import pytest
 from datetime import datetime
 from app.services.quiz_service import QuizService
+from app.services.scoring import ScoringService
 from app.models import UserQuiz, UserAnswer, Option
 
 
@@ -120,3 +122,123 @@ def test_start_quiz(app, session, test_user, test_quiz):
     assert user_quiz.score == 0
     assert user_quiz.completed_at is None
     assert user_quiz.created_at is not None
+
+
+def test_submit_answers_bulk(app, session, test_user, test_quiz):
+    """Test submitting several answers at once, including updates and invalid pairs."""
+    user_quiz = UserQuiz(
+        user_id=test_user.id,
+        quiz_id=test_quiz.id,
+        created_at=datetime.utcnow()
+    )
+    session.add(user_quiz)
+    session.commit()
+    
+    questions = test_quiz.questions.all()
+    first_options = {q.id: q.options[0].id for q in questions}
+    
+    # Submit answers for every question
+    saved = QuizService.submit_answers(user_quiz.id, first_options)
+    assert saved == first_options
+    
+    # Change one answer and send an option that belongs to another question
+    changed = {
+        questions[0].id: questions[0].options[1].id,
+        questions[1].id: questions[2].options[0].id
+    }
+    saved = QuizService.submit_answers(user_quiz.id, changed)
+    assert saved == {questions[0].id: questions[0].options[1].id}
+    
+    # Verify there is still exactly one answer per question
+    answers = UserAnswer.query.filter_by(user_quiz_id=user_quiz.id).all()
+    assert len(answers) == len(questions)
+    answer_map = {a.question_id: a.option_id for a in answers}
+    assert answer_map[questions[0].id] == questions[0].options[1].id
+    assert answer_map[questions[1].id] == first_options[questions[1].id]
+    
+    # Without skip_invalid the whole batch is rejected, valid pairs included
+    saved = QuizService.submit_answers(user_quiz.id, changed | {questions[0].id: questions[0].options[0].id},
+                                       skip_invalid=False)
+    assert saved == {}
+    answers = UserAnswer.query.filter_by(user_quiz_id=user_quiz.id).all()
+    assert {a.question_id: a.option_id for a in answers} == answer_map
+
+
+@pytest.mark.parametrize('backend', ['python', 'sql'])
+def test_complete_quiz_scoring_backends(app, session, test_user, test_quiz, mock_celery_task, monkeypatch, backend):
+    """Test that the Python and SQL scoring backends give the same result."""
+    monkeypatch.setitem(app.config, 'SCORING_BACKEND', backend)
+    
+    user_quiz = UserQuiz(
+        user_id=test_user.id,
+        quiz_id=test_quiz.id,
+        created_at=datetime.utcnow()
+    )
+    session.add(user_quiz)
+    session.commit()
+    
+    # Answer two questions correctly and one incorrectly
+    questions = test_quiz.questions.all()
+    answers = {q.id: q.options.filter_by(is_correct=True).first().id for q in questions[:2]}
+    answers[questions[2].id] = questions[2].options.filter_by(is_correct=False).first().id
+    QuizService.submit_answers(user_quiz.id, answers)
+    
+    result = QuizService.complete_quiz(user_quiz.id)
+    
+    assert result is not None
+    assert result.score == 2
+    assert result.completed_at is not None
+    assert result.pending_completion is False
+
+
+@pytest.mark.parametrize('backend', ['python', 'sql'])
+def test_complete_quiz_concurrent_submits(app, session, test_user, test_quiz, mock_celery_task, monkeypatch, backend):
+    """Test that parallel completions of one attempt score it and queue statistics exactly once."""
+    monkeypatch.setitem(app.config, 'SCORING_BACKEND', backend)
+    
+    user_quiz = UserQuiz(
+        user_id=test_user.id,
+        quiz_id=test_quiz.id,
+        created_at=datetime.utcnow()
+    )
+    session.add(user_quiz)
+    session.commit()
+    
+    # Count scoring passes of both backends
+    scoring_passes = []
+    score_attempt = QuizService._score_attempt
+    complete_attempts = ScoringService.complete_attempts
+    
+    def counting_score_attempt(*args, **kwargs):
+        scoring_passes.append(1)
+        return score_attempt(*args, **kwargs)
+    
+    def counting_complete_attempts(*args, **kwargs):
+        rows = complete_attempts(*args, **kwargs)
+        scoring_passes.extend(1 for _ in rows)
+        return rows
+    
+    monkeypatch.setattr(QuizService, '_score_attempt', staticmethod(counting_score_attempt))
+    monkeypatch.setattr(ScoringService, 'complete_attempts', staticmethod(counting_complete_attempts))
+    
+    submits = 8
+    barrier = threading.Barrier(submits)
+    results = []
+    
+    def submit():
+        with app.app_context():
+            barrier.wait()
+            result = QuizService.complete_quiz(user_quiz.id)
+            results.append(result is not None and result.completed_at is not None)
+            session.remove()
+    
+    threads = [threading.Thread(target=submit) for _ in range(submits)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    mock_process, mock_stats = mock_celery_task
+    assert results == [True] * submits
+    assert len(scoring_passes) == 1
+    mock_stats.apply_async.assert_called_once_with(args=[test_quiz.id], countdown=0)
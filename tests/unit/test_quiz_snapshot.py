@@ -0,0 +1,57 @@
+"""
+Unit tests for the QuizSnapshotCache class.
+"""
+from app.services.quiz_snapshot import QuizSnapshotCache, QuestionBlockCache
+from app.models import Quiz, Question, Option
+
+
+def test_snapshot_loads_in_constant_queries(app, session, query_counter):
+    """Test that a 100-question snapshot takes two queries and is then served from the cache."""
+    quiz = Quiz(title='Large Quiz', is_live=True)
+    session.add(quiz)
+    session.flush()
+    for i in range(100):
+        question = Question(quiz_id=quiz.id, text=f'Question {i}')
+        session.add(question)
+        session.flush()
+        for j in range(4):
+            session.add(Option(question_id=question.id, text=f'Option {j}', is_correct=(j == 0)))
+    session.commit()
+    version = quiz.version
+    
+    QuizSnapshotCache.clear()
+    del query_counter[:]
+    snapshot = QuizSnapshotCache.get(quiz)
+    
+    assert len(query_counter) == 2
+    assert snapshot.question_count == 100
+    assert all(len(q.options) == 4 for q in snapshot.questions)
+    assert all(q.options[0].is_correct for q in snapshot.questions)
+    
+    # Rendering again with the same version needs no queries at all
+    del query_counter[:]
+    assert QuizSnapshotCache.get(quiz) is snapshot
+    assert len(query_counter) == 0
+    
+    # Editing a question bumps the version and refreshes the snapshot
+    question = Question.query.filter_by(quiz_id=quiz.id).first()
+    question.text = 'Edited question'
+    session.commit()
+    assert quiz.version == version + 1
+    assert QuizSnapshotCache.get(quiz).questions[0].text == 'Edited question'
+
+
+def test_question_block_is_rendered_once_per_version(app, session, test_quiz):
+    """Test that the take.html question block is cached per quiz version and carries no answers."""
+    QuestionBlockCache.clear()
+    
+    html = QuestionBlockCache.get(test_quiz)
+    assert 'checked' not in html
+    assert html.count('type="radio"') == 12
+    assert QuestionBlockCache.get(test_quiz) is html
+    
+    # Changing an option re-renders the block
+    option = Option.query.join(Question).filter(Question.quiz_id == test_quiz.id).first()
+    option.text = 'Renamed option'
+    session.commit()
+    assert 'Renamed option' in QuestionBlockCache.get(test_quiz)
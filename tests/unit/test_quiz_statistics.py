@@ -0,0 +1,45 @@
+"""
+Unit tests for the QuizStatisticsService class.
+"""
+import pytest
+from app.models import QuizStatistics, UserQuiz, UserAnswer, Option
+from app.services.quiz_service import QuizService
+from app.services.quiz_statistics import QuizStatisticsService
+
+
+@pytest.fixture
+def many_shards(app):
+    app.config['QUIZ_STATISTICS_SHARDS'] = 4
+    yield
+    app.config['QUIZ_STATISTICS_SHARDS'] = 8
+
+
+def test_counters_follow_starts_and_completions(app, session, test_user, test_quiz, mock_celery_task, many_shards):
+    """Test that starting and completing attempts maintains the sharded counters."""
+    correct = {option.question_id: option.id for option in Option.query.filter_by(is_correct=True)}
+    
+    attempts = [QuizService.start_quiz(test_user, test_quiz.id) for _ in range(6)]
+    for answered, user_quiz in enumerate(attempts[:5]):
+        # Attempt n answers n % 4 questions correctly
+        answers = dict(list(correct.items())[:answered % 4])
+        QuizService.submit_answers(user_quiz.id, answers)
+        QuizService.complete_quiz(user_quiz.id)
+    
+    stats = QuizStatisticsService.get(test_quiz.id)
+    assert stats['attempts_started'] == 6
+    assert stats['attempts_completed'] == 5
+    assert stats['average_score'] == pytest.approx((0 + 1 + 2 + 3 + 0) / 5)
+    assert stats['score_stddev'] == pytest.approx(1.16619, abs=1e-4)
+    assert (stats['score_min'], stats['score_max']) == (0, 3)
+    assert stats['completion_rate'] == pytest.approx(5 / 6 * 100)
+    assert QuizStatistics.query.filter_by(quiz_id=test_quiz.id).count() <= 4
+    
+    # Completing an attempt again does not count it twice
+    QuizService.complete_quiz(attempts[1].id)
+    assert QuizStatisticsService.get(test_quiz.id)['attempts_completed'] == 5
+    
+    # A rebuild from the raw attempts gives the same numbers in a single row
+    assert QuizStatisticsService.reconcile(test_quiz.id) == 1
+    assert QuizStatisticsService.get(test_quiz.id) == stats
+    assert QuizStatistics.query.filter_by(quiz_id=test_quiz.id).count() == 1
+    assert QuizStatisticsService.totals() == {'attempts_started': 6, 'attempts_completed': 5}
@@ -0,0 +1,78 @@
+"""
+Unit tests for the SharedCache class.
+"""
+import threading
+import time
+from app.utils.shared_cache import SharedCache
+
+
+def make_cache(tmp_path, ttl=60, stale_ttl=60):
+    cache = SharedCache()
+    cache.configure(str(tmp_path / 'cache.sqlite3'), ttl=ttl, stale_ttl=stale_ttl, lock_timeout=5)
+    cache.poll_interval = 0.01
+    return cache
+
+
+def test_concurrent_misses_compute_once(tmp_path):
+    """Test that concurrent misses for one key run a single recompute."""
+    cache = make_cache(tmp_path)
+    computes = []
+    
+    def compute():
+        computes.append(1)
+        time.sleep(0.2)
+        return {'value': 42}
+    
+    workers = 8
+    barrier = threading.Barrier(workers)
+    results = []
+    
+    def request():
+        barrier.wait()
+        results.append(cache.get_or_compute('report', compute))
+    
+    threads = [threading.Thread(target=request) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert results == [{'value': 42}] * workers
+    assert len(computes) == 1
+    assert cache.get_or_compute('report', compute) == {'value': 42}
+    stats = cache.stats()
+    assert (stats['misses'], stats['waits'], stats['computes'], stats['hits']) == (workers, workers - 1, 1, 1)
+
+
+def test_stale_value_served_during_refresh(tmp_path):
+    """Test that an expired value is served while another caller recomputes it."""
+    cache = make_cache(tmp_path, ttl=0.1)
+    assert cache.get_or_compute('report', lambda: 1) == 1
+    time.sleep(0.15)
+    
+    refreshing = threading.Event()
+    release = threading.Event()
+    
+    def slow_compute():
+        refreshing.set()
+        release.wait(5)
+        return 2
+    
+    refresher = threading.Thread(target=lambda: cache.get_or_compute('report', slow_compute))
+    refresher.start()
+    assert refreshing.wait(5)
+    assert cache.get_or_compute('report', lambda: 3) == 1
+    release.set()
+    refresher.join()
+    
+    assert cache.get_or_compute('report', lambda: 3) == 2
+    stats = cache.stats()
+    assert (stats['stale_hits'], stats['computes'], stats['hits']) == (1, 2, 1)
+
+
+def test_zero_ttl_disables_cache(tmp_path):
+    """Test that a TTL of 0 computes on every call."""
+    cache = make_cache(tmp_path, ttl=0)
+    values = iter(range(3))
+    assert [cache.get_or_compute('report', lambda: next(values)) for _ in range(3)] == [0, 1, 2]
+    assert cache.stats()['misses'] == 0
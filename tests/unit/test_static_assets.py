@@ -0,0 +1,62 @@
+"""
+Unit tests for the fingerprinted static asset pipeline.
+"""
+import gzip
+from flask import Flask, url_for
+from app.utils.assets import build_assets, StaticAssets
+
+
+def make_static_app(tmp_path):
+    static_folder = tmp_path / 'static'
+    (static_folder / 'css').mkdir(parents=True)
+    (static_folder / 'css' / 'site.css').write_text('body { color: black; }\n' * 50)
+    (static_folder / 'logo.png').write_bytes(b'\x89PNG' + bytes(range(256)))
+    build_assets(str(static_folder), str(static_folder / 'dist'))
+    
+    app = Flask(__name__, static_folder=str(static_folder))
+    app.config['SERVER_NAME'] = 'localhost'
+    StaticAssets(app)
+    return app
+
+
+def test_build_fingerprints_and_precompresses(tmp_path):
+    """Test that assets get content-hashed names and .gz copies only where it helps."""
+    static_folder = tmp_path / 'static'
+    static_folder.mkdir()
+    (static_folder / 'app.js').write_text('console.log("hello");\n' * 20)
+    (static_folder / 'icon.png').write_bytes(b'\x89PNG')
+    
+    manifest = build_assets(str(static_folder), str(static_folder / 'dist'))
+    
+    js = static_folder / manifest['app.js']
+    assert manifest['app.js'].startswith('dist/app.') and js.exists()
+    assert gzip.decompress((static_folder / (manifest['app.js'] + '.gz')).read_bytes()) == js.read_bytes()
+    assert not (static_folder / (manifest['icon.png'] + '.gz')).exists()
+    
+    # Rebuilding does not fingerprint the previous build
+    assert build_assets(str(static_folder), str(static_folder / 'dist')) == manifest
+
+
+def test_fingerprinted_assets_served_immutable_with_gzip(tmp_path):
+    """Test url_for rewriting, encoding negotiation and caching headers."""
+    app = make_static_app(tmp_path)
+    with app.app_context():
+        css_url = url_for('static', filename='css/site.css', _external=False)
+    assert css_url.startswith('/static/dist/css/site.') and css_url.endswith('.css')
+    
+    client = app.test_client()
+    plain = client.get(css_url)
+    assert plain.status_code == 200
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+    
+    compressed = client.get(css_url, headers={'Accept-Encoding': 'br, gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    
+    refused = client.get(css_url, headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in refused.headers
+    
+    revalidated = client.get(css_url, headers={'If-None-Match': plain.headers['ETag']})
+    assert revalidated.status_code == 304
@@ -0,0 +1,79 @@
+"""
+Unit tests for the UserDirectory class.
+"""
+from datetime import datetime, timedelta
+from app.models import User, Quiz, UserQuiz
+from app.services.user_directory import UserDirectory
+from tests.test_helpers import call_view
+
+
+def _add_users(session):
+    users = [User(username=name, email=email) for name, email in (
+        ('alice', 'alice@example.com'),
+        ('Alfred', 'fred@example.org'),
+        ('al_x', 'x@example.com'),
+        ('bob', 'ALbert@example.net'),
+        ('carol', 'carol@example.com'),
+    )]
+    quiz = Quiz(title='Directory quiz', question_count=4)
+    session.add_all(users + [quiz])
+    session.flush()
+    return users, quiz
+
+
+def test_directory_search(app, session):
+    """Test case-insensitive prefix search on username or email with literal wildcards."""
+    users, _ = _add_users(session)
+    session.commit()
+    
+    def names(search, **kwargs):
+        return [entry.username for entry in UserDirectory.page(search, **kwargs)]
+    
+    assert names('al') == ['alice', 'Alfred', 'al_x', 'bob']
+    assert names('AL', limit=2) == ['alice', 'Alfred']
+    assert names('al_') == ['al_x']
+    assert names('al%') == []
+    assert names('fred@') == ['Alfred']
+    assert names('lice') == []
+    assert len(UserDirectory.page().items) == len(User.query.all())
+    
+    page = UserDirectory.page('al', limit=3)
+    assert [entry.username for entry in UserDirectory.page('al', page.next_cursor, limit=3)] == ['bob']
+
+
+def test_directory_activity(app, session, query_counter):
+    """Test attempt counts, last activity and average score from one query per page."""
+    users, quiz = _add_users(session)
+    start = datetime(2026, 5, 1, 9, 0)
+    session.add_all([
+        UserQuiz(user_id=users[0].id, quiz_id=quiz.id, score=4, created_at=start,
+                 completed_at=start + timedelta(minutes=5)),
+        UserQuiz(user_id=users[0].id, quiz_id=quiz.id, score=1, created_at=start + timedelta(hours=1),
+                 completed_at=start + timedelta(hours=1, minutes=5)),
+        # Open attempts count as activity but have no score
+        UserQuiz(user_id=users[0].id, quiz_id=quiz.id, created_at=start + timedelta(hours=2)),
+        UserQuiz(user_id=users[1].id, quiz_id=quiz.id, created_at=start),
+    ])
+    session.commit()
+    
+    query_counter.clear()
+    entries = {entry.username: entry for entry in UserDirectory.page('a')}
+    assert len(query_counter) == 2
+    
+    assert entries['alice'][5:] == (3, start + timedelta(hours=2), 62.5)
+    assert entries['Alfred'][5:] == (1, start, None)
+    assert entries['al_x'][5:] == (0, None, None)
+
+
+def test_list_users_view(app, session):
+    """Test the user list page with a search."""
+    users, _ = _add_users(session)
+    admin = User(username='directory_admin', email='directory@example.com', is_admin=True)
+    session.add(admin)
+    session.commit()
+    
+    response = call_view(app, 'admin.list_users', admin, query_string={'q': 'car'})
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert 'carol@example.com' in html
+    assert 'alice@example.com' not in html
@@ -0,0 +1,130 @@
+"""
+Unit tests for the UserImport class.
+"""
+import io
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import check_password_hash
+from app.models import User, UserImportJob
+from app.services.user_import import UserImport
+from tests.test_helpers import call_view
+
+
+def test_import_csv(app, session, test_user, query_counter):
+    """Test that valid rows are created and every invalid row is reported with its line."""
+    csv_text = '\n'.join([
+        'username,email,password,is_admin',
+        'student1,student1@example.com,secret1,',
+        'teacher,teacher@example.com,secret2,Yes',
+        ',nobody@example.com,secret3,',
+        'student2,not-an-email,secret4,',
+        'student1,other@example.com,secret5,',
+        f'{test_user.username},fresh@example.com,secret6,',
+        f'student3,{test_user.email},secret7,',
+        'student4,student4@example.com,,',
+    ])
+    query_counter.clear()
+    summary = UserImport.import_csv(io.StringIO(csv_text), workers=1, batch_size=1)
+    
+    assert summary['rows'] == 8
+    assert summary['created'] == 2
+    assert [(error['line'], error['error']) for error in summary['errors']] == [
+        (4, 'Username is required (at most 64 characters)'),
+        (5, 'A valid email is required (at most 120 characters)'),
+        (6, 'Duplicate username (line 2)'),
+        (7, 'Username already exists'),
+        (8, 'Email already exists'),
+        (9, 'Password is required'),
+    ]
+    # One uniqueness check and one INSERT per batch
+    assert len([statement for statement in query_counter if statement.startswith('SELECT')]) == 1
+    
+    teacher = User.query.filter_by(username='teacher').one()
+    assert teacher.is_admin
+    assert teacher.verify_password('secret2')
+    assert not User.query.filter_by(username='student1').one().is_admin
+
+
+def test_import_csv_missing_columns(app, session):
+    """Test that a file without the required columns is rejected as a whole."""
+    with pytest.raises(ValueError, match='password'):
+        UserImport.import_csv(io.StringIO('username,email\nsomeone,someone@example.com\n'))
+
+
+def test_hash_passwords_process_pool(app):
+    """Test that hashes from worker processes are in order and verify."""
+    passwords = [f'password{i}' for i in range(4)]
+    hashes = UserImport.hash_passwords(passwords, workers=2)
+    assert len(set(hashes)) == 4
+    assert all(check_password_hash(password_hash, password) for password_hash, password in zip(hashes, passwords))
+
+
+def test_upload_is_imported_by_job(app, session, test_user, monkeypatch):
+    """Test that an upload is staged and imported by the task, and that large files are left to the CLI."""
+    admin = User(username='import_admin', email='import_admin@example.com', is_admin=True)
+    session.add(admin)
+    session.commit()
+    
+    csv_bytes = b'username,email,password\nuploaded,uploaded@example.com,secret\n,missing@example.com,secret\n'
+    response = call_view(app, 'admin.import_users', admin, method='POST',
+                         data={'users_file': (io.BytesIO(csv_bytes), 'users.csv')})
+    assert response.status_code == 302
+    job = session.query(UserImportJob).one()
+    assert response.location.endswith(f'/admin/users/import?job={job.id}')
+    
+    assert (job.status, job.total, job.payload) == (UserImportJob.COMPLETED, 2, None)
+    assert (job.summary['created'], job.summary['rows']) == (1, 2)
+    assert User.query.filter_by(username='uploaded').one().verify_password('secret')
+    page = call_view(app, 'admin.import_users', admin, query_string={'job': job.id}).get_data(as_text=True)
+    assert 'Created <strong>1</strong> of 2 users' in page
+    
+    monkeypatch.setitem(app.config, 'USER_IMPORT_MAX_ROWS', 1)
+    with pytest.raises(ValueError, match='flask users import'):
+        UserImport.stage('users.csv', csv_bytes)
+
+
+def test_concurrent_insert_fails_job(app, session, monkeypatch):
+    """Test that users taken by a concurrent insert fail the job instead of raising."""
+    job = UserImport.stage('users.csv', b'username,email,password\nracer,racer@example.com,secret\n')
+    
+    def taken(*args, **kwargs):
+        raise IntegrityError('INSERT INTO users', {}, Exception('UNIQUE constraint failed: users.username'))
+    
+    monkeypatch.setattr(UserImport, 'import_csv', staticmethod(taken))
+    status = UserImport.run(job.id)
+    assert status['status'] == 'failed'
+    assert 'no users were created' in status['error']
+    assert job.payload is None
+
+
+def test_upload_is_cleared_on_every_exit(app, session, monkeypatch):
+    """Test that the staged upload (with its passwords) is dropped when the import fails unexpectedly."""
+    job = UserImport.stage('users.csv', b'username,email,password\nbroken,broken@example.com,secret\n')
+    
+    def broken(*args, **kwargs):
+        raise RuntimeError('process pool broke')
+    
+    monkeypatch.setattr(UserImport, 'import_csv', staticmethod(broken))
+    with pytest.raises(RuntimeError):
+        UserImport.run(job.id)
+    session.refresh(job)
+    assert (job.status, job.payload) == (UserImportJob.FAILED, None)
+
+
+def test_purge_unfinished(app, session):
+    """Test that stuck jobs are failed and no finished job keeps its upload."""
+    csv_bytes = b'username,email,password\nwaiting,waiting@example.com,secret\n'
+    stuck, fresh, finished = (UserImport.stage('users.csv', csv_bytes) for _ in range(3))
+    finished.status = UserImportJob.COMPLETED
+    session.commit()
+    session.execute(UserImportJob.__table__.update().where(UserImportJob.__table__.c.id == stuck.id)
+                    .values(updated_at=datetime.utcnow() - timedelta(hours=2)))
+    session.commit()
+    
+    assert UserImport.purge_unfinished() == 2
+    for job in (stuck, fresh, finished):
+        session.refresh(job)
+    assert (stuck.status, stuck.payload) == (UserImportJob.FAILED, None)
+    assert (fresh.status, fresh.payload) == (UserImportJob.PENDING, csv_bytes.decode('utf-8'))
+    assert (finished.status, finished.payload) == (UserImportJob.COMPLETED, None)